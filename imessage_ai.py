@@ -7,18 +7,15 @@ Simple command-line interface for chatting with your iMessage history using AI.
 
 import sys
 import argparse
-from pathlib import Path
 
-# Add indexer to path
-sys.path.insert(0, str(Path(__file__).parent / 'indexer'))
-
-from indexer import iMessageIndexer
-from indexer.chat_interface import iMessageChat
-from indexer.llm_integration import LLMManager
+# indexer modules are imported inside each command so that `--help` doesn't
+# load chromadb / sentence-transformers
 
 
 def cmd_setup(args):
     """Setup/index iMessage data"""
+    from indexer import iMessageIndexer
+    
     print("🚀 Setting up iMessage AI...")
     
     indexer = iMessageIndexer(
@@ -52,6 +49,8 @@ def cmd_setup(args):
 
 def cmd_chat(args):
     """Start interactive chat"""
+    from indexer import iMessageChat
+    
     print("🤖 Starting iMessage AI chat...")
     
     try:
@@ -97,6 +96,8 @@ def cmd_chat(args):
 
 def cmd_status(args):
     """Show system status and statistics"""
+    from indexer import iMessageIndexer, LLMManager
+    
     print("📊 iMessage AI Status")
     print("=" * 25)
     
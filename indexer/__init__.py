@@ -2,22 +2,63 @@
 imessage-ai Indexer
 
 Parses iMessage chat.db, chunks messages, and generates embeddings for vector search.
+
+Submodules are imported lazily (PEP 562) so that lightweight entry points such
+as `--help` or `status` don't pay for sentence-transformers/chromadb/torch.
 """
 
-from .chat_db_parser import ChatDBParser, Message, Handle, Chat
-from .chunker import MessageChunker, MessageChunk
-from .embeddings import EmbeddingGenerator, EmbeddingIndex, EmbeddingResult
-from .vector_store import ChromaVectorStore, VectorStoreManager
-from .llm_integration import OllamaLLM, OpenAILLM, AnthropicLLM, RAGSystem, LLMManager
-from .pipeline import iMessageIndexer
-from .chat_interface import iMessageChat
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .chat_db_parser import ChatDBParser, Message, Handle, Chat
+    from .chunker import MessageChunker, MessageChunk
+    from .chunk_store import ChunkStore
+    from .embeddings import EmbeddingGenerator, EmbeddingIndex, EmbeddingResult
+    from .vector_store import ChromaVectorStore, VectorStoreManager
+    from .llm_integration import OllamaLLM, OpenAILLM, AnthropicLLM, RAGSystem, LLMManager
+    from .reranker import Reranker
+    from .pipeline import iMessageIndexer
+    from .chat_interface import iMessageChat
+
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    "ChatDBParser": ".chat_db_parser",
+    "Message": ".chat_db_parser",
+    "Handle": ".chat_db_parser",
+    "Chat": ".chat_db_parser",
+    "MessageChunker": ".chunker",
+    "MessageChunk": ".chunker",
+    "ChunkStore": ".chunk_store",
+    "EmbeddingGenerator": ".embeddings",
+    "EmbeddingIndex": ".embeddings",
+    "EmbeddingResult": ".embeddings",
+    "ChromaVectorStore": ".vector_store",
+    "VectorStoreManager": ".vector_store",
+    "OllamaLLM": ".llm_integration",
+    "OpenAILLM": ".llm_integration",
+    "AnthropicLLM": ".llm_integration",
+    "RAGSystem": ".llm_integration",
+    "LLMManager": ".llm_integration",
+    "Reranker": ".reranker",
+    "iMessageIndexer": ".pipeline",
+    "iMessageChat": ".chat_interface",
+}
 
 __version__ = "0.1.0"
-__all__ = [
-    "ChatDBParser", "Message", "Handle", "Chat",
-    "MessageChunker", "MessageChunk", 
-    "EmbeddingGenerator", "EmbeddingIndex", "EmbeddingResult",
-    "ChromaVectorStore", "VectorStoreManager",
-    "OllamaLLM", "OpenAILLM", "AnthropicLLM", "RAGSystem", "LLMManager",
-    "iMessageIndexer", "iMessageChat"
-]
\ No newline at end of file
+__all__ = tuple(_LAZY_IMPORTS)
+
+
+def __getattr__(name: str):
+    """Import public classes on first access"""
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # Cache so __getattr__ isn't hit again
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
@@ -0,0 +1,138 @@
+"""
+Chunk boundary detection kernels for MessageChunker
+
+All three chunking strategies reduce to the same problem: scan a column of
+per-message values and emit the indices where a new chunk starts. These
+kernels work on plain NumPy arrays (int64 timestamps, int64 day numbers,
+int32 speaker ids) and are compiled with numba when it is installed, with
+NumPy fallbacks otherwise.
+
+Split points never include 0 or the trailing group; callers decide what to
+do with the tail.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _split_at_boundaries(boundaries: np.ndarray, count: int, max_per: int, min_per: int) -> np.ndarray:
+    """Greedy split points from sorted candidate boundary indices
+
+    A chunk starting at `start` ends at the first boundary >= start + min_per,
+    or at start + max_per if that comes first.
+    """
+    split_points = []
+    chunk_start = 0
+    while True:
+        chunk_end = chunk_start + max_per
+        pos = np.searchsorted(boundaries, chunk_start + min_per)
+        if pos < len(boundaries) and boundaries[pos] < chunk_end:
+            chunk_end = int(boundaries[pos])
+
+        if chunk_end >= count:
+            return np.array(split_points, dtype=np.int64)
+
+        split_points.append(chunk_end)
+        chunk_start = chunk_end
+
+
+def _split_time_numpy(dates: np.ndarray, window: int, max_per: int, min_per: int) -> np.ndarray:
+    boundaries = np.flatnonzero(np.diff(dates) > window) + 1
+    return _split_at_boundaries(boundaries, len(dates), max_per, min_per)
+
+
+def _split_speaker_numpy(speaker_ids: np.ndarray, max_per: int, min_per: int) -> np.ndarray:
+    # A speaker change only counts when the previous speaker is known (id >= 0)
+    changed = (speaker_ids[:-1] >= 0) & (speaker_ids[1:] != speaker_ids[:-1])
+    boundaries = np.flatnonzero(changed) + 1
+    return _split_at_boundaries(boundaries, len(speaker_ids), max_per, min_per)
+
+
+def _split_daily_numpy(days: np.ndarray) -> np.ndarray:
+    return (np.flatnonzero(np.diff(days)) + 1).astype(np.int64)
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _split_time_numba(dates, window, max_per, min_per):
+        out = np.empty(len(dates), dtype=np.int64)
+        n_out = 0
+        chunk_start = 0
+        for i in range(1, len(dates)):
+            length = i - chunk_start
+            if length >= min_per and (dates[i] - dates[i - 1] > window or length >= max_per):
+                out[n_out] = i
+                n_out += 1
+                chunk_start = i
+        return out[:n_out]
+
+    @njit(cache=True)
+    def _split_speaker_numba(speaker_ids, max_per, min_per):
+        out = np.empty(len(speaker_ids), dtype=np.int64)
+        n_out = 0
+        chunk_start = 0
+        for i in range(1, len(speaker_ids)):
+            length = i - chunk_start
+            changed = speaker_ids[i - 1] >= 0 and speaker_ids[i] != speaker_ids[i - 1]
+            if length >= min_per and (changed or length >= max_per):
+                out[n_out] = i
+                n_out += 1
+                chunk_start = i
+        return out[:n_out]
+
+    @njit(cache=True)
+    def _split_daily_numba(days):
+        out = np.empty(len(days), dtype=np.int64)
+        n_out = 0
+        for i in range(1, len(days)):
+            if days[i] != days[i - 1]:
+                out[n_out] = i
+                n_out += 1
+        return out[:n_out]
+
+
+def split_time(dates: np.ndarray, window: int, max_per: int, min_per: int) -> np.ndarray:
+    """Split points for time-window chunks
+
+    Args:
+        dates: int64 timestamps, ascending
+        window: Largest gap (same unit as dates) that stays in one chunk
+        max_per: Maximum messages per chunk
+        min_per: Minimum messages before a chunk may end
+    """
+    min_per = max(min_per, 1)
+    max_per = max(max_per, min_per)
+    if NUMBA_AVAILABLE:
+        return _split_time_numba(dates, window, max_per, min_per)
+    return _split_time_numpy(dates, window, max_per, min_per)
+
+
+def split_speaker(speaker_ids: np.ndarray, max_per: int, min_per: int) -> np.ndarray:
+    """Split points for participant-turn chunks
+
+    Args:
+        speaker_ids: int32 interned speaker ids; -1 for unknown senders
+        max_per: Maximum messages per chunk
+        min_per: Minimum messages before a chunk may end
+    """
+    min_per = max(min_per, 1)
+    max_per = max(max_per, min_per)
+    if NUMBA_AVAILABLE:
+        return _split_speaker_numba(speaker_ids, max_per, min_per)
+    return _split_speaker_numpy(speaker_ids, max_per, min_per)
+
+
+def split_daily(days: np.ndarray) -> np.ndarray:
+    """Split points where the calendar day changes
+
+    Args:
+        days: int64 day numbers, ascending
+    """
+    if NUMBA_AVAILABLE:
+        return _split_daily_numba(days)
+    return _split_daily_numpy(days)
@@ -0,0 +1,112 @@
+"""
+Atomic file writes for indexes, snapshots and state files
+
+Each writer fills a temp file in the destination directory and renames it
+over the target, so readers (and the next run after a crash) see either the
+old file or the new one, never a partial write. Readers that memory-map the
+old file keep a valid mapping too, since the rename doesn't touch its inode.
+"""
+
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, IO, Iterator, Optional, Union
+
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+@contextmanager
+def atomic_path(path: Union[str, Path]) -> Iterator[Path]:
+    """Yield a temp path that replaces path once the block finishes without error
+
+    For writers that take a file name rather than a file object (e.g.
+    faiss.write_index).
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        yield Path(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_open(path: Union[str, Path], mode: str = 'w') -> Iterator[IO]:
+    """Open a temp file that replaces path once the block finishes without error
+
+    Args:
+        path: Destination file
+        mode: 'w' for text or 'wb' for binary
+    """
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, mode) as f:
+            yield f
+
+
+def _json_default(value: Any) -> Any:
+    """NumPy arrays and scalars as plain lists/numbers"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(data: Any) -> str:
+    """Compact JSON text for data, via orjson when installed
+    
+    Falls back to the json module for values orjson rejects (e.g. strings
+    holding lone surrogates or integers beyond 64 bits).
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(data, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, default=_json_default)
+
+
+# Parses str or bytes; orjson.JSONDecodeError subclasses json.JSONDecodeError
+json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+
+def read_json(path: Union[str, Path]) -> Any:
+    """Parse the JSON file at path"""
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
+
+
+def write_json_atomic(path: Union[str, Path], data: Any, indent: Optional[int] = None) -> None:
+    """Write data as JSON to path atomically
+    
+    Uses orjson when installed: it serializes several times faster and
+    produces UTF-8 bytes directly. orjson only indents by two spaces, so any
+    indent gives two-space indentation there.
+    
+    Args:
+        path: Destination file
+        data: JSON-serializable data; NumPy arrays and scalars are allowed
+        indent: Pretty-print with this indentation (None for compact output)
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        payload = orjson.dumps(data, default=_json_default, option=option)
+        with atomic_open(path, 'wb') as f:
+            f.write(payload)
+    else:
+        with atomic_open(path) as f:
+            json.dump(data, f, indent=indent, default=_json_default)
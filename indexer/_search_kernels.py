@@ -0,0 +1,140 @@
+"""
+Similarity kernels for EmbeddingIndex
+
+An int8 index stores each unit-length row as int8 codes plus one float32
+scale, so a row's score is scale * (codes . query). NumPy has no int8 x
+float32 matrix-vector product, so its fallback upcasts the matrix a block at
+a time; with numba installed the dequantize, dot product and scale are fused
+into one parallel pass that never materializes a float32 copy.
+
+int8_topk() goes one step further for search: each parallel block of rows
+keeps only its k best rows in a small insertion-sorted buffer, so neither
+an N-length score array nor a partition pass over it is needed. float32 and
+float16 matrices stay on BLAS, which a hand-written loop doesn't beat.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Rows upcast to float32 at a time by the NumPy fallback
+BLOCK_ROWS = 8192
+
+# Rows per parallel block in the fused top-k kernel
+TOPK_BLOCK_ROWS = 4096
+
+# int8_topk() keeps per-block candidates only while k is below this share of
+# the rows; for larger k a full score array and one partition is cheaper
+TOPK_MAX_FRACTION = 1 / 16
+
+
+def _int8_scores_numpy(codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), BLOCK_ROWS):
+        stop = start + BLOCK_ROWS
+        scores[start:stop] = codes[start:stop].astype(np.float32) @ query
+    scores *= scales
+    return scores
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_scores_numba(codes, scales, query):
+        n, dim = codes.shape
+        scores = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            total = np.float32(0.0)
+            for j in range(dim):
+                total += codes[i, j] * query[j]
+            scores[i] = total * scales[i]
+        return scores
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (ties keep row order)"""
+    if k < len(scores):
+        top = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_topk_numba(codes, scales, query, k, block_rows):
+        n, dim = codes.shape
+        n_blocks = (n + block_rows - 1) // block_rows
+        # Each block's best k, sorted by score descending; unused slots stay -1/-inf
+        block_idx = np.full((n_blocks, k), -1, dtype=np.int64)
+        block_scores = np.full((n_blocks, k), -np.inf, dtype=np.float32)
+
+        for b in prange(n_blocks):
+            filled = 0
+            for i in range(b * block_rows, min((b + 1) * block_rows, n)):
+                total = np.float32(0.0)
+                for j in range(dim):
+                    total += codes[i, j] * query[j]
+                score = total * scales[i]
+
+                # Rows arrive in order, so a tie never displaces an earlier row
+                if filled == k and score <= block_scores[b, k - 1]:
+                    continue
+                pos = filled if filled < k else k - 1
+                while pos > 0 and block_scores[b, pos - 1] < score:
+                    block_scores[b, pos] = block_scores[b, pos - 1]
+                    block_idx[b, pos] = block_idx[b, pos - 1]
+                    pos -= 1
+                block_scores[b, pos] = score
+                block_idx[b, pos] = i
+                if filled < k:
+                    filled += 1
+
+        return block_idx.ravel(), block_scores.ravel()
+
+
+def int8_topk(codes: np.ndarray, scales: np.ndarray, query: np.ndarray, k: int):
+    """The k best int8-quantized rows for a float32 query
+
+    Args:
+        codes: (N, dim) int8 row codes
+        scales: (N,) float32 per-row dequantization scales
+        query: (dim,) float32 query vector
+        k: Number of rows to return (at least 1)
+
+    Returns:
+        (indices, scores) arrays of length min(k, N), best first; tied
+        scores keep row order
+    """
+    k = min(k, len(codes))
+    if not NUMBA_AVAILABLE or k > len(codes) * TOPK_MAX_FRACTION:
+        # Every block would keep (nearly) all its rows as candidates
+        scores = int8_scores(codes, scales, query)
+        top = top_k_indices(scores, k)
+        return top, scores[top]
+
+    # A block can't contribute more candidates than it has rows
+    block_k = min(k, TOPK_BLOCK_ROWS)
+    idx, scores = _int8_topk_numba(np.asarray(codes), np.asarray(scales), query, block_k, TOPK_BLOCK_ROWS)
+    # Merge the per-block candidates: by score, then by row for ties
+    valid = idx >= 0
+    idx, scores = idx[valid], scores[valid]
+    order = np.lexsort((idx, -scores))[:k]
+    return idx[order], scores[order]
+
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Scores of int8-quantized rows against a float32 query
+
+    Args:
+        codes: (N, dim) int8 row codes
+        scales: (N,) float32 per-row dequantization scales
+        query: (dim,) float32 query vector
+    """
+    if NUMBA_AVAILABLE:
+        # Plain ndarray views: numba doesn't type np.memmap (loaded indexes)
+        return _int8_scores_numba(np.asarray(codes), np.asarray(scales), query)
+    return _int8_scores_numpy(codes, scales, query)
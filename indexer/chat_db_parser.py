@@ -7,13 +7,25 @@ Database located at: ~/Library/Messages/chat.db
 
 import sqlite3
 import os
+import sys
+import time
+from contextlib import closing
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from itertools import groupby
+from operator import attrgetter
+from typing import List, Dict, Optional, Tuple, Iterator
+from dataclasses import dataclass, field
 from pathlib import Path
 
 
-@dataclass
+# Seconds between the Unix epoch and the Cocoa epoch (2001-01-01 00:00:00 UTC).
+# Not datetime(2001, 1, 1).timestamp(): a naive datetime reads the epoch as
+# local time, shifting every date by the machine's UTC offset. The SQL unix_ts
+# expressions and every cutoff must use this same constant.
+COCOA_EPOCH_UNIX = 978307200
+
+
+@dataclass(slots=True)
 class Message:
     """Represents a single iMessage"""
     id: int
@@ -24,9 +36,17 @@ class Message:
     chat_id: int
     guid: str
     service: str  # 'iMessage', 'SMS', etc.
+    speaker: Optional[str] = field(init=False, repr=False)  # 'me' or sender_id
+    
+    def __post_init__(self):
+        # A chat has a handful of senders but many messages: share one string
+        # per sender and resolve the speaker once instead of in every chunker loop
+        if self.sender_id:
+            self.sender_id = sys.intern(self.sender_id)
+        self.speaker = 'me' if self.is_from_me else (self.sender_id or None)
 
 
-@dataclass
+@dataclass(slots=True)
 class Handle:
     """Represents a contact/phone number"""
     id: int
@@ -35,7 +55,7 @@ class Handle:
     country: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class Chat:
     """Represents a conversation (1:1 or group)"""
     id: int
@@ -50,7 +70,98 @@ class Chat:
 class ChatDBParser:
     """Parser for iMessage chat.db SQLite database"""
     
-    def __init__(self, db_path: Optional[str] = None):
+    # Rows fetched per round-trip when streaming results
+    FETCH_BATCH_SIZE = 10_000
+    
+    # Shared SELECT/JOIN for message queries. Column order matches the tuple
+    # unpacking in _iter_message_rows.
+    _MESSAGE_SELECT = f"""
+        SELECT 
+            m.ROWID as id,
+            m.text,
+            CASE WHEN m.date = 0 THEN NULL
+                 ELSE m.date / 1000000000.0 + {COCOA_EPOCH_UNIX} END as unix_ts,
+            m.is_from_me,
+            m.guid,
+            m.service,
+            cmj.chat_id,
+            h.id as sender_handle
+        FROM message m
+        JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
+        LEFT JOIN handle h ON m.handle_id = h.ROWID
+        """
+    
+    # Blank-text test matching the old Python-side str.strip() check: SQLite's
+    # one-argument TRIM() only strips spaces, not tabs or line breaks
+    _TEXT_NOT_BLANK = "TRIM(m.text, ' ' || char(9) || char(10) || char(11) || char(12) || char(13)) != ''"
+    
+    # Fixed query texts so sqlite3's statement cache reuses the compiled
+    # statement. LIMIT -1 means "no limit". All-chats and single-chat reads are
+    # separate statements because "? IS NULL OR chat_id = ?" would stop SQLite
+    # from using the chat_id index.
+    _Q_MESSAGES = _MESSAGE_SELECT + f"""
+        WHERE m.text IS NOT NULL AND {_TEXT_NOT_BLANK}
+        ORDER BY m.date ASC
+        LIMIT ?
+        """
+    
+    _Q_CHAT_MESSAGES = _MESSAGE_SELECT + f"""
+        WHERE m.text IS NOT NULL AND {_TEXT_NOT_BLANK} AND cmj.chat_id = ?
+        ORDER BY m.date ASC
+        LIMIT ?
+        """
+    
+    _Q_MESSAGES_AFTER_ID = _MESSAGE_SELECT + f"""
+        WHERE m.ROWID > ? AND m.text IS NOT NULL AND {_TEXT_NOT_BLANK}
+        ORDER BY m.date ASC
+        """
+    
+    _Q_CHAT_MESSAGES_SINCE = _MESSAGE_SELECT + f"""
+        WHERE m.text IS NOT NULL AND {_TEXT_NOT_BLANK} AND cmj.chat_id = ? AND m.date >= ?
+        ORDER BY m.date ASC
+        """
+    
+    _Q_RECENT_MESSAGES = _MESSAGE_SELECT + """
+        WHERE m.date > ? AND m.text IS NOT NULL AND m.text != ''
+        ORDER BY m.date DESC
+        LIMIT ?
+        """
+    
+    # Grouped reads: rows come back ordered by chat, then date, so a chat's
+    # messages are contiguous. Limited reads pick their rows with the plain
+    # query first, so LIMIT keeps selecting the oldest (or newest) messages.
+    _Q_MESSAGES_BY_CHAT = _MESSAGE_SELECT + f"""
+        WHERE m.text IS NOT NULL AND {_TEXT_NOT_BLANK}
+        ORDER BY cmj.chat_id, m.date ASC
+        """
+    
+    _Q_MESSAGES_BY_CHAT_LIMITED = f"SELECT * FROM ({_Q_MESSAGES}) ORDER BY chat_id, unix_ts"
+    
+    _Q_RECENT_MESSAGES_BY_CHAT = f"SELECT * FROM ({_Q_RECENT_MESSAGES}) ORDER BY chat_id, unix_ts"
+    
+    _CONNECTION_PRAGMAS = """
+        PRAGMA query_only=1;
+        PRAGMA mmap_size=268435456;  -- 256MB zero-copy reads
+        PRAGMA cache_size=-131072;   -- 128MB page cache (KiB)
+        PRAGMA temp_store=MEMORY;    -- ORDER BY sorts in RAM
+        """
+    
+    # Indexes that back the message scans (created only when requested)
+    INDEX_STATEMENTS = (
+        "CREATE INDEX IF NOT EXISTS ix_message_date ON message(date) WHERE text IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS ix_cmj_msg ON chat_message_join(message_id)",
+    )
+    
+    def __init__(self, db_path: Optional[str] = None, create_indexes: bool = False):
+        """
+        Initialize the parser
+        
+        Args:
+            db_path: Path to chat.db (defaults to macOS default)
+            create_indexes: Create the message(date) / chat_message_join(message_id)
+                indexes on first open. This writes to the database file, so only
+                enable it for a copy of chat.db, never the live Messages.app one.
+        """
         if db_path is None:
             # Default macOS iMessage database path
             home = Path.home()
@@ -61,12 +172,21 @@ class ChatDBParser:
         if not self.db_path.exists():
             raise FileNotFoundError(f"chat.db not found at {self.db_path}")
         
+        self.create_indexes = create_indexes
         self.conn = None
     
     def __enter__(self):
         """Context manager entry"""
-        self.conn = sqlite3.connect(str(self.db_path))
-        self.conn.row_factory = sqlite3.Row  # Access columns by name
+        if self.create_indexes:
+            self.ensure_indexes()
+        
+        # Open read-only: no journal/lock overhead and no risk of touching
+        # Messages.app data. immutable=1 is deliberately not used because
+        # recent messages live in the WAL until macOS checkpoints it.
+        db_uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        self.conn = sqlite3.connect(db_uri, uri=True, check_same_thread=False)
+        
+        self.conn.executescript(self._CONNECTION_PRAGMAS)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -74,6 +194,23 @@ class ChatDBParser:
         if self.conn:
             self.conn.close()
     
+    def ensure_indexes(self) -> bool:
+        """Create the indexes used by the message queries if they are missing
+        
+        Uses a short-lived writable connection since the main connection is
+        read-only. Returns False if the database could not be written.
+        """
+        try:
+            # sqlite3's own context manager only commits; closing() releases the file
+            with closing(sqlite3.connect(str(self.db_path))) as conn, conn:
+                for statement in self.INDEX_STATEMENTS:
+                    conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  Could not create chat.db indexes: {e}")
+            return False
+        
+        return True
+    
     def _cocoa_timestamp_to_datetime(self, timestamp: int) -> datetime:
         """Convert Apple's Cocoa timestamp to Python datetime
         
@@ -83,9 +220,7 @@ class ChatDBParser:
             return datetime(1970, 1, 1)  # Fallback for zero timestamps
         
         # Convert nanoseconds to seconds and add Cocoa epoch offset
-        cocoa_epoch = datetime(2001, 1, 1)
-        seconds = timestamp / 1_000_000_000
-        return datetime.fromtimestamp(cocoa_epoch.timestamp() + seconds)
+        return datetime.fromtimestamp(timestamp * 1e-9 + COCOA_EPOCH_UNIX)
     
     def get_handles(self) -> List[Handle]:
         """Get all contact handles (phone numbers/emails)"""
@@ -101,12 +236,12 @@ class ChatDBParser:
         cursor = self.conn.execute(query)
         handles = []
         
-        for row in cursor.fetchall():
+        for rowid, handle_id, service, country in self._iter_rows(cursor):
             handle = Handle(
-                id=row['ROWID'],
-                handle_id=row['id'],
-                service=row['service'] or 'Unknown',
-                country=row['country']
+                id=rowid,
+                handle_id=handle_id,
+                service=service or 'Unknown',
+                country=country
             )
             handles.append(handle)
         
@@ -117,6 +252,21 @@ class ChatDBParser:
         if not self.conn:
             raise RuntimeError("Database not connected. Use with statement.")
         
+        # Get all participants in one grouped query instead of one per chat.
+        # CHAR(31) (ASCII unit separator) can't appear in a phone number/email.
+        participants_query = """
+        SELECT chj.chat_id, GROUP_CONCAT(h.id, CHAR(31)) as participants
+        FROM chat_handle_join chj
+        JOIN handle h ON chj.handle_id = h.ROWID
+        GROUP BY chj.chat_id
+        """
+        
+        participants_by_chat = {
+            chat_id: participants.split('\x1f')
+            for chat_id, participants in self.conn.execute(participants_query)
+            if participants
+        }
+        
         # Get basic chat info
         chat_query = """
         SELECT ROWID, guid, style, state, room_name, display_name
@@ -127,28 +277,15 @@ class ChatDBParser:
         cursor = self.conn.execute(chat_query)
         chats = []
         
-        for row in cursor.fetchall():
-            chat_id = row['ROWID']
-            
-            # Get participants for this chat
-            participants_query = """
-            SELECT h.id as handle_id
-            FROM chat_handle_join chj
-            JOIN handle h ON chj.handle_id = h.ROWID
-            WHERE chj.chat_id = ?
-            """
-            
-            participants_cursor = self.conn.execute(participants_query, (chat_id,))
-            participants = [p['handle_id'] for p in participants_cursor.fetchall()]
-            
+        for chat_id, guid, style, state, room_name, display_name in self._iter_rows(cursor):
             chat = Chat(
                 id=chat_id,
-                guid=row['guid'],
-                style=row['style'] or 0,
-                state=row['state'] or 0,
-                room_name=row['room_name'],
-                display_name=row['display_name'],
-                participants=participants
+                guid=guid,
+                style=style or 0,
+                state=state or 0,
+                room_name=room_name,
+                display_name=display_name,
+                participants=participants_by_chat.get(chat_id, [])
             )
             chats.append(chat)
         
@@ -156,102 +293,132 @@ class ChatDBParser:
     
     def get_messages(self, chat_id: Optional[int] = None, limit: Optional[int] = None) -> List[Message]:
         """Get messages, optionally filtered by chat_id"""
+        return list(self.iter_messages(chat_id=chat_id, limit=limit))
+    
+    def iter_messages(self, chat_id: Optional[int] = None, limit: Optional[int] = None) -> Iterator[Message]:
+        """Stream messages one at a time, optionally filtered by chat_id
+        
+        Rows are pulled from the cursor lazily, so callers can start chunking
+        before the whole table has been read.
+        """
         if not self.conn:
             raise RuntimeError("Database not connected. Use with statement.")
         
-        # Base query - join messages with chats and handles
-        query = """
-        SELECT 
-            m.ROWID as id,
-            m.text,
-            m.date,
-            m.is_from_me,
-            m.guid,
-            m.service,
-            cmj.chat_id,
-            h.id as sender_handle
-        FROM message m
-        JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
-        LEFT JOIN handle h ON m.handle_id = h.ROWID
-        """
+        limit = -1 if limit is None else limit
         
-        params = []
-        if chat_id is not None:
-            query += " WHERE cmj.chat_id = ?"
-            params.append(chat_id)
+        if chat_id is None:
+            cursor = self.conn.execute(self._Q_MESSAGES, (limit,))
+        else:
+            cursor = self.conn.execute(self._Q_CHAT_MESSAGES, (chat_id, limit))
         
-        query += " ORDER BY m.date ASC"
+        yield from self._iter_message_rows(cursor)
+    
+    def iter_messages_after(self, message_id: int) -> Iterator[Message]:
+        """Stream messages whose ROWID is greater than message_id (oldest first)
         
-        if limit is not None:
-            query += " LIMIT ?"
-            params.append(limit)
+        ROWIDs only grow, so this is how incremental indexing finds messages
+        that arrived since the last run.
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected. Use with statement.")
         
-        cursor = self.conn.execute(query, params)
-        messages = []
+        cursor = self.conn.execute(self._Q_MESSAGES_AFTER_ID, (message_id,))
+        yield from self._iter_message_rows(cursor)
+    
+    def iter_chat_messages_since(self, chat_id: int, since: datetime) -> Iterator[Message]:
+        """Stream a chat's messages dated at or after `since` (oldest first)
         
-        for row in cursor.fetchall():
-            # Skip empty messages
-            if not row['text'] or row['text'].strip() == '':
-                continue
-            
-            message = Message(
-                id=row['id'],
-                text=row['text'],
-                date=self._cocoa_timestamp_to_datetime(row['date']),
-                is_from_me=bool(row['is_from_me']),
-                sender_id=row['sender_handle'],
-                chat_id=row['chat_id'],
-                guid=row['guid'],
-                service=row['service'] or 'iMessage'
-            )
-            messages.append(message)
+        The cutoff is widened by one second so that rounding in the Cocoa
+        conversion never drops the boundary message; callers trim the result.
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected. Use with statement.")
+        
+        cocoa_cutoff = int((since.timestamp() - 1 - COCOA_EPOCH_UNIX) * 1_000_000_000)
         
-        return messages
+        cursor = self.conn.execute(self._Q_CHAT_MESSAGES_SINCE, (chat_id, cocoa_cutoff))
+        yield from self._iter_message_rows(cursor)
     
     def get_recent_messages(self, days: int = 30, limit: int = 1000) -> List[Message]:
         """Get recent messages from the last N days"""
+        return list(self.iter_recent_messages(days=days, limit=limit))
+    
+    def iter_recent_messages(self, days: int = 30, limit: int = 1000) -> Iterator[Message]:
+        """Stream recent messages from the last N days (newest first)"""
         if not self.conn:
             raise RuntimeError("Database not connected. Use with statement.")
         
         # Calculate cutoff timestamp (Cocoa format)
-        cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
-        cocoa_cutoff = int((cutoff_date - datetime(2001, 1, 1).timestamp()) * 1_000_000_000)
+        cocoa_cutoff = int((time.time() - days * 86400 - COCOA_EPOCH_UNIX) * 1_000_000_000)
         
-        query = """
-        SELECT 
-            m.ROWID as id,
-            m.text,
-            m.date,
-            m.is_from_me,
-            m.guid,
-            m.service,
-            cmj.chat_id,
-            h.id as sender_handle
-        FROM message m
-        JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
-        LEFT JOIN handle h ON m.handle_id = h.ROWID
-        WHERE m.date > ? AND m.text IS NOT NULL AND m.text != ''
-        ORDER BY m.date DESC
-        LIMIT ?
+        cursor = self.conn.execute(self._Q_RECENT_MESSAGES, (cocoa_cutoff, limit))
+        yield from self._iter_message_rows(cursor)
+    
+    def iter_messages_by_chat(
+        self, 
+        limit: Optional[int] = None, 
+        days: Optional[int] = None
+    ) -> Iterator[Tuple[int, List[Message]]]:
+        """Stream messages grouped by chat, each chat's messages in date order
+        
+        SQLite does the grouping and sorting, so only one chat's messages are
+        held at a time.
+        
+        Args:
+            limit: Only the oldest N messages (the newest N with days)
+            days: Only messages from the last N days
+            
+        Yields:
+            (chat_id, messages) tuples, one per chat
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected. Use with statement.")
+        
+        limit = -1 if limit is None else limit
+        
+        if days is not None:
+            cocoa_cutoff = int((time.time() - days * 86400 - COCOA_EPOCH_UNIX) * 1_000_000_000)
+            cursor = self.conn.execute(self._Q_RECENT_MESSAGES_BY_CHAT, (cocoa_cutoff, limit))
+        elif limit < 0:
+            cursor = self.conn.execute(self._Q_MESSAGES_BY_CHAT)
+        else:
+            cursor = self.conn.execute(self._Q_MESSAGES_BY_CHAT_LIMITED, (limit,))
+        
+        for chat_id, messages in groupby(self._iter_message_rows(cursor), key=attrgetter('chat_id')):
+            yield chat_id, list(messages)
+    
+    def _iter_rows(self, cursor: sqlite3.Cursor) -> Iterator[tuple]:
+        """Yield rows from a cursor in fetchmany() batches
+        
+        Keeps at most one batch of rows alive at a time instead of the full
+        result list that fetchall() would build.
         """
+        while True:
+            batch = cursor.fetchmany(self.FETCH_BATCH_SIZE)
+            if not batch:
+                break
+            yield from batch
+    
+    def _iter_message_rows(self, cursor: sqlite3.Cursor) -> Iterator[Message]:
+        """Build Messages from joined message rows
         
-        cursor = self.conn.execute(query, (cocoa_cutoff, limit))
-        messages = []
-        
-        for row in cursor.fetchall():
-            message = Message(
-                id=row['id'],
-                text=row['text'],
-                date=self._cocoa_timestamp_to_datetime(row['date']),
-                is_from_me=bool(row['is_from_me']),
-                sender_id=row['sender_handle'],
-                chat_id=row['chat_id'],
-                guid=row['guid'],
-                service=row['service'] or 'iMessage'
+        Rows are plain tuples unpacked positionally (column order is fixed by
+        the SELECT). The query converts Cocoa nanoseconds to Unix seconds
+        (unix_ts), so only a single fromtimestamp() call is left per row.
+        """
+        epoch_fallback = datetime(1970, 1, 1)
+        
+        for mid, text, unix_ts, is_from_me, guid, service, chat_id, sender_handle in self._iter_rows(cursor):
+            yield Message(
+                id=mid,
+                text=text,
+                date=datetime.fromtimestamp(unix_ts) if unix_ts is not None else epoch_fallback,
+                is_from_me=bool(is_from_me),
+                sender_id=sender_handle,
+                chat_id=chat_id,
+                guid=guid,
+                service=service or 'iMessage'
             )
-            messages.append(message)
-        
-        return messages
     
     def get_chat_statistics(self) -> Dict[str, int]:
         """Get basic statistics about the database"""
@@ -260,24 +427,23 @@ class ChatDBParser:
         
         stats = {}
         
-        # Total messages
-        cursor = self.conn.execute("SELECT COUNT(*) FROM message WHERE text IS NOT NULL AND text != ''")
-        stats['total_messages'] = cursor.fetchone()[0]
-        
-        # Total chats
-        cursor = self.conn.execute("SELECT COUNT(*) FROM chat")
-        stats['total_chats'] = cursor.fetchone()[0]
-        
-        # Total handles
-        cursor = self.conn.execute("SELECT COUNT(*) FROM handle")
-        stats['total_handles'] = cursor.fetchone()[0]
-        
-        # Messages from me vs others
-        cursor = self.conn.execute("SELECT COUNT(*) FROM message WHERE is_from_me = 1 AND text IS NOT NULL")
-        stats['messages_from_me'] = cursor.fetchone()[0]
-        
-        cursor = self.conn.execute("SELECT COUNT(*) FROM message WHERE is_from_me = 0 AND text IS NOT NULL")
-        stats['messages_from_others'] = cursor.fetchone()[0]
+        # Message counts in a single scan (aggregate FILTER needs SQLite 3.30+)
+        cursor = self.conn.execute("""
+        SELECT
+            COUNT(*) FILTER (WHERE text IS NOT NULL AND text != ''),
+            COUNT(*) FILTER (WHERE is_from_me = 1 AND text IS NOT NULL),
+            COUNT(*) FILTER (WHERE is_from_me = 0 AND text IS NOT NULL)
+        FROM message
+        """)
+        (
+            stats['total_messages'],
+            stats['messages_from_me'],
+            stats['messages_from_others'],
+        ) = cursor.fetchone()
+        
+        # Chats and contacts (handles)
+        cursor = self.conn.execute("SELECT (SELECT COUNT(*) FROM chat), (SELECT COUNT(*) FROM handle)")
+        stats['total_chats'], stats['total_handles'] = cursor.fetchone()
         
         return stats
 
@@ -6,12 +6,23 @@ Provides both CLI and programmatic interfaces for chatting with your iMessage hi
 
 import os
 import sys
-from typing import Optional, Dict, Any
+import time
+import asyncio
+import threading
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
 from pathlib import Path
 import argparse
 
-from .pipeline import iMessageIndexer
-from .llm_integration import LLMManager, RAGSystem, ChatMessage
+try:
+    from prompt_toolkit import PromptSession
+    PROMPT_TOOLKIT_AVAILABLE = True
+except ImportError:
+    PROMPT_TOOLKIT_AVAILABLE = False
+
+# pipeline/llm_integration/reranker pull in numpy, chromadb and model
+# libraries; they're imported in iMessageChat.__init__ so `--help` stays fast
+if TYPE_CHECKING:
+    from .pipeline import iMessageIndexer
 
 
 class iMessageChat:
@@ -19,10 +30,13 @@ class iMessageChat:
     
     def __init__(
         self,
-        indexer: Optional[iMessageIndexer] = None,
+        indexer: Optional['iMessageIndexer'] = None,
         llm_type: str = 'ollama',
         llm_model: Optional[str] = None,
-        api_key: Optional[str] = None
+        api_key: Optional[str] = None,
+        vector_store_type: str = 'chromadb',
+        rerank: bool = False,
+        prompt_cache: bool = True
     ):
         """
         Initialize chat interface
@@ -32,13 +46,19 @@ class iMessageChat:
             llm_type: 'ollama', 'openai', or 'anthropic' 
             llm_model: Specific model name
             api_key: API key for cloud providers
+            vector_store_type: 'chromadb', 'faiss', or 'memory' (used when creating the indexer)
+            rerank: Rerank retrieved chunks with a cross-encoder before prompting
+            prompt_cache: Let the LLM provider reuse cached prompt prefixes across turns
         """
+        from .pipeline import iMessageIndexer
+        from .llm_integration import LLMManager, RAGSystem
+        from .reranker import Reranker
         
         # Initialize or use provided indexer
         if indexer is None:
             print("🔧 Initializing indexer...")
             self.indexer = iMessageIndexer(
-                vector_store_type='chromadb',
+                vector_store_type=vector_store_type,
                 cache_dir='.imessage_ai'
             )
             
@@ -58,7 +78,8 @@ class iMessageChat:
             self.llm = LLMManager.create_llm(
                 llm_type=llm_type,
                 model=llm_model,
-                api_key=api_key
+                api_key=api_key,
+                prompt_cache=prompt_cache
             )
             
             if not self.llm.is_available():
@@ -75,22 +96,39 @@ class iMessageChat:
             print(f"❌ Failed to initialize LLM: {e}")
             sys.exit(1)
         
+        # Optional cross-encoder reranker
+        self.reranker = None
+        if rerank:
+            try:
+                self.reranker = Reranker()
+                print(f"✅ Reranker ready ({self.reranker.model_name})")
+            except Exception as e:
+                print(f"⚠️  Reranker unavailable, using vector search order: {e}")
+        
         # Initialize RAG system if we have an indexer
         if self.indexer:
-            self.rag = RAGSystem(self.llm, self.indexer)
+            self.rag = RAGSystem(self.llm, self.indexer, reranker=self.reranker)
         else:
             self.rag = None
     
-    def ensure_indexed(self, days_limit: int = 30, force_reindex: bool = False) -> bool:
+    def ensure_indexed(self, days_limit: int = 30, force_reindex: bool = False, batch_size: int = 1000) -> bool:
         """Ensure messages are indexed and ready for chat"""
         if not self.indexer:
             return False
         
+        # A snapshot newer than chat.db means nothing changed since the last
+        # run; trust it instead of counting chunks in the vector store
+        snapshot = self.indexer.load_stats_snapshot()
+        if snapshot and snapshot['total_chunks'] > 0 and not force_reindex:
+            print(f"📊 Found {snapshot['total_chunks']} indexed chunks (up to date)")
+            return True
+        
         # Check if we already have a vector store
         try:
             stats = self.indexer.get_stats()
             if stats.get('vector_store', {}).get('total_chunks', 0) > 0 and not force_reindex:
                 print(f"📊 Found {stats['vector_store']['total_chunks']} indexed chunks")
+                self._update_index(batch_size)
                 return True
         except Exception:
             pass
@@ -100,13 +138,15 @@ class iMessageChat:
         try:
             metadata = self.indexer.run_full_index(
                 days_limit=days_limit,
-                save_index=True
+                save_index=True,
+                batch_size=batch_size
             )
             
             print(f"✅ Indexed {metadata['chunk_stats']['total_chunks']} message chunks")
             
             # Initialize RAG system
-            self.rag = RAGSystem(self.llm, self.indexer)
+            from .llm_integration import RAGSystem
+            self.rag = RAGSystem(self.llm, self.indexer, reranker=self.reranker)
             
             return True
             
@@ -114,6 +154,14 @@ class iMessageChat:
             print(f"❌ Indexing failed: {e}")
             return False
     
+    def _update_index(self, batch_size: int = 1000) -> None:
+        """Add messages that arrived since the last indexing run"""
+        try:
+            self.indexer.run_incremental_index(save_index=True, batch_size=batch_size)
+        except Exception as e:
+            # The existing index is still usable; --reindex rebuilds it
+            print(f"⚠️  Incremental update skipped: {e}")
+    
     def ask(self, question: str, **kwargs) -> Optional[str]:
         """Ask a question about your iMessage history"""
         if not self.rag:
@@ -134,38 +182,88 @@ class iMessageChat:
         
         try:
             response = self.rag.ask(question, **kwargs)
+            return self._format_response(response)
             
-            # Format sources
-            sources = []
-            for chunk in response.sources:
-                participants = ", ".join(chunk.participants[:2])
-                if len(chunk.participants) > 2:
-                    participants += f" (+{len(chunk.participants) - 2})"
-                
-                sources.append({
-                    'participants': participants,
-                    'time_range': f"{chunk.start_time.strftime('%Y-%m-%d %H:%M')} - {chunk.end_time.strftime('%H:%M')}",
-                    'message_count': len(chunk.messages),
-                    'preview': chunk.text_content[:150] + "..." if len(chunk.text_content) > 150 else chunk.text_content
-                })
-            
-            return {
-                'answer': response.answer,
-                'sources': sources,
-                'model': response.model_used,
-                'processing_time_ms': response.processing_time_ms
-            }
+        except Exception as e:
+            print(f"❌ Query failed: {e}")
+            return None
+    
+    async def aask_with_sources(self, question: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Async version of ask_with_sources() for running many questions concurrently"""
+        if not self.rag:
+            return None
+        
+        try:
+            response = await self.rag.aask(question, **kwargs)
+            return self._format_response(response)
             
         except Exception as e:
             print(f"❌ Query failed: {e}")
             return None
     
+    async def aask_many_with_sources(
+        self,
+        questions: List[str],
+        max_concurrency: int = 8
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Answer independent questions concurrently (without shared chat history)
+        
+        Retrieval for all questions is one batched search (RAGSystem.aask_many),
+        and the answers are not added to the interactive chat history.
+        """
+        if not self.rag:
+            return [None] * len(questions)
+        
+        try:
+            responses = await self.rag.aask_many(questions, max_concurrency=max_concurrency)
+            return [self._format_response(response) for response in responses]
+            
+        except Exception as e:
+            print(f"❌ Query failed: {e}")
+            return [None] * len(questions)
+    
+    def _format_response(self, response) -> Dict[str, Any]:
+        """Format a RAGResponse with its sources for display"""
+        return {
+            'answer': response.answer,
+            'sources': self._format_sources(response.sources),
+            'model': response.model_used,
+            'processing_time_ms': response.processing_time_ms
+        }
+    
+    def _format_sources(self, chunks) -> List[Dict[str, Any]]:
+        """Format source chunks for display"""
+        sources = []
+        for chunk in chunks:
+            sources.append({
+                'participants': chunk.participants_label,
+                'time_range': chunk.time_range,
+                'message_count': len(chunk.messages),
+                'preview': chunk.text_content[:150] + "..." if len(chunk.text_content) > 150 else chunk.text_content
+            })
+        
+        return sources
+    
     def start_interactive_chat(self):
         """Start interactive CLI chat session"""
+        try:
+            asyncio.run(self.astart_interactive_chat())
+        except KeyboardInterrupt:
+            print("\n👋 Goodbye!")
+    
+    async def astart_interactive_chat(self):
+        """Read questions and stream answers until the user quits
+        
+        Input is read with prompt_toolkit's prompt_async() when it is
+        installed (line editing and history), otherwise from a stdin thread;
+        either way the event loop stays free while waiting for the user.
+        """
         if not self.rag:
             print("❌ No indexed data available. Run indexing first.")
             return
         
+        read_question = PromptSession().prompt_async if PROMPT_TOOLKIT_AVAILABLE else self._read_line
+        
         print("\n🚀 iMessage AI Chat")
         print("=" * 30)
         print("Ask questions about your iMessage history!")
@@ -173,55 +271,95 @@ class iMessageChat:
         
         while True:
             try:
-                question = input("💬 You: ").strip()
-                
-                if not question:
-                    continue
-                
-                # Handle commands
-                if question.startswith('/'):
-                    if question == '/quit' or question == '/exit':
-                        print("👋 Goodbye!")
-                        break
-                    elif question == '/help':
-                        self._show_help()
-                        continue
-                    elif question == '/stats':
-                        self._show_stats()
-                        continue
-                    elif question == '/clear':
-                        self.rag.clear_history()
-                        print("🧹 Chat history cleared")
-                        continue
-                    else:
-                        print(f"Unknown command: {question}")
-                        continue
-                
-                # Process question
-                print("🤔 Thinking...")
-                
-                response_data = self.ask_with_sources(question)
-                if response_data:
-                    print(f"\n🤖 Assistant: {response_data['answer']}\n")
-                    
-                    # Show sources if available
-                    if response_data['sources']:
-                        print("📚 Sources:")
-                        for i, source in enumerate(response_data['sources'], 1):
-                            print(f"  {i}. {source['participants']} | {source['time_range']}")
-                            print(f"     {source['preview']}")
-                        
-                        print(f"\n⏱️  {response_data['processing_time_ms']}ms | {response_data['model']}")
-                    
-                    print()
-                else:
-                    print("❌ Sorry, I couldn't process your question.\n")
-            
-            except KeyboardInterrupt:
+                question = (await read_question("💬 You: ")).strip()
+            except EOFError:
                 print("\n👋 Goodbye!")
                 break
+            
+            if not question:
+                continue
+            
+            # Handle commands
+            if question.startswith('/'):
+                if question == '/quit' or question == '/exit':
+                    print("👋 Goodbye!")
+                    break
+                elif question == '/help':
+                    self._show_help()
+                elif question == '/stats':
+                    self._show_stats()
+                elif question == '/clear':
+                    self.rag.clear_history()
+                    print("🧹 Chat history cleared")
+                else:
+                    print(f"Unknown command: {question}")
+                continue
+            
+            # Process question
+            print("🤔 Thinking...")
+            
+            try:
+                await self._stream_answer(question)
             except Exception as e:
-                print(f"❌ Error: {e}\n")
+                print(f"\n❌ Error: {e}\n")
+    
+    async def _stream_answer(self, question: str):
+        """Stream an answer token by token, formatting its sources meanwhile"""
+        start_time = time.perf_counter()
+        
+        chunks = await self.rag.aretrieve(question)
+        
+        # Source formatting runs while the LLM is still decoding
+        sources_task = asyncio.create_task(asyncio.to_thread(self._format_sources, chunks))
+        
+        print("\n🤖 Assistant: ", end="", flush=True)
+        async for token in self.rag.astream(question, chunks=chunks):
+            print(token, end="", flush=True)
+        print("\n")
+        
+        sources = await sources_task
+        
+        # Show sources if available
+        if sources:
+            print("📚 Sources:")
+            for i, source in enumerate(sources, 1):
+                print(f"  {i}. {source['participants']} | {source['time_range']}")
+                print(f"     {source['preview']}")
+            
+            processing_time_ms = int((time.perf_counter() - start_time) * 1000)
+            print(f"\n⏱️  {processing_time_ms}ms | {getattr(self.llm, 'model', 'unknown')}")
+        
+        print()
+    
+    @staticmethod
+    def _read_line(prompt: str) -> "asyncio.Future[str]":
+        """Read a line from stdin without blocking the event loop
+        
+        Uses a daemon thread rather than the default executor so a pending
+        input() can't keep the process alive after Ctrl+C.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def _deliver(setter, value):
+            if not future.done():
+                setter(value)
+        
+        def _worker():
+            try:
+                line = input(prompt)
+            except BaseException as e:
+                result = (future.set_exception, e)
+            else:
+                result = (future.set_result, line)
+            
+            try:
+                loop.call_soon_threadsafe(_deliver, *result)
+            except RuntimeError:
+                pass  # Event loop already closed
+        
+        threading.Thread(target=_worker, daemon=True).start()
+        return future
     
     def _show_help(self):
         """Show help information"""
@@ -266,6 +404,11 @@ TIPS:
                 chunk_stats = stats['chunks']
                 print(f"  📝 Avg messages per chunk: {chunk_stats.get('avg_messages_per_chunk', 0):.1f}")
             
+            # Reranker cache
+            if self.reranker:
+                rerank_stats = self.reranker.get_cache_stats()
+                print(f"  🎯 Rerank cache: {rerank_stats['cache_hits']} hits, {rerank_stats['cache_misses']} misses")
+            
             # Chat history
             if self.rag:
                 chat_stats = self.rag.get_conversation_stats()
@@ -283,6 +426,8 @@ def main():
                        default='ollama', help='LLM provider')
     parser.add_argument('--model', help='Specific model name')
     parser.add_argument('--api-key', help='API key for cloud providers')
+    parser.add_argument('--vector-store', choices=['chromadb', 'faiss'], default='chromadb',
+                       help='Vector store backend')
     
     # Indexing options
     parser.add_argument('--index-days', type=int, default=30,
@@ -292,8 +437,13 @@ def main():
     
     # Chat options
     parser.add_argument('--question', help='Ask a single question and exit')
+    parser.add_argument('--questions', help='File with one question per line; answered concurrently')
     parser.add_argument('--show-sources', action='store_true',
                        help='Show source conversations for answers')
+    parser.add_argument('--rerank', action='store_true',
+                       help='Rerank retrieved conversations with a cross-encoder')
+    parser.add_argument('--no-prompt-cache', action='store_true',
+                       help='Disable LLM prompt prefix caching')
     
     args = parser.parse_args()
     
@@ -302,7 +452,10 @@ def main():
         chat = iMessageChat(
             llm_type=args.llm,
             llm_model=args.model,
-            api_key=args.api_key
+            api_key=args.api_key,
+            vector_store_type=args.vector_store,
+            rerank=args.rerank,
+            prompt_cache=not args.no_prompt_cache
         )
         
         # Ensure data is indexed
@@ -310,8 +463,27 @@ def main():
             print("❌ Failed to index messages. Cannot start chat.")
             return 1
         
+        # Batch mode: answer every question in the file concurrently
+        if args.questions:
+            with open(args.questions) as f:
+                questions = [line.strip() for line in f if line.strip()]
+            
+            responses = asyncio.run(chat.aask_many_with_sources(questions))
+            for question, response in zip(questions, responses):
+                print(f"Q: {question}")
+                if response:
+                    print(f"A: {response['answer']}\n")
+                    
+                    if args.show_sources and response['sources']:
+                        print("Sources:")
+                        for i, source in enumerate(response['sources'], 1):
+                            print(f"  {i}. {source['participants']} | {source['time_range']}")
+                        print()
+                else:
+                    print("No answer found.\n")
+        
         # Single question mode
-        if args.question:
+        elif args.question:
             if args.show_sources:
                 response = chat.ask_with_sources(args.question)
                 if response:
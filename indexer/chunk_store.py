@@ -0,0 +1,185 @@
+"""
+On-disk chunk store
+
+Keeps every indexed MessageChunk next to the vector store, so a search over
+an index loaded from disk can resolve result ids to full chunks without
+re-running indexing or keeping every chunk in memory. Each chat's chunk ids
+are recorded with a fingerprint of its messages, so a full re-index can
+reuse the chunks of chats that haven't changed.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .chat_db_parser import Message
+from .chunker import MessageChunk
+from ._io import json_dumps, json_loads
+
+
+class ChunkStore:
+    """SQLite table of chunks keyed by chunk id
+
+    One row per chunk; messages, participants and metadata are JSON columns.
+    Lookups are primary-key reads, so only the chunks a search returns are
+    ever loaded.
+    """
+
+    # Stay under SQLite's bound-parameter limit in IN (...) lookups
+    LOOKUP_BATCH_SIZE = 900
+
+    def __init__(self, path: Path):
+        """
+        Initialize chunk store
+
+        Args:
+            path: SQLite file holding the chunks (created if missing)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()  # Written from the indexing writer thread
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                chat_id INTEGER NOT NULL,
+                chunk_type TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                participants TEXT NOT NULL,
+                text_content TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                messages TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chats (
+                chat_id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def put_many(self, chunks: Iterable[MessageChunk]) -> None:
+        """Insert chunks, replacing any stored under the same id"""
+        rows = [
+            (
+                chunk.id,
+                chunk.chat_id,
+                chunk.chunk_type,
+                chunk.start_time_iso,
+                chunk.end_time_iso,
+                json_dumps(chunk.participants),
+                chunk.text_content,
+                json_dumps(chunk.metadata),
+                json_dumps([
+                    [msg.id, msg.text, msg.date.isoformat(), msg.is_from_me,
+                     msg.sender_id, msg.chat_id, msg.guid, msg.service]
+                    for msg in chunk.messages
+                ])
+            )
+            for chunk in chunks
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def get_many(self, chunk_ids: List[str]) -> Dict[str, MessageChunk]:
+        """Look up chunks by id; unknown ids are absent from the result"""
+        found = {}
+        # Chunks of one chat share a participants tuple, as when chunked
+        participants_by_json: Dict[str, tuple] = {}
+
+        with self._lock:
+            unique_ids = list(dict.fromkeys(chunk_ids))
+            rows = []
+            for start in range(0, len(unique_ids), self.LOOKUP_BATCH_SIZE):
+                batch = unique_ids[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows.extend(self._conn.execute(
+                    f"SELECT * FROM chunks WHERE id IN ({placeholders})", batch
+                ))
+
+        for chunk_id, chat_id, chunk_type, start_time, end_time, participants, text_content, metadata, messages in rows:
+            if participants not in participants_by_json:
+                participants_by_json[participants] = tuple(json_loads(participants))
+
+            found[chunk_id] = MessageChunk(
+                id=chunk_id,
+                chat_id=chat_id,
+                messages=[
+                    Message(
+                        id=mid,
+                        text=text,
+                        date=datetime.fromisoformat(date),
+                        is_from_me=is_from_me,
+                        sender_id=sender_id,
+                        chat_id=msg_chat_id,
+                        guid=guid,
+                        service=service
+                    )
+                    for mid, text, date, is_from_me, sender_id, msg_chat_id, guid, service in json_loads(messages)
+                ],
+                start_time=datetime.fromisoformat(start_time),
+                end_time=datetime.fromisoformat(end_time),
+                participants=participants_by_json[participants],
+                text_content=text_content,
+                chunk_type=chunk_type,
+                metadata=json_loads(metadata)
+            )
+
+        return found
+
+    def delete_many(self, chunk_ids: List[str]) -> None:
+        """Remove chunks by id"""
+        with self._lock:
+            for start in range(0, len(chunk_ids), self.LOOKUP_BATCH_SIZE):
+                batch = chunk_ids[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+            self._conn.commit()
+
+    def get_chat(self, chat_id: int) -> Optional[Tuple[str, List[str]]]:
+        """(fingerprint, chunk ids) recorded for a chat by the last full index"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, chunk_ids FROM chats WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return (row[0], json_loads(row[1])) if row else None
+
+    def replace_chats(self, chats: Dict[int, Tuple[str, List[str]]]) -> None:
+        """Record each chat's fingerprint and chunk ids, and drop every chunk
+        that no chat references any more
+
+        Args:
+            chats: chat_id -> (fingerprint, chunk ids) for every indexed chat
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM chats")
+            self._conn.executemany(
+                "INSERT INTO chats (chat_id, fingerprint, chunk_ids) VALUES (?, ?, ?)",
+                [(chat_id, fingerprint, json_dumps(chunk_ids)) for chat_id, (fingerprint, chunk_ids) in chats.items()]
+            )
+
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_chunks (id TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM live_chunks")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO live_chunks (id) VALUES (?)",
+                [(chunk_id,) for _, chunk_ids in chats.values() for chunk_id in chunk_ids]
+            )
+            self._conn.execute("DELETE FROM chunks WHERE id NOT IN (SELECT id FROM live_chunks)")
+            self._conn.execute("DELETE FROM live_chunks")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove all stored chunks"""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM chats")
+            self._conn.commit()
@@ -4,10 +4,35 @@ Message chunking for iMessage conversations
 Groups messages into semantically meaningful chunks for embedding and retrieval.
 """
 
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime, timedelta
+import numpy as np
+from typing import List, Dict, Optional, Tuple, Iterable
+from datetime import datetime
 from dataclasses import dataclass
+from functools import cached_property
 from .chat_db_parser import Message, Chat
+from ._chunker_kernels import split_time, split_daily, split_speaker
+
+
+# Simple heuristics for media messages
+_MEDIA_INDICATORS = (
+    'attachment:', 'image:', 'video:', 'audio:',
+    '\ufffc',  # Object replacement character (media placeholder)
+    'shared a',
+)
+
+
+def _contains_media(text: str) -> bool:
+    """Case-insensitive test for any media indicator
+    
+    casefold() plus plain substring tests run in C over the whole string; an
+    IGNORECASE regex alternation is several times slower per character.
+    """
+    folded = text.casefold()
+    return any(indicator in folded for indicator in _MEDIA_INDICATORS)
+
+
+# Display names for Message.speaker values that aren't a handle
+_SPEAKER_LABELS = {'me': 'Me', None: 'Unknown'}
 
 
 @dataclass
@@ -18,14 +43,44 @@ class MessageChunk:
     messages: List[Message]
     start_time: datetime
     end_time: datetime
-    participants: List[str]
+    participants: Tuple[str, ...]  # Shared by all chunks of a chat
     text_content: str  # Combined text for embedding
     chunk_type: str  # 'conversation_window', 'topic_shift', 'daily_group'
     metadata: Dict  # Additional context
+    
+    # ISO timestamps are formatted once per chunk, however many stores or
+    # snapshots serialize it
+    @cached_property
+    def start_time_iso(self) -> str:
+        return self.start_time.isoformat()
+    
+    @cached_property
+    def end_time_iso(self) -> str:
+        return self.end_time.isoformat()
+    
+    # Display fields for search results and sources, formatted once per chunk
+    # rather than on every request that returns it
+    @cached_property
+    def time_range(self) -> str:
+        """'YYYY-MM-DD HH:MM - HH:MM'"""
+        s, e = self.start_time, self.end_time
+        return f"{s.year:04d}-{s.month:02d}-{s.day:02d} {s.hour:02d}:{s.minute:02d} - {e.hour:02d}:{e.minute:02d}"
+    
+    @cached_property
+    def participants_label(self) -> str:
+        """First two participants, plus a count of the rest"""
+        label = ", ".join(self.participants[:2])
+        if len(self.participants) > 2:
+            label += f" (+{len(self.participants) - 2})"
+        return label
 
 
 class MessageChunker:
-    """Chunks messages into semantic groups for embedding"""
+    """Chunks messages into semantic groups for embedding
+    
+    All chunking methods expect the messages of a single chat sorted by
+    `date` ascending (as produced by iMessageIndexer._group_messages_by_chat).
+    """
     
     def __init__(
         self,
@@ -39,138 +94,151 @@ class MessageChunker:
         self.min_messages_per_chunk = min_messages_per_chunk
         self.topic_shift_threshold = topic_shift_threshold
     
-    def chunk_by_time_windows(self, messages: List[Message], chat: Chat) -> List[MessageChunk]:
-        """Group messages by time windows (conversation sessions)"""
+    def chunk_by_time_windows(self, messages: Iterable[Message], chat: Chat) -> List[MessageChunk]:
+        """Group messages by time windows (conversation sessions)
+        
+        A chunk ends at the first time gap larger than the window once it has
+        min_messages_per_chunk messages, or when it reaches
+        max_messages_per_chunk. Boundaries come from _chunker_kernels.
+        """
+        messages = messages if isinstance(messages, list) else list(messages)
         if not messages:
             return []
         
+        # Per-chat values shared by every chunk
+        chat_label = self._chat_label(chat)
+        participants = tuple(chat.participants)
+        
         chunks = []
-        current_chunk_messages = []
-        window_start = messages[0].date
+        dates = self._date_column(messages).view(np.int64)
+        window_us = self.time_window_minutes * 60 * 1_000_000
+        split_points = split_time(
+            dates, window_us, self.max_messages_per_chunk, self.min_messages_per_chunk
+        )
         
-        for message in messages:
-            # Check if we should start a new chunk
-            time_gap = message.date - (current_chunk_messages[-1].date if current_chunk_messages else window_start)
-            should_split = (
-                time_gap > timedelta(minutes=self.time_window_minutes) or
-                len(current_chunk_messages) >= self.max_messages_per_chunk
+        chunk_start = 0
+        for chunk_end in split_points.tolist():
+            chunk = self._create_chunk(
+                messages[chunk_start:chunk_end], 
+                chat, 
+                'conversation_window',
+                chat_label,
+                participants
             )
-            
-            if should_split and len(current_chunk_messages) >= self.min_messages_per_chunk:
-                # Create chunk from current messages
-                chunk = self._create_chunk(
-                    current_chunk_messages, 
-                    chat, 
-                    'conversation_window'
-                )
-                chunks.append(chunk)
-                current_chunk_messages = []
-                window_start = message.date
-            
-            current_chunk_messages.append(message)
+            chunks.append(chunk)
+            chunk_start = chunk_end
+        
+        current_chunk_messages = messages[chunk_start:]
         
         # Handle remaining messages
+        if not current_chunk_messages:
+            return chunks
+        
         if len(current_chunk_messages) >= self.min_messages_per_chunk:
             chunk = self._create_chunk(
                 current_chunk_messages, 
                 chat, 
-                'conversation_window'
+                'conversation_window',
+                chat_label,
+                participants
             )
             chunks.append(chunk)
         elif chunks:  # Add to last chunk if too few messages
-            chunks[-1].messages.extend(current_chunk_messages)
-            chunks[-1].end_time = current_chunk_messages[-1].date
-            chunks[-1].text_content = self._combine_message_text(chunks[-1].messages)
+            last_chunk = chunks[-1]
+            last_chunk.messages.extend(current_chunk_messages)
+            last_chunk.end_time = current_chunk_messages[-1].date
+            
+            # Append only the new lines instead of re-formatting the whole chunk
+            new_parts = [part for part in map(self._format_one, current_chunk_messages) if part]
+            if new_parts:
+                last_chunk.text_content = '\n'.join(filter(None, [last_chunk.text_content, *new_parts]))
         
         return chunks
     
-    def chunk_by_daily_groups(self, messages: List[Message], chat: Chat) -> List[MessageChunk]:
+    def chunk_by_daily_groups(self, messages: Iterable[Message], chat: Chat) -> List[MessageChunk]:
         """Group messages by day"""
+        messages = messages if isinstance(messages, list) else list(messages)
         if not messages:
             return []
         
-        chunks = []
-        current_day = None
-        current_chunk_messages = []
+        # Per-chat values shared by every chunk
+        chat_label = self._chat_label(chat)
+        participants = tuple(chat.participants)
         
-        for message in messages:
-            message_day = message.date.date()
-            
-            # Check if we've moved to a new day
-            if current_day and message_day != current_day:
-                if len(current_chunk_messages) >= self.min_messages_per_chunk:
-                    chunk = self._create_chunk(
-                        current_chunk_messages,
-                        chat,
-                        'daily_group'
-                    )
-                    chunks.append(chunk)
-                current_chunk_messages = []
-            
-            current_day = message_day
-            current_chunk_messages.append(message)
+        days = self._date_column(messages).astype('datetime64[D]').view(np.int64)
+        split_points = split_daily(days).tolist()
         
-        # Handle remaining messages
-        if len(current_chunk_messages) >= self.min_messages_per_chunk:
-            chunk = self._create_chunk(
-                current_chunk_messages,
-                chat,
-                'daily_group'
-            )
-            chunks.append(chunk)
+        chunks = []
+        for chunk_start, chunk_end in zip([0] + split_points, split_points + [len(messages)]):
+            # Days with too few messages are skipped
+            if chunk_end - chunk_start >= self.min_messages_per_chunk:
+                chunk = self._create_chunk(
+                    messages[chunk_start:chunk_end],
+                    chat,
+                    'daily_group',
+                    chat_label,
+                    participants
+                )
+                chunks.append(chunk)
         
         return chunks
     
-    def chunk_by_participants(self, messages: List[Message], chat: Chat) -> List[MessageChunk]:
+    def chunk_by_participants(self, messages: Iterable[Message], chat: Chat) -> List[MessageChunk]:
         """Group messages by conversation turns (when participants change)"""
+        messages = messages if isinstance(messages, list) else list(messages)
         if not messages:
             return []
         
-        chunks = []
-        current_chunk_messages = []
-        current_speaker = None
+        # Per-chat values shared by every chunk
+        chat_label = self._chat_label(chat)
+        participants = tuple(chat.participants)
         
-        for message in messages:
-            speaker = message.sender_id if not message.is_from_me else 'me'
-            
-            # Check for speaker change or chunk size limit
-            should_split = (
-                current_speaker and speaker != current_speaker or
-                len(current_chunk_messages) >= self.max_messages_per_chunk
-            )
-            
-            if should_split and len(current_chunk_messages) >= self.min_messages_per_chunk:
+        # Intern speakers to int ids; unknown senders are -1 and never start a turn
+        speaker_index = {}
+        speaker_ids = np.array([
+            -1 if not speaker else speaker_index.setdefault(speaker, len(speaker_index))
+            for speaker in (msg.speaker for msg in messages)
+        ], dtype=np.int32)
+        split_points = split_speaker(
+            speaker_ids, self.max_messages_per_chunk, self.min_messages_per_chunk
+        ).tolist()
+        
+        chunks = []
+        for chunk_start, chunk_end in zip([0] + split_points, split_points + [len(messages)]):
+            # Every split group meets the minimum; only the tail can fall short
+            if chunk_end - chunk_start >= self.min_messages_per_chunk:
                 chunk = self._create_chunk(
-                    current_chunk_messages,
+                    messages[chunk_start:chunk_end],
                     chat,
-                    'participant_turn'
+                    'participant_turn',
+                    chat_label,
+                    participants
                 )
                 chunks.append(chunk)
-                current_chunk_messages = []
-            
-            current_speaker = speaker
-            current_chunk_messages.append(message)
-        
-        # Handle remaining messages
-        if len(current_chunk_messages) >= self.min_messages_per_chunk:
-            chunk = self._create_chunk(
-                current_chunk_messages,
-                chat,
-                'participant_turn'
-            )
-            chunks.append(chunk)
         
         return chunks
     
-    def chunk_messages_adaptive(self, messages: List[Message], chat: Chat) -> List[MessageChunk]:
+    @staticmethod
+    def _chat_label(chat: Chat) -> str:
+        """Display name for a chat, falling back to its first participants"""
+        return chat.display_name or ', '.join(chat.participants[:3])
+    
+    @staticmethod
+    def _date_column(messages: List[Message]) -> np.ndarray:
+        """Message dates as a datetime64[us] column (AoS -> SoA)"""
+        return np.array([msg.date for msg in messages], dtype='datetime64[us]')
+    
+    def chunk_messages_adaptive(self, messages: Iterable[Message], chat: Chat) -> List[MessageChunk]:
         """Adaptively chunk messages using the best strategy for the chat type"""
-        if not messages:
-            return []
-        
         # Choose strategy based on chat characteristics
         if len(chat.participants) <= 2:
             # 1:1 chat - use time windows
             return self.chunk_by_time_windows(messages, chat)
+        
+        # Group strategy depends on the message count, so materialize here
+        messages = list(messages)
+        if not messages:
+            return []
         elif len(messages) > 1000:
             # Large group chat - use daily groups
             return self.chunk_by_daily_groups(messages, chat)
@@ -182,33 +250,65 @@ class MessageChunker:
         self, 
         messages: List[Message], 
         chat: Chat, 
-        chunk_type: str
+        chunk_type: str,
+        chat_label: Optional[str] = None,
+        participants: Optional[Tuple[str, ...]] = None
     ) -> MessageChunk:
-        """Create a MessageChunk from a list of messages"""
+        """
+        Create a MessageChunk from a list of messages
+        
+        Args:
+            messages: The chunk's messages, sorted by date
+            chat: The chat the messages belong to
+            chunk_type: Chunk type recorded on the chunk
+            chat_label: Precomputed _chat_label(chat), shared across a chat's chunks
+            participants: Precomputed tuple(chat.participants), shared likewise
+        """
         if not messages:
             raise ValueError("Cannot create chunk from empty messages list")
         
         # Generate unique chunk ID
         chunk_id = f"chat_{chat.id}_{chunk_type}_{messages[0].id}_{messages[-1].id}"
         
-        # Combine message text
-        text_content = self._combine_message_text(messages)
+        # Messages are sorted by date (class precondition), so the time range
+        # is just the endpoints
+        assert messages[0].date <= messages[-1].date, "messages must be sorted by date"
+        start_time = messages[0].date
+        end_time = messages[-1].date
+        
+        # Single pass over the messages for the embedding text and metadata aggregates
+        parts = []
+        texts = []
+        senders = set()
+        total_text_length = 0
+        format_one = self._format_one
+        
+        for msg in messages:
+            text = msg.text
+            
+            senders.add(msg.speaker)
+            
+            if text:
+                total_text_length += len(text)
+                texts.append(text)
+                
+                part = format_one(msg)
+                if part:
+                    parts.append(part)
         
-        # Calculate time range
-        start_time = min(msg.date for msg in messages)
-        end_time = max(msg.date for msg in messages)
+        text_content = '\n'.join(parts)
+        # One media scan per chunk; no indicator spans a newline, so joining
+        # the texts can't create a match across messages
+        has_media = _contains_media('\n'.join(texts))
         
         # Generate metadata
         metadata = {
             'message_count': len(messages),
-            'unique_senders': len(set(
-                msg.sender_id if not msg.is_from_me else 'me' 
-                for msg in messages
-            )),
-            'has_media': any(self._message_has_media(msg) for msg in messages),
-            'avg_message_length': sum(len(msg.text or '') for msg in messages) / len(messages),
+            'unique_senders': len(senders),
+            'has_media': has_media,
+            'avg_message_length': total_text_length / len(messages),
             'chat_style': chat.style,
-            'chat_name': chat.display_name or ', '.join(chat.participants[:3])
+            'chat_name': chat_label if chat_label is not None else self._chat_label(chat)
         }
         
         return MessageChunk(
@@ -217,7 +317,7 @@ class MessageChunker:
             messages=messages,
             start_time=start_time,
             end_time=end_time,
-            participants=chat.participants,
+            participants=participants if participants is not None else tuple(chat.participants),
             text_content=text_content,
             chunk_type=chunk_type,
             metadata=metadata
@@ -225,36 +325,29 @@ class MessageChunker:
     
     def _combine_message_text(self, messages: List[Message]) -> str:
         """Combine messages into a single text string for embedding"""
-        combined_parts = []
-        
-        for msg in messages:
-            if not msg.text or msg.text.strip() == '':
-                continue
-            
-            # Format: "Sender: Message text"
-            sender = 'Me' if msg.is_from_me else (msg.sender_id or 'Unknown')
-            timestamp = msg.date.strftime('%Y-%m-%d %H:%M')
-            
-            # Create readable message format
-            part = f"[{timestamp}] {sender}: {msg.text.strip()}"
-            combined_parts.append(part)
+        format_one = self._format_one
+        return '\n'.join(part for part in map(format_one, messages) if part)
+    
+    @staticmethod
+    def _format_one(msg: Message) -> Optional[str]:
+        """One message as an embedding text line, or None if it has no text"""
+        text = msg.text.strip() if msg.text else ''
+        if not text:
+            return None
         
-        return '\n'.join(combined_parts)
+        # Format: "[YYYY-MM-DD HH:MM] Sender: Message text"
+        # (zero-padded fields instead of strftime, which re-parses the format per call)
+        speaker = msg.speaker
+        sender = _SPEAKER_LABELS.get(speaker, speaker)
+        d = msg.date
+        return f"[{d.year:04d}-{d.month:02d}-{d.day:02d} {d.hour:02d}:{d.minute:02d}] {sender}: {text}"
     
     def _message_has_media(self, message: Message) -> bool:
         """Check if message contains media (simplified heuristic)"""
         if not message.text:
             return False
         
-        # Simple heuristics for media messages
-        media_indicators = [
-            'attachment:', 'image:', 'video:', 'audio:',
-            '\ufffc',  # Object replacement character (media placeholder)
-            'shared a',
-        ]
-        
-        text_lower = message.text.lower()
-        return any(indicator in text_lower for indicator in media_indicators)
+        return _contains_media(message.text)
     
     def get_chunking_stats(self, chunks: List[MessageChunk]) -> Dict:
         """Get statistics about the chunking results"""
@@ -5,11 +5,18 @@ Generates vector embeddings for semantic search and retrieval.
 Supports both local models (sentence-transformers) and cloud APIs (OpenAI).
 """
 
+import re
+import random
+import asyncio
+import base64
 import hashlib
-import json
+import sqlite3
+import threading
+import functools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Union, Tuple
 from dataclasses import dataclass
-import pickle
 from pathlib import Path
 
 try:
@@ -18,34 +25,197 @@ try:
 except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+# Caught around local mini-batches; nothing to catch without torch
+_OOM_ERRORS = (torch.cuda.OutOfMemoryError,) if TORCH_AVAILABLE else ()
+
 try:
     import openai
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
 from .chunker import MessageChunk
+from ._search_kernels import int8_scores, int8_topk, top_k_indices
+from ._io import atomic_open, atomic_path, read_json, write_json_atomic
+
+
+@functools.lru_cache(maxsize=4)
+def _load_sentence_transformer(model_name: str) -> 'SentenceTransformer':
+    """Load a local model once per process; every EmbeddingGenerator shares it"""
+    return SentenceTransformer(model_name)
 
 
 @dataclass
 class EmbeddingResult:
     """Result of embedding generation"""
     chunk_id: str
-    embedding: List[float]
+    embedding: np.ndarray  # float32, shape (embedding_dim,)
     model_name: str
     embedding_dim: int
     text_hash: str  # Hash of input text for caching
 
 
+class EmbeddingCache:
+    """On-disk embedding cache for one model
+    
+    Embeddings are rows of a single append-only float32 matrix file, read
+    through a memory map; a SQLite table maps text hash -> row. A batch
+    lookup is one indexed query plus one fancy-index gather, instead of a
+    pickle file open + load per chunk.
+    """
+    
+    # Stay under SQLite's bound-parameter limit in IN (...) lookups
+    LOOKUP_BATCH_SIZE = 900
+    
+    def __init__(self, cache_dir: Path, name: str, embedding_dim: int):
+        """
+        Initialize embedding cache
+        
+        Args:
+            cache_dir: Directory holding the cache files
+            name: File name stem, unique per model
+            embedding_dim: Dimension of the cached embeddings
+        """
+        self.embedding_dim = embedding_dim
+        self.matrix_path = cache_dir / f"{name}.f32"
+        self.index_path = cache_dir / f"{name}.sqlite"
+        
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None  # Re-mapped after appends
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (text_hash TEXT PRIMARY KEY, row INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def _rows_on_disk(self) -> int:
+        """Complete rows in the matrix file (a torn final write is ignored)"""
+        if not self.matrix_path.exists():
+            return 0
+        return self.matrix_path.stat().st_size // (self.embedding_dim * 4)
+    
+    def _mapped_matrix(self) -> np.memmap:
+        if self._matrix is None:
+            self._matrix = np.memmap(
+                self.matrix_path, dtype=np.float32, mode='r',
+                shape=(self._rows_on_disk(), self.embedding_dim)
+            )
+        return self._matrix
+    
+    def get_many(self, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Look up cached embeddings; missing hashes are absent from the result"""
+        found = {}
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(text_hashes))
+            for start in range(0, len(unique_hashes), self.LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT text_hash, row FROM embeddings WHERE text_hash IN ({placeholders})", batch
+                ))
+            
+            if not found:
+                return {}
+            
+            hashes = list(found)
+            rows = self._mapped_matrix()[[found[text_hash] for text_hash in hashes]]
+        return dict(zip(hashes, rows))
+    
+    def put_many(self, text_hashes: List[str], embeddings: np.ndarray) -> None:
+        """Append embeddings for hashes that aren't cached yet"""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.embedding_dim:
+            raise ValueError(f"Expected embeddings of dimension {self.embedding_dim}, got shape {embeddings.shape}")
+        
+        with self._lock:
+            # Keep only the first occurrence of each uncached hash
+            existing = set()
+            unique_hashes = list(dict.fromkeys(text_hashes))
+            for start in range(0, len(unique_hashes), self.LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                existing.update(text_hash for (text_hash,) in self._conn.execute(
+                    f"SELECT text_hash FROM embeddings WHERE text_hash IN ({placeholders})", batch
+                ))
+            
+            new_positions = {}
+            for i, text_hash in enumerate(text_hashes):
+                if text_hash not in existing and text_hash not in new_positions:
+                    new_positions[text_hash] = i
+            if not new_positions:
+                return
+            
+            # Write the rows before indexing them, so the index never points
+            # past the end of the file; start at the last complete row
+            first_row = self._rows_on_disk()
+            with open(self.matrix_path, 'r+b' if self.matrix_path.exists() else 'wb') as f:
+                f.seek(first_row * self.embedding_dim * 4)
+                f.truncate()
+                f.write(embeddings[list(new_positions.values())].tobytes())
+            
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (text_hash, row) VALUES (?, ?)",
+                [(text_hash, first_row + n) for n, text_hash in enumerate(new_positions)]
+            )
+            self._conn.commit()
+            self._matrix = None
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    
+    def size_bytes(self) -> int:
+        """Disk space used by the matrix and index files"""
+        return sum(path.stat().st_size for path in (self.matrix_path, self.index_path) if path.exists())
+    
+    def clear(self) -> None:
+        """Remove all cached embeddings"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._matrix = None
+            self.matrix_path.unlink(missing_ok=True)
+
+
 class EmbeddingGenerator:
     """Generates embeddings for message chunks"""
     
+    # OpenAI requests: texts per request, concurrent requests, and retries
+    # (exponential backoff) on rate limits / transient errors
+    OPENAI_BATCH_SIZE = 256
+    OPENAI_MAX_CONCURRENCY = 8
+    OPENAI_MAX_RETRIES = 5
+    OPENAI_START_JITTER_SECONDS = 0.05  # Spreads out the first wave of concurrent requests
+    
+    # Local mini-batches also stop at this many characters, so a batch of
+    # long chunks doesn't run the GPU out of memory
+    LOCAL_BATCH_CHAR_BUDGET = 150_000
+    
     def __init__(
         self, 
         model_type: str = 'local',
         model_name: Optional[str] = None,
         cache_dir: Optional[str] = None,
-        openai_api_key: Optional[str] = None
+        openai_api_key: Optional[str] = None,
+        batch_size: int = 64
     ):
         """
         Initialize embedding generator
@@ -55,8 +225,12 @@ class EmbeddingGenerator:
             model_name: Specific model name or None for defaults
             cache_dir: Directory to cache embeddings
             openai_api_key: OpenAI API key if using OpenAI embeddings
+            batch_size: Texts per forward pass for the local model
         """
         self.model_type = model_type
+        self.batch_size = batch_size
+        # Texts embedded one by one after a mini-batch ran out of GPU memory
+        self.oom_fallback_count = 0
         self.cache_dir = Path(cache_dir) if cache_dir else Path('.embeddings_cache')
         self.cache_dir.mkdir(exist_ok=True)
         
@@ -66,7 +240,7 @@ class EmbeddingGenerator:
             
             # Default local model - good balance of speed and quality
             self.model_name = model_name or 'all-MiniLM-L6-v2'
-            self.model = SentenceTransformer(self.model_name)
+            self.model = _load_sentence_transformer(self.model_name)
             self.embedding_dim = self.model.get_sentence_embedding_dimension()
             
         elif model_type == 'openai':
@@ -74,30 +248,46 @@ class EmbeddingGenerator:
                 raise ImportError("openai not installed. Run: pip install openai")
             
             self.model_name = model_name or 'text-embedding-ada-002'
+            self.openai_api_key = openai_api_key
             self.openai_client = openai.OpenAI(api_key=openai_api_key)
             self.embedding_dim = 1536  # Ada-002 dimension
             
         else:
             raise ValueError(f"Unsupported model_type: {model_type}")
+        
+        # Keys from different hash functions never match, so each gets its own cache
+        self.text_hash_name = 'xxh3' if XXHASH_AVAILABLE else 'blake2b'
+        cache_name = re.sub(r'[^\w.-]', '_', f"{self.model_type}_{self.model_name}_{self.text_hash_name}")
+        self._cache = EmbeddingCache(self.cache_dir, cache_name, self.embedding_dim)
     
     def embed_chunks(self, chunks: List[MessageChunk], use_cache: bool = True) -> List[EmbeddingResult]:
         """Generate embeddings for a list of message chunks"""
-        results = []
-        texts_to_embed = []
+        # Filled by position so the output keeps the input order
+        results: List[Optional[EmbeddingResult]] = [None] * len(chunks)
         cache_misses = []
+        # Hashed once per chunk; reused for the cache lookup and every result
+        text_hashes = [self._text_hash(chunk.text_content) for chunk in chunks]
+        cached = self._cache.get_many(text_hashes) if use_cache else {}
         
-        # Check cache first if enabled
-        if use_cache:
-            for i, chunk in enumerate(chunks):
-                cached_result = self._load_from_cache(chunk.text_content)
-                if cached_result:
-                    results.append(cached_result)
-                else:
-                    cache_misses.append((i, chunk))
+        # Identical texts (short replies, forwards) are embedded once
+        texts_to_embed = []
+        embed_rows: Dict[str, int] = {}  # text hash -> row in texts_to_embed
+        
+        for i, (chunk, text_hash) in enumerate(zip(chunks, text_hashes)):
+            embedding = cached.get(text_hash)
+            if embedding is not None:
+                results[i] = EmbeddingResult(
+                    chunk_id=chunk.id,
+                    embedding=embedding,
+                    model_name=self.model_name,
+                    embedding_dim=len(embedding),
+                    text_hash=text_hash
+                )
+            else:
+                cache_misses.append((i, chunk))
+                if text_hash not in embed_rows:
+                    embed_rows[text_hash] = len(texts_to_embed)
                     texts_to_embed.append(chunk.text_content)
-        else:
-            cache_misses = [(i, chunk) for i, chunk in enumerate(chunks)]
-            texts_to_embed = [chunk.text_content for chunk in chunks]
         
         # Generate embeddings for cache misses
         if texts_to_embed:
@@ -106,132 +296,402 @@ class EmbeddingGenerator:
             elif self.model_type == 'openai':
                 embeddings = self._embed_openai(texts_to_embed)
             
-            # Create results and cache them
-            for (original_idx, chunk), embedding in zip(cache_misses, embeddings):
+            # Create results
+            new_results = []
+            for original_idx, chunk in cache_misses:
+                embedding = embeddings[embed_rows[text_hashes[original_idx]]]
                 result = EmbeddingResult(
                     chunk_id=chunk.id,
                     embedding=embedding,
                     model_name=self.model_name,
                     embedding_dim=len(embedding),
-                    text_hash=self._text_hash(chunk.text_content)
+                    text_hash=text_hashes[original_idx]
                 )
-                
-                if use_cache:
-                    self._save_to_cache(chunk.text_content, result)
-                
-                results.append(result)
-        
-        # Sort results back to original order
-        results.sort(key=lambda r: next(i for i, chunk in enumerate(chunks) if chunk.id == r.chunk_id))
+                results[original_idx] = result
+                new_results.append(result)
+            
+            if use_cache:
+                self._save_to_cache(new_results)
         
         return results
     
-    def embed_text(self, text: str) -> List[float]:
+    async def aembed_chunks(self, chunks: List[MessageChunk], use_cache: bool = True) -> List[EmbeddingResult]:
+        """Async version of embed_chunks() that runs off the event loop"""
+        return await asyncio.to_thread(self.embed_chunks, chunks, use_cache)
+    
+    def embed_text(self, text: str) -> np.ndarray:
         """Generate embedding for a single text string"""
+        return self.embed_texts([text])[0]
+    
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for several texts in one batch (one row each)"""
         if self.model_type == 'local':
-            return self._embed_local([text])[0]
+            return self._embed_local(texts)
         elif self.model_type == 'openai':
-            return self._embed_openai([text])[0]
-    
-    def _embed_local(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using local sentence-transformers model"""
-        embeddings = self.model.encode(texts, normalize_embeddings=True)
-        return embeddings.tolist()
-    
-    def _embed_openai(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using OpenAI API"""
-        response = self.openai_client.embeddings.create(
-            model=self.model_name,
-            input=texts
+            return self._embed_openai(texts)
+    
+    def _embed_local(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings using local sentence-transformers model
+        
+        Texts are grouped into mini-batches of similar token length, so a
+        batch isn't padded out to one long outlier, then put back in order.
+        A mini-batch that runs out of GPU memory is retried one text at a time.
+        """
+        if len(texts) <= 1:
+            return np.asarray(self._encode_local(texts), dtype=np.float32)
+        
+        order = np.argsort(self._token_lengths(texts), kind='stable')
+        batches = self._pack_local_batches(texts, order)
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        fallbacks_before = self.oom_fallback_count
+        
+        if self._on_cuda():
+            self._embed_local_prefetched(texts, batches, embeddings)
+        else:
+            for batch in batches:
+                try:
+                    embeddings[batch] = self._encode_local([texts[i] for i in batch])
+                except _OOM_ERRORS:
+                    self._embed_each_local(texts, batch, embeddings)
+        
+        fallbacks = self.oom_fallback_count - fallbacks_before
+        if fallbacks:
+            print(f"⚠️  Out of GPU memory: embedded {fallbacks}/{len(texts)} texts ({fallbacks / len(texts):.2%}) one at a time")
+        
+        return embeddings
+    
+    def _pack_local_batches(self, texts: List[str], order: np.ndarray) -> List[np.ndarray]:
+        """Split texts (in the given order) into mini-batches of at most
+        batch_size texts and LOCAL_BATCH_CHAR_BUDGET characters
+        
+        A text longer than the budget gets a batch of its own.
+        """
+        batches = []
+        start = 0
+        chars = 0
+        for end, i in enumerate(order.tolist()):
+            text_chars = len(texts[i])
+            if end > start and (end - start >= self.batch_size or chars + text_chars > self.LOCAL_BATCH_CHAR_BUDGET):
+                batches.append(order[start:end])
+                start = end
+                chars = 0
+            chars += text_chars
+        batches.append(order[start:])
+        return batches
+    
+    def _embed_each_local(self, texts: List[str], batch: np.ndarray, out: np.ndarray) -> None:
+        """Embed a mini-batch that ran out of GPU memory one text at a time"""
+        torch.cuda.empty_cache()
+        for i in batch.tolist():
+            out[i] = self._encode_local([texts[i]])[0]
+        self.oom_fallback_count += len(batch)
+    
+    def _on_cuda(self) -> bool:
+        """Whether the local model runs on a CUDA device"""
+        device = getattr(self.model, 'device', None)
+        return TORCH_AVAILABLE and getattr(device, 'type', None) == 'cuda'
+    
+    def _embed_local_prefetched(self, texts: List[str], batches: List[np.ndarray], out: np.ndarray) -> None:
+        """Run the local model on CUDA while the next mini-batch is prepared
+        
+        A worker thread tokenizes mini-batch i+1 into pinned memory and
+        starts its host-to-device copy on a side stream while batch i runs
+        on the default stream, so the GPU isn't left waiting on the CPU
+        between batches.
+        
+        Args:
+            texts: Texts to embed
+            batches: Row indices of texts per mini-batch
+            out: (len(texts), embedding_dim) array filled in place
+        """
+        device = self.model.device
+        copy_stream = torch.cuda.Stream(device=device)
+        
+        def prepare(batch: np.ndarray) -> Tuple[Dict, 'torch.cuda.Event']:
+            features = self.model.tokenize([texts[i] for i in batch])
+            with torch.cuda.stream(copy_stream):
+                features = {
+                    name: value.pin_memory().to(device, non_blocking=True) if isinstance(value, torch.Tensor) else value
+                    for name, value in features.items()
+                }
+                ready = torch.cuda.Event()
+                ready.record(copy_stream)
+            return features, ready
+        
+        self.model.eval()
+        compute_stream = torch.cuda.current_stream(device)
+        
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='tokenize') as preparer, torch.inference_mode():
+            upcoming = preparer.submit(prepare, batches[0])
+            for i, batch in enumerate(batches):
+                features, ready = upcoming.result()
+                if i + 1 < len(batches):
+                    upcoming = preparer.submit(prepare, batches[i + 1])
+                
+                # The copy must land before the forward pass reads it, and the
+                # allocator must not recycle the inputs while it's running
+                compute_stream.wait_event(ready)
+                for value in features.values():
+                    if isinstance(value, torch.Tensor):
+                        value.record_stream(compute_stream)
+                
+                try:
+                    embedded = self.model(features)['sentence_embedding']
+                    embedded = torch.nn.functional.normalize(embedded, p=2, dim=1)
+                    out[batch] = embedded.float().cpu().numpy()
+                except _OOM_ERRORS:
+                    del features
+                    self._embed_each_local(texts, batch, out)
+    
+    def _encode_local(self, texts: List[str]) -> np.ndarray:
+        """One model.encode() call over texts"""
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
         )
+    
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """Token count per text (character count if the model has no tokenizer)"""
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None:
+            return [len(text) for text in texts]
+        encoded = tokenizer(texts, add_special_tokens=False, truncation=False)
+        return [len(ids) for ids in encoded['input_ids']]
+    
+    def _embed_openai(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings using OpenAI API
         
-        return [embedding.embedding for embedding in response.data]
+        A single request is made directly; larger inputs are split into
+        sub-batches sent concurrently (see _aembed_openai).
+        """
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        if len(texts) <= self.OPENAI_BATCH_SIZE:
+            response = self.openai_client.embeddings.create(
+                model=self.model_name,
+                input=texts,
+                encoding_format='base64'
+            )
+            self._decode_embeddings(response, range(len(texts)), embeddings)
+        else:
+            asyncio.run(self._aembed_openai(texts, embeddings))
+        
+        # Unit-normalize like the local model does, so dot product == cosine
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
     
-    def _text_hash(self, text: str) -> str:
-        """Generate hash of text for caching"""
-        return hashlib.md5(text.encode('utf-8')).hexdigest()
+    @staticmethod
+    def _decode_embeddings(response, rows, out: np.ndarray) -> None:
+        """Decode base64 float32 embeddings from a response into rows of out"""
+        for row, item in zip(rows, response.data):
+            out[row] = np.frombuffer(base64.b64decode(item.embedding), dtype='<f4')
     
-    def _cache_key(self, text_hash: str) -> str:
-        """Generate cache file path"""
-        return f"{self.model_type}_{self.model_name}_{text_hash}"
+    async def _aembed_openai(self, texts: List[str], out: np.ndarray) -> None:
+        """Embed texts in concurrent OpenAI requests, writing row i of out for texts[i]
+        
+        Texts are sorted by length before batching so each request carries
+        similarly sized inputs; at most OPENAI_MAX_CONCURRENCY requests are
+        in flight at once.
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[start:start + self.OPENAI_BATCH_SIZE] for start in range(0, len(order), self.OPENAI_BATCH_SIZE)]
+        semaphore = asyncio.Semaphore(self.OPENAI_MAX_CONCURRENCY)
+        
+        # A fresh async client per call: its connection pool is tied to the event loop
+        async with openai.AsyncOpenAI(api_key=self.openai_api_key) as client:
+            async def embed_batch(indices: List[int]) -> None:
+                await asyncio.sleep(random.uniform(0, self.OPENAI_START_JITTER_SECONDS))
+                async with semaphore:
+                    response = await self._acreate_embeddings(client, [texts[i] for i in indices])
+                self._decode_embeddings(response, indices, out)
+            
+            await asyncio.gather(*(embed_batch(batch) for batch in batches))
     
-    def _save_to_cache(self, text: str, result: EmbeddingResult) -> None:
-        """Save embedding result to cache"""
-        try:
-            cache_file = self.cache_dir / f"{self._cache_key(result.text_hash)}.pkl"
-            with open(cache_file, 'wb') as f:
-                pickle.dump(result, f)
-        except Exception as e:
-            # Don't fail if caching fails
-            print(f"Warning: Failed to save embedding to cache: {e}")
+    async def _acreate_embeddings(self, client: 'openai.AsyncOpenAI', texts: List[str]):
+        """One embeddings request, retried with exponential backoff on transient errors"""
+        retryable = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+        for attempt in range(self.OPENAI_MAX_RETRIES + 1):
+            try:
+                return await client.embeddings.create(model=self.model_name, input=texts, encoding_format='base64')
+            except retryable:
+                if attempt == self.OPENAI_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(2 ** attempt + random.random())
+    
+    def _text_hash(self, text: str) -> str:
+        """Generate hash of text for caching (128-bit, 32 hex chars)"""
+        if XXHASH_AVAILABLE:
+            return xxhash.xxh3_128_hexdigest(text.encode('utf-8'))
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
     
-    def _load_from_cache(self, text: str) -> Optional[EmbeddingResult]:
-        """Load embedding result from cache"""
+    def _save_to_cache(self, results: List[EmbeddingResult]) -> None:
+        """Append new embedding results to the cache"""
         try:
-            text_hash = self._text_hash(text)
-            cache_file = self.cache_dir / f"{self._cache_key(text_hash)}.pkl"
-            
-            if cache_file.exists():
-                with open(cache_file, 'rb') as f:
-                    result = pickle.load(f)
-                    # Verify hash matches
-                    if result.text_hash == text_hash:
-                        return result
-        except Exception as e:
-            # Don't fail if cache loading fails
-            print(f"Warning: Failed to load embedding from cache: {e}")
-        
-        return None
+            self._cache.put_many(
+                [result.text_hash for result in results],
+                np.stack([result.embedding for result in results])
+            )
+        except (OSError, sqlite3.Error, ValueError) as e:
+            # Don't fail if caching fails
+            print(f"Warning: Failed to save embeddings to cache: {e}")
     
     def clear_cache(self) -> None:
         """Clear embedding cache"""
         try:
-            for cache_file in self.cache_dir.glob(f"{self.model_type}_{self.model_name}_*.pkl"):
-                cache_file.unlink()
-        except Exception as e:
+            self._cache.clear()
+        except (OSError, sqlite3.Error) as e:
             print(f"Warning: Failed to clear cache: {e}")
     
     def get_cache_stats(self) -> Dict:
         """Get statistics about the embedding cache"""
         try:
-            cache_files = list(self.cache_dir.glob(f"{self.model_type}_{self.model_name}_*.pkl"))
-            total_size = sum(f.stat().st_size for f in cache_files)
-            
             return {
                 'cache_dir': str(self.cache_dir),
-                'cached_embeddings': len(cache_files),
-                'total_cache_size_mb': total_size / (1024 * 1024),
+                'cached_embeddings': len(self._cache),
+                'total_cache_size_mb': self._cache.size_bytes() / (1024 * 1024),
                 'model_type': self.model_type,
                 'model_name': self.model_name
             }
-        except Exception:
+        except (OSError, sqlite3.Error):
             return {'error': 'Failed to get cache stats'}
 
 
 class EmbeddingIndex:
-    """Simple in-memory index for embeddings (before ChromaDB integration)"""
+    """Simple in-memory index for embeddings (before ChromaDB integration)
+    
+    Embeddings live in one contiguous matrix so a search is a single
+    matrix-vector product instead of a Python loop per stored vector. Rows are
+    L2-normalized on insert, so that product is already the cosine similarity.
+    The matrix can be stored as float16, or as int8 with a per-row scale, to
+    halve or quarter the bytes a search has to stream through. Large float32
+    and float16 indexes that have been saved are searched through a FAISS
+    HNSW graph instead of a full scan when faiss is installed.
+    """
+    
+    STORAGE_DTYPES = {None: np.float32, 'float16': np.float16, 'int8': np.int8}
+    SEARCH_BLOCK_ROWS = 8192  # Rows upcast to float32 at a time for float16 matrices
     
-    def __init__(self, embedding_dim: int):
+    # Approximate search: graph used from this many rows on, its connectivity,
+    # and the candidate list sizes while building and searching
+    ANN_THRESHOLD = 50_000
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 128
+    
+    def __init__(self, embedding_dim: int, quantization: Optional[str] = None):
+        """
+        Initialize index
+        
+        Args:
+            embedding_dim: Dimension of the embedding vectors
+            quantization: None for float32 rows, 'float16', or 'int8'
+        """
+        if quantization not in self.STORAGE_DTYPES:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        
         self.embedding_dim = embedding_dim
-        self.embeddings: List[List[float]] = []
+        self.quantization = quantization
+        self._dtype = self.STORAGE_DTYPES[quantization]
+        # Rows [0, _size) are in use; capacity doubles as embeddings are added
+        self._matrix = np.empty((0, embedding_dim), dtype=self._dtype)
+        self._scales = np.empty(0, dtype=np.float32)  # Per-row dequantization scale (int8 only)
+        self._size = 0
         self.metadata: List[Dict] = []
         self.chunk_ids: List[str] = []
+        # HNSW graph over rows [0, _ann.ntotal); extended lazily, dropped on delete
+        self._ann = None
+        self._ann_lock = threading.Lock()  # Searches may run on several threads
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Stored embeddings as an (N, embedding_dim) float32 array"""
+        rows = self._matrix[:self._size]
+        if self.quantization == 'int8':
+            return rows.astype(np.float32) * self._scales[:self._size, None]
+        return rows.astype(np.float32, copy=False)
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize along the last axis; zero vectors stay zero"""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    
+    def _append_rows(self, rows: np.ndarray, normalize: bool = True) -> None:
+        """
+        Copy rows into the matrix, growing capacity geometrically
+        
+        Args:
+            rows: (n, embedding_dim) float32 rows
+            normalize: False for rows that came out of an index already, so
+                quantized rows round-trip without drifting
+        """
+        needed = self._size + len(rows)
+        if needed > len(self._matrix):
+            capacity = max(needed, 2 * len(self._matrix), 64)
+            matrix = np.empty((capacity, self.embedding_dim), dtype=self._dtype)
+            matrix[:self._size] = self._matrix[:self._size]
+            self._matrix = matrix
+            if self.quantization == 'int8':
+                scales = np.empty(capacity, dtype=np.float32)
+                scales[:self._size] = self._scales[:self._size]
+                self._scales = scales
+        
+        if normalize:
+            rows = self._normalize(rows)
+        if self.quantization == 'int8':
+            # Symmetric per-row quantization: the largest component maps to +/-127
+            scales = np.abs(rows).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            self._matrix[self._size:needed] = np.rint(rows / scales[:, None])
+            self._scales[self._size:needed] = scales
+        else:
+            self._matrix[self._size:needed] = rows
+        self._size = needed
+    
+    def _scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dot product of every stored row (or just rows) with a normalized float32 query"""
+        if rows is not None:
+            scores = np.empty(len(rows), dtype=np.float32)
+            for start in range(0, len(rows), self.SEARCH_BLOCK_ROWS):
+                block = rows[start:start + self.SEARCH_BLOCK_ROWS]
+                if self.quantization == 'int8':
+                    scores[start:start + len(block)] = int8_scores(self._matrix[block], self._scales[block], query)
+                else:
+                    scores[start:start + len(block)] = self._matrix[block].astype(np.float32, copy=False) @ query
+            return scores
+        
+        if self.quantization is None:
+            return self._matrix[:self._size] @ query
+        if self.quantization == 'int8':
+            return int8_scores(self._matrix[:self._size], self._scales[:self._size], query)
+        
+        # Upcast one block at a time so the float32 copy stays cache sized
+        scores = np.empty(self._size, dtype=np.float32)
+        for start in range(0, self._size, self.SEARCH_BLOCK_ROWS):
+            stop = min(start + self.SEARCH_BLOCK_ROWS, self._size)
+            scores[start:stop] = self._matrix[start:stop].astype(np.float32) @ query
+        return scores
     
     def add_embeddings(self, results: List[EmbeddingResult], chunks: List[MessageChunk]) -> None:
         """Add embeddings to the index"""
-        for result, chunk in zip(results, chunks):
+        for result in results:
             if len(result.embedding) != self.embedding_dim:
                 raise ValueError(f"Embedding dimension mismatch: expected {self.embedding_dim}, got {len(result.embedding)}")
-            
-            self.embeddings.append(result.embedding)
+        
+        if results:
+            self._append_rows(np.stack([result.embedding for result in results]).astype(np.float32, copy=False))
+        
+        for result, chunk in zip(results, chunks):
             self.chunk_ids.append(result.chunk_id)
             
             # Store chunk metadata for retrieval
             metadata = {
                 'chunk_id': chunk.id,
                 'chat_id': chunk.chat_id,
-                'start_time': chunk.start_time.isoformat(),
-                'end_time': chunk.end_time.isoformat(),
+                'start_time': chunk.start_time_iso,
+                'end_time': chunk.end_time_iso,
                 'participants': chunk.participants,
                 'chunk_type': chunk.chunk_type,
                 'message_count': len(chunk.messages),
@@ -240,50 +700,223 @@ class EmbeddingIndex:
             metadata.update(chunk.metadata)
             self.metadata.append(metadata)
     
-    def search_similar(self, query_embedding: List[float], top_k: int = 5) -> List[Tuple[Dict, float]]:
-        """Search for similar embeddings (simple cosine similarity)"""
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Remove embeddings by chunk ID"""
+        doomed = set(chunk_ids)
+        keep = [i for i, chunk_id in enumerate(self.chunk_ids) if chunk_id not in doomed]
+        matrix = self.embeddings[keep]
+        self._matrix = np.empty((0, self.embedding_dim), dtype=self._dtype)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._size = 0
+        self._append_rows(matrix, normalize=False)
+        self.metadata = [self.metadata[i] for i in keep]
+        self.chunk_ids = [self.chunk_ids[i] for i in keep]
+        with self._ann_lock:
+            self._ann = None  # Row numbers shifted; rebuilt by the next save()
+    
+    def _ann_index(self, build: bool = False) -> Optional['faiss.IndexHNSW']:
+        """HNSW graph over every stored row, or None to scan the matrix
+        
+        Building the graph is slow, so only save() does it (for indexes past
+        ANN_THRESHOLD rows); searches extend an existing graph with rows
+        added since and otherwise scan. int8 indexes always scan, since
+        their kernel already reads a quarter of the float32 bytes.
+        
+        Args:
+            build: Create the graph if there is none yet
+        """
+        if not FAISS_AVAILABLE or self.quantization == 'int8' or self._size < self.ANN_THRESHOLD:
+            return None
+        
+        with self._ann_lock:
+            if self._ann is None:
+                if not build:
+                    return None
+                if self.quantization == 'float16':
+                    ann = faiss.IndexHNSWSQ(
+                        self.embedding_dim, faiss.ScalarQuantizer.QT_fp16, self.HNSW_M, faiss.METRIC_INNER_PRODUCT
+                    )
+                else:
+                    ann = faiss.IndexHNSWFlat(self.embedding_dim, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+                ann.hnsw.efConstruction = self.HNSW_EF_CONSTRUCTION
+                self._ann = ann
+            
+            for start in range(self._ann.ntotal, self._size, self.SEARCH_BLOCK_ROWS):
+                rows = np.ascontiguousarray(self._matrix[start:min(start + self.SEARCH_BLOCK_ROWS, self._size)], dtype=np.float32)
+                if not self._ann.is_trained:
+                    self._ann.train(rows)
+                self._ann.add(rows)
+            return self._ann
+    
+    def _query_vector(self, query_embedding: Union[List[float], np.ndarray]) -> np.ndarray:
+        """Check a query's dimension and return it normalized as float32"""
         if len(query_embedding) != self.embedding_dim:
             raise ValueError(f"Query embedding dimension mismatch: expected {self.embedding_dim}, got {len(query_embedding)}")
+        # Stored rows are unit length, so normalizing the query once turns one
+        # SGEMV into every cosine similarity
+        return self._normalize(np.asarray(query_embedding, dtype=np.float32))
+    
+    def search_similar(self, query_embedding: Union[List[float], np.ndarray], top_k: int = 5) -> List[Tuple[Dict, float]]:
+        """Search for similar embeddings (cosine similarity)"""
+        query = self._query_vector(query_embedding)
         
-        scores = []
-        for i, emb in enumerate(self.embeddings):
-            # Simple cosine similarity
-            dot_product = sum(a * b for a, b in zip(query_embedding, emb))
-            magnitude_a = sum(a * a for a in query_embedding) ** 0.5
-            magnitude_b = sum(b * b for b in emb) ** 0.5
-            
-            if magnitude_a > 0 and magnitude_b > 0:
-                similarity = dot_product / (magnitude_a * magnitude_b)
-            else:
-                similarity = 0.0
-            
-            scores.append((self.metadata[i], similarity))
+        if self._size == 0 or top_k <= 0:
+            return []
         
-        # Sort by similarity (highest first)
-        scores.sort(key=lambda x: x[1], reverse=True)
+        # A graph search for (nearly) every row is slower than a scan and can
+        # miss rows the graph doesn't reach, so only smaller top_k use it
+        ann = self._ann_index() if top_k < self._size else None
+        if ann is not None:
+            params = faiss.SearchParametersHNSW(efSearch=max(self.HNSW_EF_SEARCH, top_k))
+            scores, ids = ann.search(query[None, :], min(top_k, self._size), params=params)
+            return [(self.metadata[i], float(score)) for i, score in zip(ids[0].tolist(), scores[0].tolist()) if i >= 0]
         
-        return scores[:top_k]
+        if self.quantization == 'int8':
+            # Scoring and top_k selection fused into one pass (see _search_kernels)
+            top, top_scores = int8_topk(self._matrix[:self._size], self._scales[:self._size], query, top_k)
+        else:
+            # Partial selection of the top_k, then sort only those (ties keep insertion order)
+            scores = self._scores(query)
+            top = top_k_indices(scores, top_k)
+            top_scores = scores[top]
+        
+        return [(self.metadata[i], float(score)) for i, score in zip(top.tolist(), top_scores.tolist())]
+    
+    # VectorStoreProtocol methods, so VectorStoreManager can treat this index
+    # like the ChromaDB and FAISS stores
+    
+    def add_chunks(self, embedding_results: List[EmbeddingResult], chunks: List[MessageChunk], verbose: bool = True) -> None:
+        """Add chunks with their embeddings (verbose is accepted for the protocol; nothing is printed)"""
+        self.add_embeddings(embedding_results, chunks)
+    
+    def search(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict] = None,
+        return_documents: bool = True
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Search by cosine similarity, returning copies of the stored metadata
+        
+        Args:
+            query_embedding: Query vector embedding
+            top_k: Number of results to return
+            where_filters: Optional equality filters on metadata (e.g., {'chat_id': 123});
+                only the matching rows are scored, exhaustively
+            return_documents: Ignored; only a text preview is kept in memory
+        """
+        if not where_filters:
+            return [(dict(metadata), score) for metadata, score in self.search_similar(query_embedding, top_k)]
+        
+        query = self._query_vector(query_embedding)
+        rows = np.fromiter(
+            (i for i, metadata in enumerate(self.metadata)
+             if all(metadata.get(key) == value for key, value in where_filters.items())),
+            dtype=np.int64
+        )
+        if len(rows) == 0 or top_k <= 0:
+            return []
+        
+        scores = self._scores(query, rows)
+        top = top_k_indices(scores, min(top_k, len(rows)))
+        return [(dict(self.metadata[rows[i]]), float(scores[i])) for i in top.tolist()]
+    
+    def search_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict] = None,
+        return_documents: bool = True
+    ) -> List[List[Tuple[Dict, float]]]:
+        """Search for several queries; each is one matrix-vector product anyway"""
+        return [self.search(query_embedding, top_k, where_filters) for query_embedding in query_embeddings]
+    
+    def warm(self) -> None:
+        """Nothing to do: the matrix is loaded (or memory-mapped) by load()"""
+    
+    def get_stats(self) -> Dict:
+        """stats() plus 'total_chunks', the key the other stores report"""
+        stats = self.stats()
+        stats['total_chunks'] = stats['total_embeddings']
+        return stats
     
     def save(self, filepath: str) -> None:
-        """Save index to file"""
+        """
+        Save index to file
+        
+        The matrix is written as raw .npy files next to filepath (stored
+        rows, plus per-row scales for int8), and the HNSW graph, if one has
+        been built, as a FAISS index file; filepath itself holds the JSON
+        metadata and chunk IDs.
+        
+        Args:
+            filepath: Path of the JSON file
+        """
+        filepath = Path(filepath)
+        matrix_path = filepath.with_suffix('.npy')
+        scales_path = filepath.with_suffix('.scales.npy')
+        
+        ann_path = filepath.with_suffix('.hnsw')
+        
+        self._write_npy(matrix_path, self._matrix[:self._size])
+        if self.quantization == 'int8':
+            self._write_npy(scales_path, self._scales[:self._size])
+        
+        ann = self._ann_index(build=True)
+        if ann is not None:
+            with atomic_path(ann_path) as tmp_path:
+                faiss.write_index(ann, str(tmp_path))
+        
         index_data = {
             'embedding_dim': self.embedding_dim,
-            'embeddings': self.embeddings,
+            'quantization': self.quantization,
+            'matrix_file': matrix_path.name,
+            'scales_file': scales_path.name if self.quantization == 'int8' else None,
+            'ann_file': ann_path.name if ann is not None else None,
             'metadata': self.metadata,
             'chunk_ids': self.chunk_ids
         }
         
-        with open(filepath, 'w') as f:
-            json.dump(index_data, f)
+        write_json_atomic(filepath, index_data)
+    
+    @staticmethod
+    def _write_npy(path: Path, array: np.ndarray) -> None:
+        """Write an array atomically, so a loaded memmap of path stays valid"""
+        with atomic_open(path, 'wb') as f:
+            np.save(f, array)
     
     @classmethod
     def load(cls, filepath: str) -> 'EmbeddingIndex':
-        """Load index from file"""
-        with open(filepath, 'r') as f:
-            index_data = json.load(f)
+        """
+        Load index from file
+        
+        The matrix is memory-mapped read-only rather than read into RAM; it is
+        copied into memory the first time embeddings are added or deleted.
+        
+        Args:
+            filepath: Path of the JSON file written by save()
+        """
+        index_data = read_json(filepath)
         
-        index = cls(index_data['embedding_dim'])
-        index.embeddings = index_data['embeddings']
+        index = cls(index_data['embedding_dim'], index_data.get('quantization'))
+        if 'matrix_file' in index_data:
+            directory = Path(filepath).parent
+            index._matrix = np.load(directory / index_data['matrix_file'], mmap_mode='r')
+            if index_data['scales_file']:
+                index._scales = np.load(directory / index_data['scales_file'])
+            index._size = len(index._matrix)
+            if index_data.get('ann_file') and FAISS_AVAILABLE:
+                ann = faiss.read_index(str(directory / index_data['ann_file']))
+                if ann.ntotal == index._size:
+                    index._ann = ann
+        elif index_data['embeddings']:
+            # Older files embed the rows as JSON; those without a quantization
+            # key also predate normalized storage
+            index._append_rows(
+                np.asarray(index_data['embeddings'], dtype=np.float32),
+                normalize='quantization' not in index_data
+            )
         index.metadata = index_data['metadata']
         index.chunk_ids = index_data['chunk_ids']
         
@@ -292,8 +925,10 @@ class EmbeddingIndex:
     def stats(self) -> Dict:
         """Get index statistics"""
         return {
-            'total_embeddings': len(self.embeddings),
+            'total_embeddings': self._size,
             'embedding_dim': self.embedding_dim,
+            'quantization': self.quantization or 'float32',
+            'matrix_bytes': self._matrix[:self._size].nbytes,
             'unique_chats': len(set(meta['chat_id'] for meta in self.metadata)),
             'chunk_types': {
                 chunk_type: sum(1 for meta in self.metadata if meta['chunk_type'] == chunk_type)
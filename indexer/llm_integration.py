@@ -4,9 +4,12 @@ LLM integration for iMessage AI
 Supports both local LLMs (Ollama) and cloud APIs (OpenAI, Anthropic) for RAG-based chat.
 """
 
+import asyncio
 import json
+import time
 import requests
-from typing import List, Dict, Optional, Tuple, Any, Generator
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Optional, Tuple, Any, Generator, AsyncIterator
 from datetime import datetime
 from dataclasses import dataclass
 
@@ -22,6 +25,16 @@ try:
 except ImportError:
     ANTHROPIC_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Parses the bytes of one streamed JSON line; orjson.JSONDecodeError subclasses
+# json.JSONDecodeError, so callers catch the stdlib type either way
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
 from .chunker import MessageChunk
 
 
@@ -46,12 +59,19 @@ class RAGResponse:
 class OllamaLLM:
     """Local LLM integration via Ollama"""
     
+    # Keep-alive connections held open to the Ollama server
+    MAX_POOL_CONNECTIONS = 32
+    # Bytes read per socket read when streaming (requests defaults to 512)
+    STREAM_CHUNK_SIZE = 8192
+    
     def __init__(
         self,
         base_url: str = "http://localhost:11434",
         model: str = "llama3.2",
         temperature: float = 0.7,
-        timeout: int = 60
+        timeout: int = 60,
+        prompt_cache: bool = False,
+        keep_alive: str = "10m"
     ):
         """
         Initialize Ollama client
@@ -61,17 +81,33 @@ class OllamaLLM:
             model: Model name (e.g., 'llama3.2', 'mistral', 'codellama')
             temperature: Response creativity (0.0-1.0)
             timeout: Request timeout in seconds
+            prompt_cache: Keep the model loaded between requests so Ollama can
+                reuse the KV cache of an unchanged prompt prefix
+            keep_alive: How long Ollama keeps the model loaded when prompt_cache is on
         """
         self.base_url = base_url.rstrip('/')
         self.model = model
         self.temperature = temperature
         self.timeout = timeout
+        self.prompt_cache = prompt_cache
+        self.keep_alive = keep_alive
+        
+        # One session for every request, so connections are reused instead of
+        # reopened per call (urllib3's pool is safe to share across threads)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_POOL_CONNECTIONS)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+    
+    def close(self) -> None:
+        """Close pooled connections to the Ollama server"""
+        self._session.close()
         
     def is_available(self) -> bool:
         """Check if Ollama server is running and model is available"""
         try:
             # Check if server is up
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self._session.get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code != 200:
                 return False
             
@@ -87,7 +123,7 @@ class OllamaLLM:
     def list_models(self) -> List[Dict[str, Any]]:
         """List available models"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
+            response = self._session.get(f"{self.base_url}/api/tags", timeout=10)
             response.raise_for_status()
             return response.json().get('models', [])
         except Exception as e:
@@ -100,7 +136,7 @@ class OllamaLLM:
         
         try:
             print(f"🔄 Pulling model {model_to_pull}...")
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/pull",
                 json={"name": model_to_pull},
                 timeout=300  # 5 minutes for download
@@ -125,20 +161,10 @@ class OllamaLLM:
     ) -> str:
         """Generate response from conversation history"""
         
-        # Format messages for Ollama
-        prompt = self._format_messages(messages, system_prompt)
-        
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": stream,
-            "options": {
-                "temperature": self.temperature
-            }
-        }
+        payload = self._build_payload(messages, system_prompt, stream)
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/generate",
                 json=payload,
                 timeout=self.timeout
@@ -154,6 +180,66 @@ class OllamaLLM:
         except Exception as e:
             raise RuntimeError(f"Ollama generation failed: {e}")
     
+    async def agenerate(
+        self,
+        messages: List[ChatMessage],
+        system_prompt: Optional[str] = None
+    ) -> str:
+        """Async version of generate(); requests share the pooled session from worker threads"""
+        return await asyncio.to_thread(self.generate, messages, system_prompt=system_prompt)
+    
+    def stream(
+        self,
+        messages: List[ChatMessage],
+        system_prompt: Optional[str] = None
+    ) -> Generator[str, None, None]:
+        """Yield response tokens as Ollama produces them"""
+        payload = self._build_payload(messages, system_prompt, stream=True)
+        
+        try:
+            with self._session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                
+                for line in response.iter_lines(chunk_size=self.STREAM_CHUNK_SIZE):
+                    if not line:
+                        continue
+                    try:
+                        data = _json_loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    
+                    if data.get('response'):
+                        yield data['response']
+                    if data.get('done'):
+                        break
+                        
+        except requests.RequestException as e:
+            raise RuntimeError(f"Ollama generation failed: {e}")
+    
+    def _build_payload(
+        self,
+        messages: List[ChatMessage],
+        system_prompt: Optional[str],
+        stream: bool
+    ) -> Dict[str, Any]:
+        """Request body for /api/generate"""
+        payload = {
+            "model": self.model,
+            "prompt": self._format_messages(messages, system_prompt),
+            "stream": stream,
+            "options": {
+                "temperature": self.temperature
+            }
+        }
+        if self.prompt_cache:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+    
     def _format_messages(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> str:
         """Convert messages to a single prompt for Ollama"""
         prompt_parts = []
@@ -178,10 +264,10 @@ class OllamaLLM:
         """Handle streaming response from Ollama"""
         full_response = ""
         
-        for line in response.iter_lines():
+        for line in response.iter_lines(chunk_size=self.STREAM_CHUNK_SIZE):
             if line:
                 try:
-                    data = json.loads(line.decode('utf-8'))
+                    data = _json_loads(line)
                     if 'response' in data:
                         full_response += data['response']
                 except json.JSONDecodeError:
@@ -193,20 +279,44 @@ class OllamaLLM:
 class OpenAILLM:
     """OpenAI API integration"""
     
+    # Routes requests that share a prompt prefix to the same prompt cache
+    PROMPT_CACHE_KEY = "imessage-ai-rag"
+    
     def __init__(
         self,
         api_key: str,
         model: str = "gpt-4o-mini",
         temperature: float = 0.7,
-        max_tokens: int = 4000
+        max_tokens: int = 4000,
+        prompt_cache: bool = False
     ):
         if not OPENAI_AVAILABLE:
             raise ImportError("openai package not available. Install with: pip install openai")
         
+        self.api_key = api_key
         self.client = openai.OpenAI(api_key=api_key)
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.prompt_cache = prompt_cache
+        
+        # Async client and the event loop it was created on (its connection
+        # pool can't be shared across loops)
+        self._async_client: Optional[Tuple[Any, Any]] = None
+    
+    def _get_async_client(self) -> 'openai.AsyncOpenAI':
+        """Async client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client[0] is not loop:
+            self._async_client = (loop, openai.AsyncOpenAI(api_key=self.api_key))
+        return self._async_client[1]
+    
+    def _cache_params(self) -> Dict[str, Any]:
+        """Extra request parameters for prompt caching"""
+        if not self.prompt_cache:
+            return {}
+        # Sent via extra_body so older SDK versions without the argument still work
+        return {"extra_body": {"prompt_cache_key": self.PROMPT_CACHE_KEY}}
     
     def is_available(self) -> bool:
         """Check if OpenAI API is accessible"""
@@ -221,10 +331,8 @@ class OpenAILLM:
         except Exception:
             return False
     
-    def generate(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> str:
-        """Generate response using OpenAI"""
-        
-        # Format messages
+    def _format_messages(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """Convert messages to OpenAI chat format"""
         api_messages = []
         
         if system_prompt:
@@ -236,12 +344,56 @@ class OpenAILLM:
                 "content": msg.content
             })
         
+        return api_messages
+    
+    def stream(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> Generator[str, None, None]:
+        """Yield response tokens as OpenAI produces them"""
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._format_messages(messages, system_prompt),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True,
+                **self._cache_params()
+            )
+            
+            for event in response:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+                    
+        except Exception as e:
+            raise RuntimeError(f"OpenAI generation failed: {e}")
+    
+    def generate(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> str:
+        """Generate response using OpenAI"""
+        
+        # Format messages
+        api_messages = self._format_messages(messages, system_prompt)
+        
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=api_messages,
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=self.max_tokens,
+                **self._cache_params()
+            )
+            
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            raise RuntimeError(f"OpenAI generation failed: {e}")
+    
+    async def agenerate(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> str:
+        """Async version of generate() using the async OpenAI client"""
+        try:
+            response = await self._get_async_client().chat.completions.create(
+                model=self.model,
+                messages=self._format_messages(messages, system_prompt),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                **self._cache_params()
             )
             
             return response.choices[0].message.content
@@ -258,15 +410,36 @@ class AnthropicLLM:
         api_key: str,
         model: str = "claude-3-haiku-20240307",
         temperature: float = 0.7,
-        max_tokens: int = 4000
+        max_tokens: int = 4000,
+        prompt_cache: bool = False
     ):
         if not ANTHROPIC_AVAILABLE:
             raise ImportError("anthropic package not available. Install with: pip install anthropic")
         
+        self.api_key = api_key
         self.client = anthropic.Anthropic(api_key=api_key)
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.prompt_cache = prompt_cache
+        
+        # Async client and the event loop it was created on (its connection
+        # pool can't be shared across loops)
+        self._async_client: Optional[Tuple[Any, Any]] = None
+    
+    def _get_async_client(self) -> 'anthropic.AsyncAnthropic':
+        """Async client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client[0] is not loop:
+            self._async_client = (loop, anthropic.AsyncAnthropic(api_key=self.api_key))
+        return self._async_client[1]
+    
+    def _system_param(self, system_prompt: Optional[str]) -> Any:
+        """System prompt, marked as a cache breakpoint when prompt caching is on"""
+        system_prompt = system_prompt or "You are a helpful AI assistant."
+        if not self.prompt_cache:
+            return system_prompt
+        return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
     
     def is_available(self) -> bool:
         """Check if Anthropic API is accessible"""
@@ -281,10 +454,8 @@ class AnthropicLLM:
         except Exception:
             return False
     
-    def generate(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> str:
-        """Generate response using Anthropic Claude"""
-        
-        # Format messages (Claude has different format)
+    def _format_messages(self, messages: List[ChatMessage]) -> List[Dict[str, str]]:
+        """Convert messages to Claude format (system prompt is passed separately)"""
         api_messages = []
         
         for msg in messages:
@@ -294,12 +465,36 @@ class AnthropicLLM:
                     "content": msg.content
                 })
         
+        return api_messages
+    
+    def stream(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> Generator[str, None, None]:
+        """Yield response tokens as Claude produces them"""
+        try:
+            with self.client.messages.stream(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                system=self._system_param(system_prompt),
+                messages=self._format_messages(messages)
+            ) as response:
+                for text in response.text_stream:
+                    yield text
+                    
+        except Exception as e:
+            raise RuntimeError(f"Anthropic generation failed: {e}")
+    
+    def generate(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> str:
+        """Generate response using Anthropic Claude"""
+        
+        # Format messages (Claude has different format)
+        api_messages = self._format_messages(messages)
+        
         try:
             response = self.client.messages.create(
                 model=self.model,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature,
-                system=system_prompt or "You are a helpful AI assistant.",
+                system=self._system_param(system_prompt),
                 messages=api_messages
             )
             
@@ -307,17 +502,39 @@ class AnthropicLLM:
             
         except Exception as e:
             raise RuntimeError(f"Anthropic generation failed: {e}")
+    
+    async def agenerate(self, messages: List[ChatMessage], system_prompt: Optional[str] = None) -> str:
+        """Async version of generate() using the async Anthropic client"""
+        try:
+            response = await self._get_async_client().messages.create(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                system=self._system_param(system_prompt),
+                messages=self._format_messages(messages)
+            )
+            
+            return response.content[0].text
+            
+        except Exception as e:
+            raise RuntimeError(f"Anthropic generation failed: {e}")
 
 
 class RAGSystem:
     """RAG (Retrieval-Augmented Generation) system for iMessage AI"""
     
+    # Characters in a context chunk header with no participants, plus the
+    # trailing blank line (a lower bound used to stop early)
+    MIN_CHUNK_HEADER_LENGTH = 80
+    
     def __init__(
         self,
         llm: Any,  # OllamaLLM, OpenAILLM, or AnthropicLLM
         indexer: Any,  # iMessageIndexer from pipeline.py
         max_context_chunks: int = 5,
-        max_context_length: int = 4000
+        max_context_length: int = 4000,
+        reranker: Any = None,  # Reranker from reranker.py
+        rerank_candidates: int = 30
     ):
         """
         Initialize RAG system
@@ -327,11 +544,15 @@ class RAGSystem:
             indexer: iMessage indexer with vector store
             max_context_chunks: Maximum chunks to include in context
             max_context_length: Maximum characters of context
+            reranker: Optional cross-encoder reranker applied after vector search
+            rerank_candidates: Chunks fetched from vector search for the reranker
         """
         self.llm = llm
         self.indexer = indexer
         self.max_context_chunks = max_context_chunks
         self.max_context_length = max_context_length
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
         
         # Chat history for conversation
         self.chat_history: List[ChatMessage] = []
@@ -356,22 +577,86 @@ class RAGSystem:
         start_time = datetime.now()
         
         # 1. Retrieve relevant chunks
+        chunks = self.retrieve(question, filters)
+        
+        # 2-4. Build context, system prompt and message list
+        system_prompt, messages = self._prepare_prompt(question, chunks, include_chat_history)
+        
+        # 5. Generate response
+        try:
+            answer = self.llm.generate(messages, system_prompt=system_prompt)
+            
+            # 6. Update chat history
+            self._record_turn(question, answer)
+            
+            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            
+            return RAGResponse(
+                answer=answer,
+                sources=chunks,
+                model_used=getattr(self.llm, 'model', 'unknown'),
+                processing_time_ms=int(processing_time)
+            )
+            
+        except Exception as e:
+            raise RuntimeError(f"RAG query failed: {e}")
+    
+    def retrieve(self, question: str, filters: Optional[Dict] = None) -> List[MessageChunk]:
+        """Retrieve the chunks most relevant to a question"""
         relevant_chunks = self.indexer.search(
             query=question,
-            top_k=self.max_context_chunks,
+            top_k=self._search_top_k(),
             where_filters=filters
         )
+        return self._select_chunks(question, relevant_chunks)
+    
+    def retrieve_many(self, questions: List[str], filters: Optional[Dict] = None) -> List[List[MessageChunk]]:
+        """Retrieve chunks for several questions with one batched vector search"""
+        batch_results = self.indexer.search_many(questions, top_k=self._search_top_k(), where_filters=filters)
+        return [
+            self._select_chunks(question, relevant_chunks)
+            for question, relevant_chunks in zip(questions, batch_results)
+        ]
+    
+    def _search_top_k(self) -> int:
+        """Chunks to fetch from vector search per question"""
+        # Over-fetch when a reranker picks the final chunks
+        return max(self.rerank_candidates, self.max_context_chunks) if self.reranker else self.max_context_chunks
+    
+    def _select_chunks(self, question: str, relevant_chunks: List[Tuple[MessageChunk, float]]) -> List[MessageChunk]:
+        """Rerank search results if configured, and drop the scores"""
+        if self.reranker:
+            relevant_chunks = self.reranker.rerank(
+                question,
+                [chunk for chunk, score in relevant_chunks],
+                top_n=self.max_context_chunks
+            )
         
-        # Extract chunks and scores
-        chunks = [chunk for chunk, score in relevant_chunks]
+        # Extract chunks (drop scores)
+        return [chunk for chunk, score in relevant_chunks]
+    
+    async def aretrieve(self, question: str, filters: Optional[Dict] = None) -> List[MessageChunk]:
+        """Async version of retrieve() so retrieval can run alongside other work"""
+        return await asyncio.to_thread(self.retrieve, question, filters)
+    
+    async def aprefetch(self, question: str, filters: Optional[Dict] = None) -> None:
+        """Run the vector search for a likely next question in the background
         
-        # 2. Build context from chunks
+        The indexer caches search results, so asking the question later
+        skips the search (reranking, if any, still runs then).
+        """
+        await asyncio.to_thread(self.indexer.search, question, self._search_top_k(), filters)
+    
+    def _prepare_prompt(
+        self,
+        question: str,
+        chunks: List[MessageChunk],
+        include_chat_history: bool = True
+    ) -> Tuple[str, List[ChatMessage]]:
+        """Build the system prompt and message list for a question"""
         context = self._build_context(chunks)
-        
-        # 3. Create system prompt
         system_prompt = self._create_system_prompt(context)
         
-        # 4. Prepare messages
         messages = []
         
         # Add recent chat history if requested
@@ -381,17 +666,92 @@ class RAGSystem:
         # Add current question
         messages.append(ChatMessage(role="user", content=question))
         
-        # 5. Generate response
+        return system_prompt, messages
+    
+    def _record_turn(self, question: str, answer: str) -> None:
+        """Append a question/answer pair to the chat history"""
+        self.chat_history.append(ChatMessage(role="user", content=question))
+        self.chat_history.append(ChatMessage(role="assistant", content=answer))
+        
+        # Trim history if too long
+        if len(self.chat_history) > 20:
+            self.chat_history = self.chat_history[-20:]
+    
+    async def astream(
+        self,
+        question: str,
+        chunks: Optional[List[MessageChunk]] = None,
+        include_chat_history: bool = True,
+        filters: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream answer tokens for a question
+        
+        Args:
+            question: User's question
+            chunks: Pre-retrieved chunks (e.g. from aretrieve); retrieved here if None
+            include_chat_history: Whether to include previous conversation
+            filters: Optional metadata filters for search
+        """
+        if chunks is None:
+            chunks = await self.aretrieve(question, filters)
+        
+        system_prompt, messages = self._prepare_prompt(question, chunks, include_chat_history)
+        
+        if hasattr(self.llm, 'stream'):
+            token_iter = self.llm.stream(messages, system_prompt=system_prompt)
+        else:
+            token_iter = iter([await asyncio.to_thread(self.llm.generate, messages, system_prompt=system_prompt)])
+        
+        # Pull tokens from the blocking generator in a worker thread so the
+        # event loop stays free while the model decodes
+        done = object()
+        answer_parts = []
+        while True:
+            token = await asyncio.to_thread(next, token_iter, done)
+            if token is done:
+                break
+            answer_parts.append(token)
+            yield token
+        
+        self._record_turn(question, "".join(answer_parts))
+    
+    async def aask(
+        self, 
+        question: str, 
+        include_chat_history: bool = True,
+        filters: Optional[Dict] = None,
+        chunks: Optional[List[MessageChunk]] = None,
+        record_turn: bool = True
+    ) -> RAGResponse:
+        """
+        Async version of ask() for answering several questions concurrently
+        
+        Retrieval runs in a worker thread and generation uses the LLM's
+        agenerate(), so callers can asyncio.gather() many questions and
+        overlap their network/model latency with each other.
+        
+        Args:
+            question: User's question
+            include_chat_history: Whether to include previous conversation
+            filters: Optional metadata filters for search
+            chunks: Pre-retrieved chunks (e.g. from retrieve_many); retrieved here if None
+            record_turn: Append the question and answer to chat_history
+        """
+        start_time = datetime.now()
+        
+        if chunks is None:
+            chunks = await self.aretrieve(question, filters)
+        system_prompt, messages = self._prepare_prompt(question, chunks, include_chat_history)
+        
         try:
-            answer = self.llm.generate(messages, system_prompt=system_prompt)
-            
-            # 6. Update chat history
-            self.chat_history.append(ChatMessage(role="user", content=question))
-            self.chat_history.append(ChatMessage(role="assistant", content=answer))
+            if hasattr(self.llm, 'agenerate'):
+                answer = await self.llm.agenerate(messages, system_prompt=system_prompt)
+            else:
+                answer = await asyncio.to_thread(self.llm.generate, messages, system_prompt=system_prompt)
             
-            # Trim history if too long
-            if len(self.chat_history) > 20:
-                self.chat_history = self.chat_history[-20:]
+            if record_turn:
+                self._record_turn(question, answer)
             
             processing_time = (datetime.now() - start_time).total_seconds() * 1000
             
@@ -405,26 +765,59 @@ class RAGSystem:
         except Exception as e:
             raise RuntimeError(f"RAG query failed: {e}")
     
+    async def aask_many(
+        self,
+        questions: List[str],
+        max_concurrency: int = 8,
+        filters: Optional[Dict] = None
+    ) -> List[RAGResponse]:
+        """
+        Answer independent questions concurrently (e.g. evaluation or bulk summaries)
+        
+        Args:
+            questions: Questions to answer; each is asked without chat history
+                and none is recorded in it
+            max_concurrency: Maximum questions in flight at once
+            filters: Optional metadata filters for search
+            
+        Returns:
+            Responses in the same order as questions
+        """
+        # One batched vector search for every question, then concurrent generation
+        retrieved = await asyncio.to_thread(self.retrieve_many, questions, filters)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def ask_one(question: str, chunks: List[MessageChunk]) -> RAGResponse:
+            async with semaphore:
+                return await self.aask(question, include_chat_history=False, chunks=chunks, record_turn=False)
+        
+        return await asyncio.gather(*(ask_one(question, chunks) for question, chunks in zip(questions, retrieved)))
+    
     def _build_context(self, chunks: List[MessageChunk]) -> str:
         """Build context string from relevant message chunks"""
         context_parts = []
         total_length = 0
         
         for i, chunk in enumerate(chunks):
+            # Stop before formatting anything once even the shortest possible
+            # header can't fit alongside this chunk's text
+            if total_length + self.MIN_CHUNK_HEADER_LENGTH + len(chunk.text_content) > self.max_context_length:
+                break
+            
             # Format chunk with metadata
             participants = ", ".join(chunk.participants[:3])
             if len(chunk.participants) > 3:
                 participants += f" (and {len(chunk.participants) - 3} others)"
             
-            chunk_header = f"--- Conversation {i+1} ---\n"
-            chunk_header += f"Participants: {participants}\n"
-            chunk_header += f"Time: {chunk.start_time.strftime('%Y-%m-%d %H:%M')} - {chunk.end_time.strftime('%H:%M')}\n"
-            chunk_header += f"Messages: {len(chunk.messages)}\n\n"
-            
-            chunk_content = chunk.text_content
+            chunk_text = (
+                f"--- Conversation {i+1} ---\n"
+                f"Participants: {participants}\n"
+                f"Time: {chunk.time_range}\n"
+                f"Messages: {len(chunk.messages)}\n\n"
+                f"{chunk.text_content}\n\n"
+            )
             
             # Check length limit
-            chunk_text = chunk_header + chunk_content + "\n\n"
             if total_length + len(chunk_text) > self.max_context_length:
                 break
             
@@ -435,13 +828,12 @@ class RAGSystem:
     
     def _create_system_prompt(self, context: str) -> str:
         """Create system prompt with conversation context"""
+        # Static instructions first and retrieved context last, so the longest
+        # possible prefix stays identical across questions (provider prompt caches)
         return f"""You are an AI assistant helping someone understand their iMessage conversation history. 
 
 You have access to relevant conversations from their chat history. Use this context to answer their questions accurately and helpfully.
 
-CONVERSATION CONTEXT:
-{context}
-
 INSTRUCTIONS:
 - Answer questions based on the conversation context provided
 - Be conversational and helpful
@@ -450,7 +842,10 @@ INSTRUCTIONS:
 - Maintain privacy and be respectful about personal conversations
 - If asked about recent conversations, note the dates from the context
 
-Remember: This is the user's own private message history. Help them understand and navigate their conversations."""
+Remember: This is the user's own private message history. Help them understand and navigate their conversations.
+
+CONVERSATION CONTEXT:
+{context}"""
     
     def clear_history(self) -> None:
         """Clear chat history"""
@@ -469,6 +864,10 @@ Remember: This is the user's own private message history. Help them understand a
 class LLMManager:
     """Manager for different LLM backends"""
     
+    # How long a get_available_llms() probe result is reused (seconds)
+    AVAILABILITY_TTL_SECONDS = 60
+    _availability_cache: Optional[Tuple[float, Dict[str, bool]]] = None
+    
     @staticmethod
     def create_llm(
         llm_type: str,
@@ -505,9 +904,19 @@ class LLMManager:
         else:
             raise ValueError(f"Unsupported LLM type: {llm_type}")
     
-    @staticmethod
-    def get_available_llms() -> Dict[str, bool]:
-        """Check which LLM backends are available"""
+    @classmethod
+    def get_available_llms(cls, use_cache: bool = True) -> Dict[str, bool]:
+        """Check which LLM backends are available
+        
+        Args:
+            use_cache: Reuse a probe result younger than AVAILABILITY_TTL_SECONDS
+                instead of hitting the Ollama server again
+        """
+        if use_cache and cls._availability_cache is not None:
+            checked_at, cached = cls._availability_cache
+            if time.monotonic() - checked_at < cls.AVAILABILITY_TTL_SECONDS:
+                return dict(cached)
+        
         availability = {}
         
         # Check Ollama
@@ -523,4 +932,5 @@ class LLMManager:
         # Check Anthropic (requires API key to test fully)
         availability['anthropic'] = ANTHROPIC_AVAILABLE
         
+        cls._availability_cache = (time.monotonic(), dict(availability))
         return availability
\ No newline at end of file
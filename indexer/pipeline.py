@@ -4,21 +4,122 @@ Main indexing pipeline for iMessage AI
 Orchestrates the full pipeline: chat.db parsing → chunking → embedding → indexing
 """
 
-import os
 import json
-from typing import List, Dict, Optional, Tuple
+import time
+import hashlib
+import queue
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from itertools import chain
+from operator import attrgetter
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, TypeVar
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import numpy as np
+
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
 from .chat_db_parser import ChatDBParser, Message, Chat
 from .chunker import MessageChunker, MessageChunk  
 from .embeddings import EmbeddingGenerator, EmbeddingResult
 from .vector_store import VectorStoreManager
+from .chunk_store import ChunkStore
+from ._io import read_json, write_json_atomic
+
+T = TypeVar('T')
+
+
+def _prefetch(items: Iterable[T], maxsize: int) -> Iterator[T]:
+    """Iterate items on a background thread, keeping up to maxsize ready
+    
+    Lets the producer's work (e.g. chunking) overlap with whatever the caller
+    does with each item. Producer exceptions are re-raised in the caller;
+    closing the generator stops the producer.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+    
+    producer = threading.Thread(target=produce, name='pipeline-producer', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
 
 
 class iMessageIndexer:
     """Main indexer class that orchestrates the full pipeline"""
     
+    # Last indexed message id and each chat's tail chunk, for run_incremental_index()
+    INCREMENTAL_STATE_FILE = 'incremental_state.json'
+    
+    # Vector store totals from the last indexing run, for fast startup checks
+    STATS_SNAPSHOT_FILE = 'stats.json'
+    
+    # How long a get_stats() result is reused (seconds)
+    STATS_TTL_SECONDS = 30
+    
+    # Chats whose messages get_conversation_context() keeps, and for how long (seconds)
+    CONTEXT_CACHE_SIZE = 8
+    CONTEXT_CACHE_TTL_SECONDS = 60
+    
+    # Recent search results kept by search_many(), keyed by the int8-rounded
+    # query embedding, so repeated questions skip the vector store
+    SEARCH_CACHE_SIZE = 512
+    
+    # Chunks search() loaded from the chunk store or rebuilt from chat.db when
+    # not held in self.chunks; bounded so a long-running server doesn't grow
+    # back toward the whole corpus
+    RESOLVED_CHUNK_CACHE_SIZE = 2048
+    
+    # Chunk batches buffered between the chunk, embed and store stages
+    PIPELINE_DEPTH = 2
+    
+    # Batches embedded concurrently per embedding model; network-bound APIs
+    # overlap round trips, a local model owns one worker
+    EMBED_IN_FLIGHT = {'local': 1, 'openai': 4}
+    
+    # Chunking strategy that produces each chunk type
+    _STRATEGY_BY_CHUNK_TYPE = {
+        'conversation_window': 'time_window',
+        'daily_group': 'daily',
+        'participant_turn': 'participant'
+    }
+    
     def __init__(
         self,
         db_path: Optional[str] = None,
@@ -27,7 +128,9 @@ class iMessageIndexer:
         chunk_strategy: str = 'adaptive',
         cache_dir: str = '.imessage_cache',
         openai_api_key: Optional[str] = None,
-        vector_store_type: str = 'chromadb'
+        vector_store_type: str = 'chromadb',
+        quantization: Optional[str] = None,
+        verbose: bool = False
     ):
         """
         Initialize the iMessage indexer
@@ -39,7 +142,10 @@ class iMessageIndexer:
             chunk_strategy: 'adaptive', 'time_window', 'daily', or 'participant'
             cache_dir: Directory for caching embeddings and indexes
             openai_api_key: OpenAI API key if using OpenAI embeddings
-            vector_store_type: 'chromadb' or 'memory' for vector storage
+            vector_store_type: 'chromadb', 'faiss', or 'memory' for vector storage
+            quantization: None, 'float16' or 'int8' to store smaller vectors
+                (FAISS and memory stores)
+            verbose: Print every vector store batch write while indexing
         """
         self.db_path = db_path
         self.embedding_model = embedding_model
@@ -47,6 +153,8 @@ class iMessageIndexer:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.vector_store_type = vector_store_type
+        self.quantization = quantization
+        self.verbose = verbose
         
         # Initialize components
         self.chunker = MessageChunker()
@@ -60,13 +168,64 @@ class iMessageIndexer:
         # Will be populated during indexing
         self.vector_store: Optional[VectorStoreManager] = None
         self.chats: List[Chat] = []
-        self.chunks: List[MessageChunk] = []
+        # chunk_id -> chunk resolved by search(), least recently used first
+        self._resolved_chunks: OrderedDict = OrderedDict()
+        self._resolved_lock = threading.Lock()
+        self.chunks = []
+        self._stats_cache: Optional[Tuple[float, Dict]] = None
+        # chat_id -> (fetched_at, messages, sorted ids, positions), oldest first
+        self._context_cache: OrderedDict = OrderedDict()
+        self._context_lock = threading.Lock()
+        # (query signature, top_k, filters) -> results, oldest first
+        self._search_cache: OrderedDict = OrderedDict()
+        self._search_lock = threading.Lock()
+        # Every indexed chunk, so search() works on an index loaded from disk
+        self.chunk_store = ChunkStore(self.cache_dir / 'chunks.sqlite')
+        # chat.db connection shared by query-time lookups; opened on first use
+        self._parser: Optional[ChatDBParser] = None
+        self._parser_lock = threading.Lock()
+    
+    @contextmanager
+    def _chat_db(self) -> Iterator[ChatDBParser]:
+        """The shared chat.db connection, held exclusively for the block
+        
+        Query-time lookups (conversation context, rebuilding chunks) run many
+        small reads; reusing one connection skips reopening the file and
+        re-running the connection pragmas for each. Reads still see new
+        messages, since each query starts a fresh read transaction.
+        """
+        with self._parser_lock:
+            if self._parser is None:
+                self._parser = ChatDBParser(self.db_path).__enter__()
+            yield self._parser
+    
+    def close(self) -> None:
+        """Close the shared chat.db connection (reopened if needed again)"""
+        with self._parser_lock:
+            if self._parser is not None:
+                self._parser.__exit__(None, None, None)
+                self._parser = None
+    
+    @property
+    def chunks(self) -> List[MessageChunk]:
+        """Chunks from the last indexing run"""
+        return self._chunks
+    
+    @chunks.setter
+    def chunks(self, chunks: List[MessageChunk]) -> None:
+        # Rebuilt on every assignment so search() resolves ids in O(1)
+        self._chunks = chunks
+        self._chunks_by_id: Dict[str, MessageChunk] = {chunk.id: chunk for chunk in chunks}
+        with self._resolved_lock:
+            self._resolved_chunks.clear()
         
     def run_full_index(
         self, 
         days_limit: Optional[int] = None,
         message_limit: Optional[int] = None,
-        save_index: bool = True
+        save_index: bool = True,
+        batch_size: int = 1000,
+        keep_chunks: bool = True
     ) -> Dict:
         """
         Run the full indexing pipeline
@@ -75,6 +234,10 @@ class iMessageIndexer:
             days_limit: Only index messages from last N days
             message_limit: Maximum messages to process
             save_index: Whether to save the index to disk
+            batch_size: Chunks embedded and added to the vector store per batch
+            keep_chunks: Keep every chunk in self.chunks after indexing. When
+                False, chunks are dropped once stored and search() rebuilds
+                the ones it returns from chat.db
             
         Returns:
             Dictionary with indexing statistics
@@ -92,84 +255,125 @@ class iMessageIndexer:
             # Get chats and messages
             self.chats = parser.get_chats()
             
+            # Step 2: Stream messages from SQLite already grouped by chat and
+            # sorted by date, one chat at a time
             if days_limit:
-                messages = parser.get_recent_messages(days=days_limit, limit=message_limit or 50000)
-                print(f"   Using recent messages (last {days_limit} days): {len(messages):,}")
+                chat_groups = parser.iter_messages_by_chat(days=days_limit, limit=message_limit or 50000)
             else:
-                messages = parser.get_messages(limit=message_limit)
-                print(f"   Using all messages: {len(messages):,}")
-        
-        if not messages:
-            raise ValueError("No messages found to index")
-        
-        # Step 2: Group messages by chat
-        print("🗂️  Grouping messages by conversation...")
-        chat_messages = self._group_messages_by_chat(messages)
-        print(f"   Messages grouped into {len(chat_messages)} active chats")
-        
-        # Step 3: Chunk messages
-        print("✂️  Chunking messages...")
-        all_chunks = []
-        for chat_id, chat_msgs in chat_messages.items():
-            chat = next(c for c in self.chats if c.id == chat_id)
+                chat_groups = parser.iter_messages_by_chat(limit=message_limit)
+            
+            first_group = next(chat_groups, None)
+            if first_group is None:
+                raise ValueError("No messages found to index")
+            
+            # Step 3: Initialize vector store manager
+            print(f"🔍 Building {self.vector_store_type} vector store...")
             
-            if self.chunk_strategy == 'adaptive':
-                chunks = self.chunker.chunk_messages_adaptive(chat_msgs, chat)
-            elif self.chunk_strategy == 'time_window':
-                chunks = self.chunker.chunk_by_time_windows(chat_msgs, chat)
-            elif self.chunk_strategy == 'daily':
-                chunks = self.chunker.chunk_by_daily_groups(chat_msgs, chat)
-            elif self.chunk_strategy == 'participant':
-                chunks = self.chunker.chunk_by_participants(chat_msgs, chat)
+            if self.vector_store_type == 'chromadb':
+                self.vector_store = VectorStoreManager(
+                    store_type='chromadb',
+                    persist_directory=str(self.cache_dir / 'chromadb'),
+                    collection_name='imessage_chunks'
+                )
+            elif self.vector_store_type == 'faiss':
+                self.vector_store = VectorStoreManager(
+                    store_type='faiss',
+                    persist_directory=str(self.cache_dir / 'faiss'),
+                    embedding_dim=self.embedding_generator.embedding_dim,
+                    quantization=self.quantization
+                )
             else:
-                raise ValueError(f"Unknown chunk strategy: {self.chunk_strategy}")
+                self.vector_store = VectorStoreManager(
+                    store_type='memory',
+                    embedding_dim=self.embedding_generator.embedding_dim,
+                    quantization=self.quantization
+                )
             
-            all_chunks.extend(chunks)
-        
-        self.chunks = all_chunks
-        chunk_stats = self.chunker.get_chunking_stats(all_chunks)
-        print(f"   Created {chunk_stats['total_chunks']} chunks (avg: {chunk_stats['avg_messages_per_chunk']:.1f} msgs/chunk)")
-        
-        # Step 4: Generate embeddings
-        print(f"🧠 Generating embeddings using {self.embedding_model} model...")
-        embedding_results = self.embedding_generator.embed_chunks(all_chunks, use_cache=True)
-        print(f"   Generated {len(embedding_results)} embeddings")
+            # Step 4: Chunk each chat as it streams in, generate embeddings and
+            # add them to the vector store in fixed-size batches, with the
+            # three stages overlapping
+            print(f"✂️  Chunking messages and generating embeddings using {self.embedding_model} model...")
+            kept_chunks = []
+            chat_tails = {}
+            chats_by_id = {chat.id: chat for chat in self.chats}
+            chunk_stats = self._new_chunk_stats()
+            message_totals = {'messages': 0, 'chats': 0, 'reused_chats': 0, 'last_message_id': 0}
+            chat_entries = {}  # chat_id -> (fingerprint, chunk ids) for the chunk store
+            
+            def chunk_batches() -> Iterator[List[MessageChunk]]:
+                pending = []
+                chats = chain([first_group], chat_groups)
+                if TQDM_AVAILABLE:
+                    # One throttled progress line instead of output per chat or batch
+                    chats = tqdm(chats, desc='   Chunking', unit=' chats', leave=False)
+                for chat_id, chat_msgs in chats:
+                    chat = chats_by_id[chat_id]
+                    max_id = max(msg.id for msg in chat_msgs)
+                    message_totals['messages'] += len(chat_msgs)
+                    message_totals['chats'] += 1
+                    message_totals['last_message_id'] = max(message_totals['last_message_id'], max_id)
+                    
+                    # Chats unchanged since the last full index keep their chunks;
+                    # their embeddings then come straight from the embedding cache
+                    fingerprint = self._chat_fingerprint(chat_msgs, chat, max_id)
+                    chunks = self._stored_chat_chunks(chat_id, fingerprint)
+                    if chunks is None:
+                        chunks = self._chunk_chat(chat_msgs, chat)
+                    else:
+                        message_totals['reused_chats'] += 1
+                    chat_entries[chat_id] = (fingerprint, [chunk.id for chunk in chunks])
+                    
+                    self._update_chunk_stats(chunk_stats, chunks)
+                    chat_tails[chat_id] = self._tail_state(chunks, chat_msgs)
+                    if keep_chunks:
+                        kept_chunks.extend(chunks)
+                    
+                    pending.extend(chunks)
+                    while len(pending) >= batch_size:
+                        yield pending[:batch_size]
+                        pending = pending[batch_size:]
+                if pending:
+                    yield pending
+            
+            total_embedded = self._embed_and_store(chunk_batches())
         
-        # Step 5: Build vector store
-        print(f"🔍 Building {self.vector_store_type} vector store...")
+        self.chunk_store.replace_chats(chat_entries)
         
-        # Initialize vector store manager
-        if self.vector_store_type == 'chromadb':
-            self.vector_store = VectorStoreManager(
-                store_type='chromadb',
-                persist_directory=str(self.cache_dir / 'chromadb'),
-                collection_name='imessage_chunks'
-            )
+        total_messages = message_totals['messages']
+        if days_limit:
+            print(f"   Using recent messages (last {days_limit} days): {total_messages:,}")
         else:
-            self.vector_store = VectorStoreManager(
-                store_type='memory',
-                embedding_dim=embedding_results[0].embedding_dim
-            )
+            print(f"   Using all messages: {total_messages:,}")
+        print(f"   Messages grouped into {message_totals['chats']} active chats")
+        if message_totals['reused_chats']:
+            print(f"   Reused chunks of {message_totals['reused_chats']} unchanged chats")
+        
+        self.chunks = kept_chunks
+        chunk_stats = self._finish_chunk_stats(chunk_stats)
+        print(f"   Created {chunk_stats['total_chunks']} chunks (avg: {chunk_stats['avg_messages_per_chunk']:.1f} msgs/chunk)")
+        print(f"   Generated {total_embedded} embeddings")
         
-        # Add chunks to vector store
-        self.vector_store.add_chunks(embedding_results, all_chunks)
         index_stats = self.vector_store.get_stats()
+        self._stats_cache = None
+        self._search_cache.clear()
         
-        if self.vector_store_type == 'chromadb':
-            print(f"   Indexed {index_stats['total_chunks']} chunks in ChromaDB")
-        else:
-            print(f"   Indexed {index_stats['total_embeddings']} chunks in memory")
+        store_type = self.vector_store.store_type  # May differ if a backend was unavailable
+        store_names = {'chromadb': 'ChromaDB', 'faiss': 'FAISS', 'memory': 'memory'}
+        print(f"   Indexed {index_stats['total_chunks']} chunks in {store_names[store_type]}")
         
-        # Step 6: Vector store is automatically persisted for ChromaDB
-        if save_index and self.vector_store_type == 'chromadb':
+        # Step 5: Vector store is automatically persisted for ChromaDB
+        if save_index and store_type == 'chromadb':
             print(f"💾 Vector store persisted to {self.cache_dir / 'chromadb'}")
-        elif save_index and self.vector_store_type == 'memory':
+        elif save_index and store_type == 'faiss':
+            self.vector_store.store.save()
+            print(f"💾 Saved FAISS index to {self.cache_dir / 'faiss'}")
+        elif save_index and store_type == 'memory':
             # For memory store, save as before
             index_path = self.cache_dir / f"imessage_index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             self.vector_store.store.save(str(index_path))
             print(f"💾 Saved memory index to {index_path}")
         
-        # Step 7: Save metadata
+        # Step 6: Save metadata
         metadata = {
             'indexed_at': datetime.now().isoformat(),
             'db_path': str(self.db_path) if self.db_path else 'default',
@@ -184,15 +388,356 @@ class iMessageIndexer:
             'processing_time_seconds': (datetime.now() - start_time).total_seconds()
         }
         
-        metadata_path = self.cache_dir / 'latest_index_metadata.json'
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        write_json_atomic(self.cache_dir / 'latest_index_metadata.json', metadata, indent=2)
+        
+        self._write_stats_snapshot(index_stats)
+        self._save_incremental_state({
+            'last_message_id': message_totals['last_message_id'],
+            'chunk_strategy': self.chunk_strategy,
+            'chat_tails': chat_tails
+        })
         
         processing_time = (datetime.now() - start_time).total_seconds()
         print(f"✅ Indexing complete in {processing_time:.1f} seconds!")
         
         return metadata
     
+    def run_incremental_index(self, save_index: bool = True, batch_size: int = 1000) -> Dict:
+        """
+        Index only the messages that arrived since the last run
+        
+        Messages are append-only, so only each chat's last chunk can change.
+        For every chat with new messages the old tail chunk is deleted and
+        the messages from its start onwards are re-chunked, embedded and
+        added. Requires the state written by run_full_index().
+        
+        Args:
+            save_index: Whether to save the index to disk (FAISS store)
+            batch_size: Chunks embedded and added to the vector store per batch
+            
+        Returns:
+            Dictionary with incremental indexing statistics
+        """
+        if not self.vector_store:
+            raise ValueError("Vector store not loaded. Call load_existing_vector_store() first.")
+        
+        state = self._load_incremental_state()
+        if state is None:
+            raise FileNotFoundError(f"No incremental state in {self.cache_dir}; run a full index first")
+        if state['chunk_strategy'] != self.chunk_strategy:
+            raise ValueError(f"Index was built with chunk strategy '{state['chunk_strategy']}'; run a full index")
+        
+        start_time = datetime.now()
+        chat_tails = state['chat_tails']
+        
+        print("🔄 Checking for new messages...")
+        with ChatDBParser(self.db_path) as parser:
+            new_by_chat = self._group_messages_by_chat(parser.iter_messages_after(state['last_message_id']))
+            if not new_by_chat:
+                print("   Index is up to date")
+                self._write_stats_snapshot(self.vector_store.get_stats())
+                return {'new_messages': 0, 'chunks_added': 0, 'chunks_removed': 0}
+            
+            chats_by_id = {chat.id: chat for chat in parser.get_chats()}
+            
+            new_chunks = []
+            stale_ids = []
+            for chat_id, new_msgs in new_by_chat.items():
+                chat = chats_by_id[chat_id]
+                tail = chat_tails.get(str(chat_id))
+                
+                if tail is None:
+                    chat_msgs = new_msgs
+                    chunks = self._chunk_chat(chat_msgs, chat)
+                else:
+                    # Re-read the chat from the tail chunk's start; the query is
+                    # padded slightly, so trim with a binary search on date
+                    tail_start = datetime.fromisoformat(tail['start_time'])
+                    chat_msgs = list(parser.iter_chat_messages_since(chat_id, tail_start))
+                    chat_msgs = chat_msgs[bisect_left(chat_msgs, tail_start, key=lambda m: m.date):]
+                    
+                    # Late-synced messages dated before the tail get chunks of their own
+                    late_msgs = new_msgs[:bisect_left(new_msgs, tail_start, key=lambda m: m.date)]
+                    
+                    chunks = self._chunk_chat(late_msgs, chat) + self._chunk_chat(chat_msgs, chat, tail['chunk_type'])
+                    if tail['chunk_id']:
+                        stale_ids.append(tail['chunk_id'])
+                
+                new_chunks.extend(chunks)
+                chat_tails[str(chat_id)] = self._tail_state(chunks, chat_msgs)
+        
+        new_message_count = sum(len(msgs) for msgs in new_by_chat.values())
+        print(f"   Found {new_message_count:,} new messages in {len(new_by_chat)} chats")
+        
+        # Replace the old tail chunks
+        self.vector_store.delete_chunks(stale_ids)
+        self.chunk_store.delete_many(stale_ids)
+        
+        self._embed_and_store(
+            new_chunks[batch_start:batch_start + batch_size]
+            for batch_start in range(0, len(new_chunks), batch_size)
+        )
+        
+        self._stats_cache = None
+        self._context_cache.clear()  # Cached chats may have new messages
+        self._search_cache.clear()
+        
+        if self.chunks:
+            stale = set(stale_ids)
+            self.chunks = [chunk for chunk in self.chunks if chunk.id not in stale] + new_chunks
+        else:
+            # Only chunks resolved by search() are held; drop the replaced tails
+            with self._resolved_lock:
+                for chunk_id in stale_ids:
+                    self._resolved_chunks.pop(chunk_id, None)
+        
+        if save_index and self.vector_store.store_type == 'faiss':
+            self.vector_store.store.save()
+        
+        self._write_stats_snapshot(self.vector_store.get_stats())
+        self._save_incremental_state({
+            'last_message_id': max(msg.id for msgs in new_by_chat.values() for msg in msgs),
+            'chunk_strategy': self.chunk_strategy,
+            'chat_tails': chat_tails
+        })
+        
+        processing_time = (datetime.now() - start_time).total_seconds()
+        print(f"✅ Added {len(new_chunks)} chunks (replaced {len(stale_ids)}) in {processing_time:.1f} seconds")
+        
+        return {
+            'new_messages': new_message_count,
+            'chunks_added': len(new_chunks),
+            'chunks_removed': len(stale_ids),
+            'processing_time_seconds': processing_time
+        }
+    
+    def _embed_and_store(self, chunk_batches: Iterable[List[MessageChunk]]) -> int:
+        """
+        Embed chunk batches and add them to the vector store
+        
+        Batches are produced on a background thread, embedded by
+        EMBED_IN_FLIGHT worker(s) and inserted by a single writer thread, so
+        chunking, embedding and vector store writes overlap. At most
+        PIPELINE_DEPTH batches wait between stages; batches are inserted in
+        order.
+        
+        Args:
+            chunk_batches: Batches of chunks, possibly produced lazily
+            
+        Returns:
+            Number of chunks embedded
+        """
+        in_flight = self.EMBED_IN_FLIGHT.get(self.embedding_model, 1)
+        total_embedded = 0
+        pending_embeds = deque()  # (batch, future) in submission order
+        pending_writes = deque()
+        
+        with ThreadPoolExecutor(max_workers=in_flight, thread_name_prefix='embed') as embedder, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix='vector-store') as writer:
+            
+            def store_batch(embedding_results: List[EmbeddingResult], batch_chunks: List[MessageChunk]) -> None:
+                self.vector_store.add_chunks(embedding_results, batch_chunks, verbose=self.verbose)
+                self.chunk_store.put_many(batch_chunks)
+            
+            def store_oldest() -> int:
+                batch_chunks, future = pending_embeds.popleft()
+                embedding_results = future.result()
+                pending_writes.append(writer.submit(store_batch, embedding_results, batch_chunks))
+                
+                # Backpressure: wait for the oldest write once enough are queued
+                if len(pending_writes) > self.PIPELINE_DEPTH:
+                    pending_writes.popleft().result()
+                return len(embedding_results)
+            
+            with closing(_prefetch(chunk_batches, self.PIPELINE_DEPTH)) as batches:
+                for batch_chunks in batches:
+                    future = embedder.submit(self.embedding_generator.embed_chunks, batch_chunks, True)
+                    pending_embeds.append((batch_chunks, future))
+                    if len(pending_embeds) >= in_flight:
+                        total_embedded += store_oldest()
+            
+            while pending_embeds:
+                total_embedded += store_oldest()
+            for future in pending_writes:
+                future.result()
+        
+        return total_embedded
+    
+    def _chunk_chat(self, messages: List[Message], chat: Chat, chunk_type: Optional[str] = None) -> List[MessageChunk]:
+        """Chunk one chat's messages with the configured strategy
+        
+        Args:
+            messages: The chat's messages, sorted by date
+            chat: The chat the messages belong to
+            chunk_type: Re-use the strategy that produced chunks of this type
+                (keeps re-chunked tails consistent under the adaptive strategy)
+        """
+        if not messages:
+            return []
+        
+        strategy = self._STRATEGY_BY_CHUNK_TYPE.get(chunk_type, self.chunk_strategy)
+        
+        if strategy == 'adaptive':
+            return self.chunker.chunk_messages_adaptive(messages, chat)
+        elif strategy == 'time_window':
+            return self.chunker.chunk_by_time_windows(messages, chat)
+        elif strategy == 'daily':
+            return self.chunker.chunk_by_daily_groups(messages, chat)
+        elif strategy == 'participant':
+            return self.chunker.chunk_by_participants(messages, chat)
+        else:
+            raise ValueError(f"Unknown chunk strategy: {strategy}")
+    
+    def _chat_fingerprint(self, messages: List[Message], chat: Chat, max_id: int) -> str:
+        """Digest of everything a chat's chunks depend on
+        
+        Messages are append-only (the same assumption incremental indexing
+        makes), so their count, ids and last date stand in for their texts.
+        """
+        chunker = self.chunker
+        key = (
+            self.chunk_strategy,
+            chunker.time_window_minutes,
+            chunker.max_messages_per_chunk,
+            chunker.min_messages_per_chunk,
+            chat.display_name,
+            chat.style,
+            tuple(chat.participants),
+            len(messages),
+            messages[0].id,
+            messages[-1].id,
+            max_id,
+            messages[-1].date.isoformat()
+        )
+        return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+    
+    def _stored_chat_chunks(self, chat_id: int, fingerprint: str) -> Optional[List[MessageChunk]]:
+        """A chat's chunks from the last full index, if its fingerprint still matches"""
+        entry = self.chunk_store.get_chat(chat_id)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        
+        chunk_ids = entry[1]
+        stored = self.chunk_store.get_many(chunk_ids)
+        if len(stored) != len(chunk_ids):
+            return None  # Some were replaced by an incremental run since
+        return [stored[chunk_id] for chunk_id in chunk_ids]
+    
+    @staticmethod
+    def _new_chunk_stats() -> Dict:
+        """Running totals for chunk statistics gathered batch by batch"""
+        return {
+            'total_chunks': 0,
+            'total_messages': 0,
+            'min_messages_per_chunk': None,
+            'max_messages_per_chunk': None,
+            'total_text_length': 0,
+            'chunk_types': {}
+        }
+    
+    @staticmethod
+    def _update_chunk_stats(stats: Dict, chunks: List[MessageChunk]) -> None:
+        """Fold a chat's chunks into the running totals"""
+        if not chunks:
+            return
+        
+        chunk_sizes = [len(chunk.messages) for chunk in chunks]
+        stats['total_chunks'] += len(chunks)
+        stats['total_messages'] += sum(chunk_sizes)
+        stats['total_text_length'] += sum(len(chunk.text_content) for chunk in chunks)
+        if stats['min_messages_per_chunk'] is not None:
+            chunk_sizes.extend((stats['min_messages_per_chunk'], stats['max_messages_per_chunk']))
+        stats['min_messages_per_chunk'] = min(chunk_sizes)
+        stats['max_messages_per_chunk'] = max(chunk_sizes)
+        for chunk in chunks:
+            stats['chunk_types'][chunk.chunk_type] = stats['chunk_types'].get(chunk.chunk_type, 0) + 1
+    
+    @staticmethod
+    def _finish_chunk_stats(stats: Dict) -> Dict:
+        """Running totals -> the same dict MessageChunker.get_chunking_stats() returns"""
+        total_chunks = stats['total_chunks']
+        if not total_chunks:
+            return {}
+        
+        return {
+            'total_chunks': total_chunks,
+            'total_messages': stats['total_messages'],
+            'avg_messages_per_chunk': stats['total_messages'] / total_chunks,
+            'min_messages_per_chunk': stats['min_messages_per_chunk'],
+            'max_messages_per_chunk': stats['max_messages_per_chunk'],
+            'avg_text_length': stats['total_text_length'] / total_chunks,
+            'chunk_types': stats['chunk_types']
+        }
+    
+    @staticmethod
+    def _tail_state(chunks: List[MessageChunk], messages: List[Message]) -> Dict:
+        """Where the next incremental run has to start re-chunking a chat
+        
+        If no chunk was produced (too few messages), re-chunk from the first
+        message so those messages aren't lost.
+        """
+        if chunks:
+            tail = chunks[-1]
+            return {'chunk_id': tail.id, 'chunk_type': tail.chunk_type, 'start_time': tail.start_time_iso}
+        return {'chunk_id': None, 'chunk_type': None, 'start_time': messages[0].date.isoformat()}
+    
+    def load_stats_snapshot(self) -> Optional[Dict]:
+        """
+        Vector store totals saved by the last indexing run
+        
+        Only trusted while the snapshot is newer than chat.db, i.e. no
+        messages have arrived since. Lets startup skip opening the vector
+        store just to count chunks.
+        
+        Returns:
+            Dictionary with total_chunks, unique_chats, store_type and
+            indexed_at, or None if missing or stale
+        """
+        snapshot_path = self.cache_dir / self.STATS_SNAPSHOT_FILE
+        try:
+            if snapshot_path.stat().st_mtime <= self._chat_db_mtime():
+                return None
+            snapshot = read_json(snapshot_path)
+        except (OSError, ValueError):
+            return None
+        
+        if snapshot.get('store_type') != self.vector_store_type:
+            return None
+        return snapshot
+    
+    def _write_stats_snapshot(self, index_stats: Dict) -> None:
+        """Atomically write the stats snapshot read by load_stats_snapshot()"""
+        snapshot = {
+            'total_chunks': index_stats.get('total_chunks', index_stats.get('total_embeddings', 0)),
+            'unique_chats': index_stats.get('unique_chats', index_stats.get('unique_chats_sample')),
+            'store_type': self.vector_store_type,
+            'indexed_at': datetime.now().isoformat()
+        }
+        
+        write_json_atomic(self.cache_dir / self.STATS_SNAPSHOT_FILE, snapshot)
+    
+    def _chat_db_mtime(self) -> float:
+        """Last modification time of chat.db, including its write-ahead log"""
+        db_path = ChatDBParser(self.db_path).db_path
+        # New messages land in chat.db-wal until SQLite checkpoints them
+        wal_path = db_path.with_name(db_path.name + '-wal')
+        return max(path.stat().st_mtime for path in (db_path, wal_path) if path.exists())
+    
+    def _save_incremental_state(self, state: Dict) -> None:
+        """Persist incremental indexing state next to the index"""
+        write_json_atomic(self.cache_dir / self.INCREMENTAL_STATE_FILE, state)
+    
+    def _load_incremental_state(self) -> Optional[Dict]:
+        """Load incremental indexing state, or None if there is none"""
+        state_path = self.cache_dir / self.INCREMENTAL_STATE_FILE
+        if not state_path.exists():
+            return None
+        try:
+            return read_json(state_path)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  Ignoring unreadable incremental state {state_path}: {e}")
+            return None
+    
     def search(self, query: str, top_k: int = 5, where_filters: Optional[Dict] = None) -> List[Tuple[MessageChunk, float]]:
         """
         Search the vector store for relevant message chunks
@@ -205,29 +750,163 @@ class iMessageIndexer:
         Returns:
             List of (MessageChunk, similarity_score) tuples
         """
+        return self.search_many([query], top_k, where_filters)[0]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        where_filters: Optional[Dict] = None
+    ) -> List[List[Tuple[MessageChunk, float]]]:
+        """
+        Search for several queries at once
+        
+        The queries are embedded in one batch and sent to the vector store in
+        one call, and all their chunks are resolved together. Results for
+        recently seen queries come from an LRU cache, which is emptied
+        whenever the index changes.
+        
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            where_filters: Optional metadata filters for ChromaDB, applied to every query
+            
+        Returns:
+            One list of (MessageChunk, similarity_score) tuples per query, in order
+        """
         if not self.vector_store:
             raise ValueError("Vector store not built. Run run_full_index() first.")
+        if not queries:
+            return []
         
-        # Generate embedding for query
-        query_embedding = self.embedding_generator.embed_text(query)
+        # Generate embeddings for the queries
+        query_embeddings = np.asarray(self.embedding_generator.embed_texts(queries), dtype=np.float32)
         
-        # Search vector store
-        if self.vector_store_type == 'chromadb':
-            results = self.vector_store.search(query_embedding, top_k, where_filters=where_filters)
-        else:
-            results = self.vector_store.search(query_embedding, top_k)
-        
-        # Convert results to MessageChunk objects
-        chunk_results = []
-        for metadata, score in results:
-            # Find the corresponding chunk by ID
-            chunk_id = metadata.get('chunk_id') or metadata.get('id')
-            chunk = next((c for c in self.chunks if c.id == chunk_id), None)
+        # Serve what we can from the cache of recent results
+        filters_key = json.dumps(where_filters, sort_keys=True, default=str)
+        keys = [(self._query_signature(embedding), top_k, filters_key) for embedding in query_embeddings]
+        found: List[Optional[Tuple[Tuple[MessageChunk, float], ...]]] = [None] * len(queries)
+        with self._search_lock:
+            for i, key in enumerate(keys):
+                found[i] = self._search_cache.get(key)
+                if found[i] is not None:
+                    self._search_cache.move_to_end(key)
+        misses = [i for i, results in enumerate(found) if results is None]
+        
+        if misses:
+            # Search vector store; chunk text comes from the chunk store, so
+            # the vector store needn't send documents back
+            batch_results = self.vector_store.search_batch(
+                query_embeddings[misses], top_k, where_filters=where_filters, return_documents=False
+            )
             
-            if chunk:
-                chunk_results.append((chunk, score))
+            # Convert results to MessageChunk objects; results come first in zip()
+            # so the shared chunk iterator isn't advanced past each query's results
+            chunks = iter(self._resolve_chunks([metadata for results in batch_results for metadata, _ in results]))
+            
+            with self._search_lock:
+                for i, results in zip(misses, batch_results):
+                    found[i] = tuple((chunk, score) for (_, score), chunk in zip(results, chunks) if chunk)
+                    self._search_cache[keys[i]] = found[i]
+                    self._search_cache.move_to_end(keys[i])
+                while len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
+        
+        return [list(results) for results in found]
+    
+    @staticmethod
+    def _query_signature(embedding: np.ndarray) -> bytes:
+        """Cache key for a query embedding: its unit vector rounded to int8
         
-        return chunk_results
+        Identical questions map to the same key, as do rephrasings whose
+        embeddings differ by less than the rounding step in every dimension.
+        """
+        unit = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+        return np.round(unit * 127).astype(np.int8).tobytes()
+    
+    def _resolve_chunks(self, metadatas: List[Dict]) -> List[Optional[MessageChunk]]:
+        """Find the chunk for each search result, loading those not in memory
+        
+        After load_existing_vector_store() or run_full_index(keep_chunks=False)
+        self.chunks is empty. Missing chunks are read from the chunk store;
+        chunks it doesn't have (indexes built before it existed) are rebuilt
+        from chat.db using the stored chat id and time range. Either way the
+        most recently used RESOLVED_CHUNK_CACHE_SIZE of them are kept for later
+        lookups (e.g. get_conversation_context()).
+        """
+        chunks = [self._cached_chunk(metadata.get('chunk_id') or metadata.get('id')) for metadata in metadatas]
+        missing = [i for i, chunk in enumerate(chunks) if chunk is None]
+        if not missing:
+            return chunks
+        
+        stored = self.chunk_store.get_many([metadatas[i].get('chunk_id') or metadatas[i].get('id') for i in missing])
+        self._remember_chunks(stored.values())
+        for i in missing:
+            chunks[i] = stored.get(metadatas[i].get('chunk_id') or metadatas[i].get('id'))
+        
+        missing = [i for i in missing if chunks[i] is None]
+        if not missing:
+            return chunks
+        
+        with self._chat_db() as parser:
+            if not self.chats:
+                self.chats = parser.get_chats()
+            chats_by_id = {chat.id: chat for chat in self.chats}
+            
+            for i in missing:
+                chunks[i] = self._rebuild_chunk(parser, metadatas[i], chats_by_id)
+        self._remember_chunks(chunk for chunk in (chunks[i] for i in missing) if chunk is not None)
+        
+        return chunks
+    
+    def _cached_chunk(self, chunk_id: Optional[str]) -> Optional[MessageChunk]:
+        """A chunk from self.chunks or the resolved-chunk cache, if held"""
+        chunk = self._chunks_by_id.get(chunk_id)
+        if chunk is None:
+            with self._resolved_lock:
+                chunk = self._resolved_chunks.get(chunk_id)
+                if chunk is not None:
+                    self._resolved_chunks.move_to_end(chunk_id)
+        return chunk
+    
+    def _remember_chunks(self, chunks: Iterable[MessageChunk]) -> None:
+        """Add resolved chunks to the cache, evicting the least recently used"""
+        with self._resolved_lock:
+            for chunk in chunks:
+                self._resolved_chunks[chunk.id] = chunk
+                self._resolved_chunks.move_to_end(chunk.id)
+            while len(self._resolved_chunks) > self.RESOLVED_CHUNK_CACHE_SIZE:
+                self._resolved_chunks.popitem(last=False)
+    
+    def _rebuild_chunk(self, parser: ChatDBParser, metadata: Dict, chats_by_id: Dict[int, Chat]) -> Optional[MessageChunk]:
+        """Re-create a stored chunk from its vector store metadata
+        
+        Returns None if the chat or the chunk's first message no longer exists.
+        """
+        chunk_id = metadata.get('chunk_id') or metadata.get('id')
+        chat = chats_by_id.get(metadata.get('chat_id'))
+        if not chunk_id or chat is None:
+            return None
+        
+        # Chunk ids end in "<first message id>_<last message id>"; the last id
+        # is stale for chunks that absorbed a short trailing group, so the
+        # range ends at the stored end time instead
+        first_id = int(chunk_id.rsplit('_', 2)[1])
+        end_time = datetime.fromisoformat(metadata['end_time'])
+        
+        messages = []
+        for msg in parser.iter_chat_messages_since(chat.id, datetime.fromisoformat(metadata['start_time'])):
+            if msg.date > end_time:
+                break
+            if messages or msg.id == first_id:
+                messages.append(msg)
+        if not messages:
+            return None
+        
+        chunk = self.chunker._create_chunk(messages, chat, metadata['chunk_type'])
+        # A chunk that absorbed a short trailing group keeps its original id
+        chunk.id = chunk_id
+        return chunk
     
     def get_conversation_context(self, chunk_id: str, context_messages: int = 10) -> List[Message]:
         """
@@ -240,19 +919,20 @@ class iMessageIndexer:
         Returns:
             List of messages with context
         """
-        chunk = next(c for c in self.chunks if c.id == chunk_id)
-        
-        # Get all messages from the same chat
-        with ChatDBParser(self.db_path) as parser:
-            all_chat_messages = parser.get_messages(chat_id=chunk.chat_id)
+        chunk = self._cached_chunk(chunk_id)
+        if chunk is None:
+            # Evicted (or never resolved); the chunk store still has it
+            chunk = self.chunk_store.get_many([chunk_id]).get(chunk_id)
+            if chunk is None:
+                raise KeyError(chunk_id)
+        all_chat_messages, sorted_ids, order = self._chat_message_positions(chunk.chat_id)
         
-        # Find the chunk's message range
-        chunk_start_id = chunk.messages[0].id
-        chunk_end_id = chunk.messages[-1].id
-        
-        # Find indices
-        start_idx = next(i for i, msg in enumerate(all_chat_messages) if msg.id == chunk_start_id)
-        end_idx = next(i for i, msg in enumerate(all_chat_messages) if msg.id == chunk_end_id)
+        # Find the chunk's message range with a binary search over the ids
+        wanted = np.array([chunk.messages[0].id, chunk.messages[-1].id], dtype=np.int64)
+        found = np.minimum(np.searchsorted(sorted_ids, wanted), len(sorted_ids) - 1)
+        if not len(sorted_ids) or not np.array_equal(sorted_ids[found], wanted):
+            raise KeyError(f"Messages of chunk {chunk_id} are no longer in chat.db")
+        start_idx, end_idx = order[found].tolist()
         
         # Get context
         context_start = max(0, start_idx - context_messages)
@@ -260,18 +940,47 @@ class iMessageIndexer:
         
         return all_chat_messages[context_start:context_end]
     
-    def _group_messages_by_chat(self, messages: List[Message]) -> Dict[int, List[Message]]:
+    def _chat_message_positions(self, chat_id: int) -> Tuple[List[Message], np.ndarray, np.ndarray]:
+        """All messages of a chat plus their ids sorted, cached briefly per chat
+        
+        Returns:
+            (messages in date order, sorted message ids, position of each sorted
+            id in messages). Ids usually follow date order, but late-synced
+            messages don't, hence the argsort.
+        """
+        now = time.monotonic()
+        with self._context_lock:
+            cached = self._context_cache.get(chat_id)
+            if cached is not None and now - cached[0] < self.CONTEXT_CACHE_TTL_SECONDS:
+                self._context_cache.move_to_end(chat_id)
+                return cached[1:]
+        
+        with self._chat_db() as parser:
+            messages = parser.get_messages(chat_id=chat_id)
+        ids = np.fromiter((msg.id for msg in messages), dtype=np.int64, count=len(messages))
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        
+        with self._context_lock:
+            self._context_cache[chat_id] = (now, messages, sorted_ids, order)
+            self._context_cache.move_to_end(chat_id)
+            while len(self._context_cache) > self.CONTEXT_CACHE_SIZE:
+                self._context_cache.popitem(last=False)
+        
+        return messages, sorted_ids, order
+    
+    def _group_messages_by_chat(self, messages: Iterable[Message]) -> Dict[int, List[Message]]:
         """Group messages by chat_id and sort by date"""
-        chat_groups = {}
+        chat_groups = defaultdict(list)
         
         for message in messages:
-            if message.chat_id not in chat_groups:
-                chat_groups[message.chat_id] = []
             chat_groups[message.chat_id].append(message)
         
-        # Sort messages within each chat by date
-        for chat_id in chat_groups:
-            chat_groups[chat_id].sort(key=lambda m: m.date)
+        # Sort messages within each chat by date. The parser already returns
+        # date order (or its reverse), which Timsort handles in one linear pass
+        date_key = attrgetter('date')
+        for chat_messages in chat_groups.values():
+            chat_messages.sort(key=date_key)
         
         return chat_groups
     
@@ -286,6 +995,15 @@ class iMessageIndexer:
                 collection_name='imessage_chunks'
             )
             print(f"📂 Loaded ChromaDB vector store from {persist_dir}")
+        elif self.vector_store_type == 'faiss':
+            persist_dir = persist_directory or str(self.cache_dir / 'faiss')
+            if not Path(persist_dir, 'faiss.index').exists():
+                raise FileNotFoundError(f"No FAISS index found in {persist_dir}")
+            self.vector_store = VectorStoreManager(
+                store_type='faiss',
+                persist_directory=persist_dir
+            )
+            print(f"📂 Loaded FAISS index from {persist_dir}")
         else:
             # For memory store, load from JSON file
             if not persist_directory:
@@ -295,15 +1013,28 @@ class iMessageIndexer:
             self.vector_store.store = EmbeddingIndex.load(persist_directory)
             print(f"📂 Loaded memory index from {persist_directory}")
         
+        self._stats_cache = None
+        self._search_cache.clear()
+        
         # Load metadata if available
         metadata_path = self.cache_dir / 'latest_index_metadata.json'
         if metadata_path.exists():
-            with open(metadata_path) as f:
-                metadata = json.load(f)
-                print(f"   Vector store from {metadata['indexed_at']}")
+            metadata = read_json(metadata_path)
+            print(f"   Vector store from {metadata['indexed_at']}")
     
-    def get_stats(self) -> Dict:
-        """Get comprehensive statistics about the current vector store and pipeline"""
+    def get_stats(self, use_cache: bool = True) -> Dict:
+        """
+        Get comprehensive statistics about the current vector store and pipeline
+        
+        Args:
+            use_cache: Reuse a result younger than STATS_TTL_SECONDS instead of
+                querying the vector store (collection.count() etc.) again
+        """
+        if use_cache and self._stats_cache is not None:
+            computed_at, cached = self._stats_cache
+            if time.monotonic() - computed_at < self.STATS_TTL_SECONDS:
+                return dict(cached)
+        
         stats = {}
         
         if self.vector_store:
@@ -322,6 +1053,7 @@ class iMessageIndexer:
             'cache_dir': str(self.cache_dir)
         }
         
+        self._stats_cache = (time.monotonic(), dict(stats))
         return stats
 
 
@@ -335,10 +1067,12 @@ def main():
     parser.add_argument('--model', choices=['local', 'openai'], default='local', help='Embedding model type')
     parser.add_argument('--chunk-strategy', choices=['adaptive', 'time_window', 'daily', 'participant'], 
                        default='adaptive', help='Message chunking strategy')
-    parser.add_argument('--vector-store', choices=['chromadb', 'memory'], default='chromadb',
+    parser.add_argument('--vector-store', choices=['chromadb', 'faiss', 'memory'], default='chromadb',
                        help='Vector store type')
+    parser.add_argument('--quantize', choices=['float16', 'int8'], help='Store quantized vectors (FAISS and memory stores)')
     parser.add_argument('--openai-key', help='OpenAI API key (if using OpenAI embeddings)')
     parser.add_argument('--test-search', help='Test search query after indexing')
+    parser.add_argument('--verbose', action='store_true', help='Print every vector store batch write')
     
     args = parser.parse_args()
     
@@ -348,13 +1082,16 @@ def main():
             embedding_model=args.model,
             chunk_strategy=args.chunk_strategy,
             vector_store_type=args.vector_store,
-            openai_api_key=args.openai_key
+            quantization=args.quantize,
+            openai_api_key=args.openai_key,
+            verbose=args.verbose
         )
         
         # Run indexing
         metadata = indexer.run_full_index(
             days_limit=args.days,
-            message_limit=args.limit
+            message_limit=args.limit,
+            keep_chunks=False
         )
         
         print("\n📊 Indexing Results:")
@@ -0,0 +1,127 @@
+"""
+Cross-encoder reranking for RAG retrieval
+
+Vector search over-fetches candidates; a cross-encoder then scores each
+(question, chunk) pair jointly and keeps the best few for the prompt.
+Scores are cached per (question, chunk), so follow-up questions in an
+interactive session that hit the same chunks don't pay for the model again.
+"""
+
+import time
+import heapq
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+try:
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CROSS_ENCODER_AVAILABLE = False
+
+from .chunker import MessageChunk
+
+
+class Reranker:
+    """Reranks retrieved chunks with a cross-encoder"""
+
+    DEFAULT_MODEL = 'BAAI/bge-reranker-v2-m3'
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: int = 32,
+        cache_size: int = 10_000,
+        cache_ttl_seconds: float = 900
+    ):
+        """
+        Initialize reranker
+
+        Args:
+            model_name: Cross-encoder model name or None for the default
+            batch_size: (question, chunk) pairs scored per forward pass
+            cache_size: Maximum cached scores (least recently used are evicted)
+            cache_ttl_seconds: How long a cached score stays valid
+        """
+        if not CROSS_ENCODER_AVAILABLE:
+            raise ImportError("sentence-transformers not installed. Run: pip install sentence-transformers")
+
+        self.model_name = model_name or self.DEFAULT_MODEL
+        self.model = CrossEncoder(self.model_name)
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+
+        # (sha1(question), chunk_id) -> (scored_at, score), oldest first
+        self._score_cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()  # RAGSystem.aask() retrieves from worker threads
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def rerank(self, query: str, chunks: List[MessageChunk], top_n: int = 8) -> List[Tuple[MessageChunk, float]]:
+        """
+        Score chunks against a query and return the best ones
+
+        Args:
+            query: The user's question
+            chunks: Candidate chunks from vector search, best first
+            top_n: Number of chunks to keep
+
+        Returns:
+            List of (MessageChunk, score) tuples, highest score first
+        """
+        if not chunks:
+            return []
+
+        scores = self._scores(query, chunks)
+        # Heap selection of the top_n instead of sorting every candidate
+        return heapq.nlargest(top_n, zip(chunks, scores), key=lambda pair: pair[1])
+
+    def _scores(self, query: str, chunks: List[MessageChunk]) -> List[float]:
+        """Cross-encoder scores for each chunk, computing only cache misses"""
+        query_key = hashlib.sha1(query.encode('utf-8')).digest()
+        now = time.monotonic()
+        scores: List[Optional[float]] = [None] * len(chunks)
+
+        with self._lock:
+            for i, chunk in enumerate(chunks):
+                cached = self._score_cache.get((query_key, chunk.id))
+                if cached is not None and now - cached[0] < self.cache_ttl_seconds:
+                    self._score_cache.move_to_end((query_key, chunk.id))
+                    scores[i] = cached[1]
+
+            missing = [i for i, score in enumerate(scores) if score is None]
+            self.cache_hits += len(chunks) - len(missing)
+            self.cache_misses += len(missing)
+
+        if missing:
+            # One batched predict() call for all uncached pairs
+            pairs = [(query, chunks[i].text_content) for i in missing]
+            predicted = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self._score_cache[(query_key, chunks[i].id)] = (now, scores[i])
+                    self._score_cache.move_to_end((query_key, chunks[i].id))
+
+                while len(self._score_cache) > self.cache_size:
+                    self._score_cache.popitem(last=False)
+
+        return scores
+
+    def clear_cache(self) -> None:
+        """Drop all cached scores"""
+        with self._lock:
+            self._score_cache.clear()
+
+    def get_cache_stats(self) -> dict:
+        """Get score cache statistics"""
+        with self._lock:
+            return {
+                'model_name': self.model_name,
+                'cached_scores': len(self._score_cache),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses
+            }
@@ -3,30 +3,95 @@
 Test script for ChromaDB vector store integration
 
 Tests the ChromaDB functionality separately from the full pipeline.
+
+Run from the repository root: python -m indexer.test_chromadb
 """
 
+import io
 import sys
+import hashlib
 import os
+import time
 import tempfile
 import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Tuple
 
-# Add indexer to path
-sys.path.insert(0, str(Path(__file__).parent))
+import numpy as np
 
 try:
-    from vector_store import ChromaVectorStore, VectorStoreManager
-    from embeddings import EmbeddingResult
-    from chunker import MessageChunk, Message
-    from chat_db_parser import Chat
+    from .vector_store import ChromaVectorStore, FaissVectorStore, VectorStoreManager, FAISS_AVAILABLE
+    from .embeddings import EmbeddingResult
+    from .chunker import MessageChunk, Message
+    from .chat_db_parser import Chat
 except ImportError as e:
     print(f"❌ Import error: {e}")
     sys.exit(1)
 
+# Bulk inserts manage thousands of chunks/s; per-chunk inserts fall far below this
+MIN_ADD_THROUGHPUT = 200
+
+# Query vector pointing the same way as the first test chunk's, shared by
+# every search; unit length like the fixture embeddings
+QUERY_EMB = np.full(384, 0.11, dtype=np.float32)
+QUERY_EMB /= np.linalg.norm(QUERY_EMB)
+
+# Fixed message timestamps keep the fixture identical across runs
+FIXED_TS = datetime(2026, 2, 16, 16, 0, 0)
+
+
+def _remove_in_background(path: str) -> None:
+    """Delete a test directory without blocking the test that used it
+    
+    The thread is non-daemon, so the process waits for it before exiting.
+    """
+    threading.Thread(target=shutil.rmtree, args=(path,), kwargs={'ignore_errors': True}).start()
+
+
+@lru_cache(maxsize=1)
+def _shared_test_dir() -> str:
+    """Persist directory shared by the basic and manager tests
+    
+    Each test uses its own collection; ChromaDB reuses one client (SQLite
+    connection and segment caches) per directory within a process, so the
+    second test skips its startup cost.
+    """
+    return tempfile.mkdtemp(prefix="test_chromadb_")
+
+
+def test_shared_store():
+    """Run the tests that share one persist directory, then remove it"""
+    try:
+        # & rather than `and`, so a failure doesn't skip the second test
+        return test_chromadb_basic() & test_vector_store_manager()
+    finally:
+        _remove_in_background(_shared_test_dir())
+        _shared_test_dir.cache_clear()
+
 
-def create_test_chunks():
-    """Create some test message chunks for testing"""
+def create_test_chunks(n_chunks: int = 500):
+    """Create test message chunks for testing
+    
+    The fixture is built once and shared by every test, so treat it as
+    read-only; a test that needs to modify it should copy.deepcopy() it first.
+    
+    Args:
+        n_chunks: Number of chunks; enough to exercise batched inserts
+        
+    Returns:
+        (chunks, embedding results, chat) with chunks and results as tuples
+    """
+    return _build_fixture(n_chunks)
+
+
+@lru_cache(maxsize=1)
+def _build_fixture(n_chunks: int):
+    """Build the shared test fixture for create_test_chunks()"""
     # Mock chat
     chat = Chat(
         id=1,
@@ -38,12 +103,12 @@ def create_test_chunks():
         participants=["alice@example.com", "bob@example.com"]
     )
     
-    # Mock messages
+    # Mock messages, one minute apart from FIXED_TS
     messages = [
         Message(
             id=1,
             text="Hey, are we still meeting for lunch tomorrow?",
-            date=datetime.now(),
+            date=FIXED_TS,
             is_from_me=False,
             sender_id="alice@example.com",
             chat_id=1,
@@ -53,7 +118,7 @@ def create_test_chunks():
         Message(
             id=2, 
             text="Yes! Looking forward to it. How about 12:30 at the usual place?",
-            date=datetime.now(),
+            date=FIXED_TS + timedelta(minutes=1),
             is_from_me=True,
             sender_id=None,
             chat_id=1,
@@ -63,7 +128,7 @@ def create_test_chunks():
         Message(
             id=3,
             text="Perfect! See you then.",
-            date=datetime.now(),
+            date=FIXED_TS + timedelta(minutes=2),
             is_from_me=False,
             sender_id="alice@example.com",
             chat_id=1,
@@ -72,35 +137,57 @@ def create_test_chunks():
         )
     ]
     
-    # Create test chunk
-    chunk = MessageChunk(
-        id="test_chunk_1",
-        chat_id=1,
-        messages=messages,
-        start_time=messages[0].date,
-        end_time=messages[-1].date,
-        participants=chat.participants,
-        text_content="[2026-02-16 16:00] Alice: Hey, are we still meeting for lunch tomorrow?\n[2026-02-16 16:01] Me: Yes! Looking forward to it. How about 12:30 at the usual place?\n[2026-02-16 16:02] Alice: Perfect! See you then.",
-        chunk_type="conversation_window",
-        metadata={
-            'message_count': len(messages),
-            'unique_senders': 2,
-            'has_media': False,
-            'avg_message_length': 35.0
-        }
+    # Same layout as MessageChunker's embedding text, in one join
+    text_content = "\n".join(
+        f"[{msg.date:%Y-%m-%d %H:%M}] {'Me' if msg.is_from_me else msg.sender_id.split('@')[0].title()}: {msg.text}"
+        for msg in messages
     )
+    metadata = {
+        'message_count': len(messages),
+        'unique_senders': 2,
+        'has_media': False,
+        'avg_message_length': 35.0
+    }
+    
+    # Content hash as EmbeddingGenerator computes it without xxhash; every
+    # chunk has the same text, so it's hashed once
+    text_hash = hashlib.blake2b(text_content.encode('utf-8'), digest_size=16).hexdigest()
     
-    # Create mock embedding result
-    embedding = [0.1] * 384  # Mock 384-dimensional embedding
-    result = EmbeddingResult(
-        chunk_id="test_chunk_1",
-        embedding=embedding,
-        model_name="test-model",
-        embedding_dim=384,
-        text_hash="testhash123"
+    # Mock 384-dimensional embeddings, generated in one go; the first chunk
+    # gets a constant vector so searches for QUERY_EMB find it first. Unit
+    # length, as real embeddings are, so similarity is a plain dot product
+    embeddings = np.random.default_rng(0).random((n_chunks, 384), dtype=np.float32)
+    embeddings[0] = 0.1
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings.flags.writeable = False  # Results hold views of its rows
+    
+    chunks = tuple(
+        MessageChunk(
+            id=f"test_chunk_{i + 1}",
+            chat_id=1,
+            messages=messages,
+            start_time=messages[0].date,
+            end_time=messages[-1].date,
+            participants=chat.participants,
+            text_content=text_content,
+            chunk_type="conversation_window",
+            metadata=dict(metadata)
+        )
+        for i in range(n_chunks)
     )
     
-    return [chunk], [result], chat
+    results = tuple(
+        EmbeddingResult(
+            chunk_id=chunk.id,
+            embedding=embedding,
+            model_name="test-model",
+            embedding_dim=384,
+            text_hash=text_hash
+        )
+        for chunk, embedding in zip(chunks, embeddings)
+    )
+    
+    return chunks, results, chat
 
 
 def test_chromadb_basic():
@@ -108,24 +195,27 @@ def test_chromadb_basic():
     print("🧪 Testing ChromaDB Basic Operations")
     print("=" * 40)
     
-    # Create temporary directory for test
-    test_dir = tempfile.mkdtemp(prefix="test_chromadb_")
-    
     try:
         # Initialize ChromaDB store
         print("1️⃣ Initializing ChromaDB store...")
         store = ChromaVectorStore(
-            persist_directory=test_dir,
-            collection_name="test_collection"
+            persist_directory=_shared_test_dir(),
+            collection_name="basic"
         )
         print("   ✅ ChromaDB store initialized")
         
         # Create test data
         chunks, embedding_results, chat = create_test_chunks()
         
-        # Test adding chunks
+        # Test adding chunks; add_chunks splits them into add_batch_size inserts
         print("\n2️⃣ Adding test chunks...")
+        start = time.perf_counter()
         store.add_chunks(embedding_results, chunks)
+        elapsed = time.perf_counter() - start
+        print(f"   Added {len(chunks)} chunks in {elapsed:.2f}s ({len(chunks) / elapsed:,.0f} chunks/s, "
+              f"{store.add_batch_size} per insert)")
+        if len(chunks) / elapsed < MIN_ADD_THROUGHPUT:
+            raise AssertionError(f"add_chunks slower than {MIN_ADD_THROUGHPUT} chunks/s")
         print("   ✅ Chunks added successfully")
         
         # Test basic stats
@@ -137,8 +227,7 @@ def test_chromadb_basic():
         
         # Test search
         print("\n4️⃣ Testing search...")
-        query_embedding = [0.11] * 384  # Similar to our test embedding
-        results = store.search(query_embedding, top_k=1)
+        results = store.search(QUERY_EMB, top_k=1)
         
         if results:
             metadata, score = results[0]
@@ -169,13 +258,6 @@ def test_chromadb_basic():
     except Exception as e:
         print(f"❌ ChromaDB test failed: {e}")
         return False
-        
-    finally:
-        # Clean up
-        try:
-            shutil.rmtree(test_dir)
-        except:
-            pass
 
 
 def test_vector_store_manager():
@@ -183,15 +265,13 @@ def test_vector_store_manager():
     print("\n🧪 Testing VectorStoreManager")
     print("=" * 40)
     
-    test_dir = tempfile.mkdtemp(prefix="test_manager_")
-    
     try:
         # Test ChromaDB mode
         print("1️⃣ Testing ChromaDB mode...")
         manager = VectorStoreManager(
             store_type='chromadb',
-            persist_directory=test_dir,
-            collection_name='manager_test'
+            persist_directory=_shared_test_dir(),
+            collection_name='manager'
         )
         print(f"   Store type: {manager.store_type}")
         
@@ -200,8 +280,7 @@ def test_vector_store_manager():
         manager.add_chunks(embedding_results, chunks)
         
         # Test search
-        query_embedding = [0.11] * 384
-        results = manager.search(query_embedding, top_k=1)
+        results = manager.search(QUERY_EMB, top_k=1)
         
         if results:
             print(f"   ChromaDB search found {len(results)} results")
@@ -225,7 +304,7 @@ def test_vector_store_manager():
         memory_manager.add_chunks(embedding_results, chunks)
         
         # Test search
-        memory_results = memory_manager.search(query_embedding, top_k=1)
+        memory_results = memory_manager.search(QUERY_EMB, top_k=1)
         if memory_results:
             print(f"   Memory search found {len(memory_results)} results")
             print("   ✅ Memory manager works")
@@ -238,12 +317,6 @@ def test_vector_store_manager():
     except Exception as e:
         print(f"❌ VectorStoreManager test failed: {e}")
         return False
-        
-    finally:
-        try:
-            shutil.rmtree(test_dir)
-        except:
-            pass
 
 
 def test_chromadb_persistence():
@@ -277,7 +350,12 @@ def test_chromadb_persistence():
         stats2 = store2.get_stats()
         print(f"   Found {stats2['total_chunks']} chunks after reload")
         
-        if stats1['total_chunks'] == stats2['total_chunks']:
+        # Fixture timestamps are fixed, so the reloaded time range is known
+        reloaded = store2.get_by_ids(['test_chunk_1'])
+        expected_range = (FIXED_TS.isoformat(), (FIXED_TS + timedelta(minutes=2)).isoformat())
+        times_match = bool(reloaded) and (reloaded[0]['start_time'], reloaded[0]['end_time']) == expected_range
+        
+        if stats1['total_chunks'] == stats2['total_chunks'] and times_match:
             print("   ✅ Data persisted correctly!")
             return True
         else:
@@ -289,10 +367,104 @@ def test_chromadb_persistence():
         return False
         
     finally:
+        _remove_in_background(test_dir)
+
+
+def test_search_throughput(n: int = 100_000) -> bool:
+    """Compare one matrix-vector product against a per-row Python loop
+    
+    With unit-length vectors, cosine similarity is just the dot product, so
+    scoring every row is a single sgemv call.
+    
+    Args:
+        n: Number of stored vectors
+    """
+    print("\n🧪 Testing Search Throughput")
+    print("=" * 30)
+    
+    rng = np.random.default_rng(1)
+    matrix = rng.standard_normal((n, 384), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    target = int(rng.integers(n))
+    query = matrix[target] + rng.standard_normal(384, dtype=np.float32) * 0.01
+    query /= np.linalg.norm(query)
+    
+    start = time.perf_counter()
+    scores = matrix @ query
+    best = int(np.argmax(scores))
+    vectorized = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    loop_scores = [float(row @ query) for row in matrix]
+    loop_best = max(range(n), key=loop_scores.__getitem__)
+    looped = time.perf_counter() - start
+    
+    print(f"   {n:,} vectors: matrix product {vectorized * 1000:.1f}ms, "
+          f"Python loop {looped * 1000:.1f}ms ({looped / vectorized:.0f}x)")
+    
+    if best == loop_best == target:
+        print("   ✅ Both paths find the nearest vector")
+        return True
+    print(f"   ❌ Expected row {target}, got {best} (matrix) and {loop_best} (loop)")
+    return False
+
+
+def test_quantized_persistence(n: int = 100_000) -> bool:
+    """Compare the on-disk index size of float32 and int8 FAISS stores
+    
+    ChromaDB has no quantized storage, so this persists the same chunks
+    through FaissVectorStore both ways, reloads each and checks the nearest
+    chunk survives quantization.
+    
+    Args:
+        n: Number of chunks to store
+    """
+    print("\n🧪 Testing Quantized Persistence")
+    print("=" * 30)
+    
+    if not FAISS_AVAILABLE:
+        print("   ⏭️  Skipping - faiss not installed")
+        return True
+    
+    chunks, embedding_results, _ = create_test_chunks(n)
+    index_sizes = {}
+    
+    for quantization in (None, 'int8'):
+        test_dir = tempfile.mkdtemp(prefix="test_quantized_")
+        label = quantization or 'float32'
         try:
-            shutil.rmtree(test_dir)
-        except:
-            pass
+            store = FaissVectorStore(persist_directory=test_dir, embedding_dim=384, quantization=quantization)
+            store.add_chunks(embedding_results, chunks, verbose=False)
+            store.save()
+            index_sizes[label] = (Path(test_dir) / FaissVectorStore.INDEX_FILE).stat().st_size
+            
+            reloaded = FaissVectorStore(persist_directory=test_dir, embedding_dim=384, quantization=quantization)
+            results = reloaded.search(QUERY_EMB, top_k=1)
+            if not results or results[0][0]['chunk_id'] != 'test_chunk_1':
+                print(f"   ❌ {label} store lost the nearest chunk after reload")
+                return False
+        except Exception as e:
+            print(f"❌ Quantized persistence test failed: {e}")
+            return False
+        finally:
+            _remove_in_background(test_dir)
+    
+    print(f"   {n:,} chunks: float32 index {index_sizes['float32'] / 2**20:.1f}MB, "
+          f"int8 index {index_sizes['int8'] / 2**20:.1f}MB "
+          f"({index_sizes['float32'] / index_sizes['int8']:.1f}x smaller)")
+    print("   ✅ Both stores reload with the same nearest chunk")
+    return True
+
+
+def _run_captured(test) -> Tuple[str, bool]:
+    """Run a test function in a worker process, returning its output and result
+    
+    Output is buffered so suites running side by side don't interleave.
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = test()
+    return output.getvalue(), result
 
 
 if __name__ == "__main__":
@@ -307,10 +479,14 @@ if __name__ == "__main__":
         print("\n💡 Falling back to memory store tests would require the full pipeline")
         sys.exit(1)
     
+    # The persistence test needs a directory of its own to reload; the other
+    # two share one. The groups share no state, so run them in separate processes
+    tests = [test_shared_store, test_chromadb_persistence, test_search_throughput, test_quantized_persistence]
     success = True
-    success &= test_chromadb_basic()
-    success &= test_vector_store_manager()
-    success &= test_chromadb_persistence()
+    with ProcessPoolExecutor(max_workers=len(tests)) as pool:
+        for output, result in pool.map(_run_captured, tests):
+            print(output, end='')
+            success &= result
     
     print("\n" + "=" * 50)
     if success:
@@ -326,6 +502,6 @@ if __name__ == "__main__":
         exit_code = 1
     
     print(f"\n🚀 Next: Run the full pipeline with:")
-    print("   python pipeline.py --vector-store chromadb --test-search 'lunch meeting'")
+    print("   python -m indexer.pipeline --vector-store chromadb --test-search 'lunch meeting'")
     
     sys.exit(exit_code)
\ No newline at end of file
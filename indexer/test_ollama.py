@@ -3,17 +3,21 @@
 Test script for Ollama LLM integration
 
 Tests the complete RAG pipeline: indexing + vector search + LLM generation
+
+Run from the repository root: python -m indexer.test_ollama
 """
 
+import io
 import sys
+import asyncio
 import os
-from pathlib import Path
-
-# Add indexer to path
-sys.path.insert(0, str(Path(__file__).parent))
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
-from llm_integration import OllamaLLM, LLMManager, RAGSystem
-from chat_interface import iMessageChat
+from .llm_integration import OllamaLLM, LLMManager, RAGSystem
+from .chat_interface import iMessageChat
 
 
 def test_ollama_connection():
@@ -51,7 +55,7 @@ def test_ollama_connection():
         
         # Test generation
         print("\n3️⃣ Testing text generation...")
-        from llm_integration import ChatMessage
+        from .llm_integration import ChatMessage
         
         test_messages = [
             ChatMessage(role="user", content="What is 2+2? Answer briefly.")
@@ -93,7 +97,7 @@ def test_rag_system():
         if chat.rag is None:
             print("⚠️  No indexed data available")
             print("💡 To test RAG fully, run indexing first:")
-            print("   python pipeline.py --days 7 --test-search 'test query'")
+            print("   python -m indexer.pipeline --days 7 --test-search 'test query'")
             return True  # Not a failure, just limited testing
         
         # Test RAG query
@@ -117,13 +121,19 @@ def test_rag_system():
         return False
 
 
-def test_llm_manager():
-    """Test the LLM manager with different providers"""
+def test_llm_manager(available: Optional[Dict[str, bool]] = None):
+    """Test the LLM manager with different providers
+    
+    Args:
+        available: Result of LLMManager.get_available_llms() probed by the
+            caller, or None to probe here
+    """
     print("\n🧪 Testing LLM Manager")
     print("=" * 20)
     
     print("1️⃣ Checking available LLM backends...")
-    available = LLMManager.get_available_llms()
+    if available is None:
+        available = LLMManager.get_available_llms()
     
     for llm_type, is_available in available.items():
         status = "✅" if is_available else "❌"
@@ -169,13 +179,19 @@ def demo_simple_chat():
             print()
             
             # Direct LLM test without RAG
-            from llm_integration import ChatMessage
+            from .llm_integration import ChatMessage
             test_messages = [
                 ChatMessage(role="user", content="Tell me a brief joke about AI assistants.")
             ]
             
-            response = chat.llm.generate(test_messages)
-            print(f"🤖 AI: {response}")
+            # Stream the reply so it shows from the first token
+            print("🤖 AI: ", end="", flush=True)
+            if hasattr(chat.llm, 'stream'):
+                for token in chat.llm.stream(test_messages):
+                    print(token, end="", flush=True)
+                print()
+            else:
+                print(chat.llm.generate(test_messages))
             
         else:
             # Full RAG demo
@@ -187,13 +203,7 @@ def demo_simple_chat():
                 "Any interesting topics from my messages?"
             ]
             
-            for question in demo_questions:
-                print(f"\n❓ {question}")
-                answer = chat.ask(question)
-                if answer:
-                    print(f"🤖 {answer[:300]}{'...' if len(answer) > 300 else ''}")
-                else:
-                    print("🤖 Sorry, I couldn't find relevant information.")
+            asyncio.run(_demo_questions(chat, demo_questions))
         
         return True
         
@@ -202,15 +212,55 @@ def demo_simple_chat():
         return False
 
 
+async def _demo_questions(chat: iMessageChat, questions: List[str]) -> None:
+    """Stream the first answer while the other questions are answered concurrently"""
+    rest = asyncio.ensure_future(chat.rag.aask_many(questions[1:]))
+    
+    try:
+        print(f"\n❓ {questions[0]}")
+        print("🤖 ", end="", flush=True)
+        async for token in chat.rag.astream(questions[0], include_chat_history=False):
+            print(token, end="", flush=True)
+        print()
+        
+        responses = await rest
+    finally:
+        rest.cancel()  # No-op once finished
+    
+    for question, response in zip(questions[1:], responses):
+        print(f"\n❓ {question}")
+        answer = response.answer
+        if answer:
+            print(f"🤖 {answer[:300]}{'...' if len(answer) > 300 else ''}")
+        else:
+            print("🤖 Sorry, I couldn't find relevant information.")
+
+
+def _run_captured(test) -> Tuple[str, bool]:
+    """Run a test function in a worker process, returning its output and result
+    
+    Output is buffered so suites running side by side don't interleave.
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = test()
+    return output.getvalue(), result
+
+
 if __name__ == "__main__":
     print("Running Ollama LLM integration tests...\n")
     
-    success = True
+    # Probe the backends once here: the class-level probe cache doesn't
+    # carry over into the worker processes
+    available = LLMManager.get_available_llms()
     
-    # Run tests
-    success &= test_ollama_connection()
-    success &= test_llm_manager() 
-    success &= test_rag_system()
+    # Run tests; they share no state, so each runs in its own process
+    tests = [test_ollama_connection, partial(test_llm_manager, available), test_rag_system]
+    success = True
+    with ProcessPoolExecutor(max_workers=len(tests)) as pool:
+        for output, result in pool.map(_run_captured, tests):
+            print(output, end='')
+            success &= result
     
     # Run demo if basic tests pass
     if success:
@@ -220,9 +270,9 @@ if __name__ == "__main__":
     if success:
         print("🎉 Ollama integration tests completed!")
         print("\n💡 Next steps:")
-        print("   • Index your messages: python pipeline.py --days 7")
-        print("   • Start chat: python chat_interface.py")
-        print("   • Interactive mode: python chat_interface.py --question 'your question'")
+        print("   • Index your messages: python -m indexer.pipeline --days 7")
+        print("   • Start chat: python -m indexer.chat_interface")
+        print("   • Interactive mode: python -m indexer.chat_interface --question 'your question'")
         exit_code = 0
     else:
         print("💥 Some Ollama tests failed!")
@@ -3,12 +3,47 @@
 Test script for chat_db_parser.py
 
 Run this to validate the parser works with a real chat.db file.
+
+Run from the repository root: python -m indexer.test_parser
 """
 
 import os
 import sys
-from pathlib import Path
-from chat_db_parser import ChatDBParser
+import atexit
+from typing import Optional, Sequence
+from .chat_db_parser import ChatDBParser
+
+# chat.db connection shared by every test in the process (see get_parser)
+_PARSER: Optional[ChatDBParser] = None
+
+# Line breaks and tabs become spaces so a preview stays on one line
+_PREVIEW_TRANS = str.maketrans('\n\r\t', '   ')
+
+
+def preview(text: str, n: int = 40) -> str:
+    """First n characters of text on one line, with '...' if it was cut"""
+    return text[:n].translate(_PREVIEW_TRANS) + ('...' if len(text) > n else '')
+
+
+def format_participants(participants: Sequence[str], n: int = 3) -> str:
+    """First n participants, plus how many more there are"""
+    shown = ", ".join(participants[:n])
+    if len(participants) > n:
+        return f"{shown} (and {len(participants) - n} more)"
+    return shown
+
+
+def get_parser() -> ChatDBParser:
+    """Open the default chat.db once and share the connection
+    
+    chat.db can be hundreds of MB; reusing one connection keeps SQLite's page
+    cache and memory map warm from one test to the next. It's closed at exit.
+    """
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = ChatDBParser().__enter__()
+        atexit.register(_PARSER.__exit__, None, None, None)
+    return _PARSER
 
 
 def test_parser_basic():
@@ -17,43 +52,39 @@ def test_parser_basic():
     print("=" * 40)
     
     try:
-        with ChatDBParser() as parser:
-            print("✅ Successfully connected to chat.db")
-            
-            # Test statistics
-            stats = parser.get_chat_statistics()
-            print(f"📊 Found {stats['total_messages']:,} messages in {stats['total_chats']} chats")
-            
-            # Test handles
-            handles = parser.get_handles()
-            print(f"👥 Found {len(handles)} contact handles")
-            
-            if handles:
-                print(f"   First handle: {handles[0].handle_id} ({handles[0].service})")
-            
-            # Test chats
-            chats = parser.get_chats()
-            print(f"💬 Found {len(chats)} chats")
-            
-            if chats:
-                first_chat = chats[0]
-                participants = ", ".join(first_chat.participants[:3])  # Show first 3
-                if len(first_chat.participants) > 3:
-                    participants += f" (and {len(first_chat.participants) - 3} more)"
-                print(f"   First chat: {participants}")
-            
-            # Test recent messages
-            recent = parser.get_recent_messages(days=1, limit=3)
-            print(f"📱 Found {len(recent)} messages in last 24 hours")
-            
-            if recent:
-                for i, msg in enumerate(recent[:2]):  # Show first 2
-                    sender = "You" if msg.is_from_me else (msg.sender_id or "Unknown")
-                    preview = (msg.text[:40] + "...") if len(msg.text) > 40 else msg.text
-                    print(f"   {i+1}. {sender}: {preview}")
-            
-            print("\n✅ All parser tests passed!")
-            
+        parser = get_parser()
+        print("✅ Successfully connected to chat.db")
+        
+        # Test statistics
+        stats = parser.get_chat_statistics()
+        print(f"📊 Found {stats['total_messages']:,} messages in {stats['total_chats']} chats")
+        
+        # Test handles
+        handles = parser.get_handles()
+        print(f"👥 Found {len(handles)} contact handles")
+        
+        if handles:
+            print(f"   First handle: {handles[0].handle_id} ({handles[0].service})")
+        
+        # Test chats
+        chats = parser.get_chats()
+        print(f"💬 Found {len(chats)} chats")
+        
+        if chats:
+            first_chat = chats[0]
+            print(f"   First chat: {format_participants(first_chat.participants)}")
+        
+        # Test recent messages
+        recent = parser.get_recent_messages(days=1, limit=3)
+        print(f"📱 Found {len(recent)} messages in last 24 hours")
+        
+        if recent:
+            for i, msg in enumerate(recent[:2]):  # Show first 2
+                sender = "You" if msg.is_from_me else (msg.sender_id or "Unknown")
+                print(f"   {i+1}. {sender}: {preview(msg.text)}")
+        
+        print("\n✅ All parser tests passed!")
+        
     except FileNotFoundError:
         print("❌ chat.db not found at ~/Library/Messages/chat.db")
         print("💡 This test requires macOS with iMessage enabled")
@@ -73,12 +104,15 @@ def test_parser_custom_path():
     """Test parser with custom database path"""
     custom_path = "./test_chat.db"
     
-    if not Path(custom_path).exists():
+    # ChatDBParser checks the path itself; no separate exists() beforehand
+    try:
+        parser_cm = ChatDBParser(custom_path)
+    except FileNotFoundError:
         print(f"⏭️  Skipping custom path test - {custom_path} doesn't exist")
         return True
     
     try:
-        with ChatDBParser(custom_path) as parser:
+        with parser_cm as parser:
             stats = parser.get_chat_statistics()
             print(f"✅ Custom path test passed - {stats['total_messages']} messages")
     except Exception as e:
@@ -3,16 +3,25 @@
 Test script for the complete iMessage indexing pipeline
 
 Demonstrates: parsing → chunking → embedding → search
+
+Run from the repository root: python -m indexer.test_pipeline
 """
 
 import sys
 import os
+from operator import attrgetter
 from pathlib import Path
 
-# Add indexer to path
-sys.path.insert(0, str(Path(__file__).parent))
+# Keep Hugging Face downloads next to the test's embedding cache. Once the
+# model is there, skip the Hub's remote revision check on every load; this
+# has to happen before sentence-transformers is imported.
+TEST_CACHE_DIR = Path('.test_cache')
+os.environ.setdefault('HF_HOME', str(TEST_CACHE_DIR / 'hf'))
+if (Path(os.environ['HF_HOME']) / 'hub' / 'models--sentence-transformers--all-MiniLM-L6-v2').is_dir():
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
 
-from pipeline import iMessageIndexer
+from .pipeline import iMessageIndexer
+from .test_parser import format_participants, get_parser, preview
 
 
 def test_pipeline_demo():
@@ -26,8 +35,10 @@ def test_pipeline_demo():
         indexer = iMessageIndexer(
             embedding_model='local',
             chunk_strategy='adaptive',
-            cache_dir='.test_cache'
+            cache_dir=str(TEST_CACHE_DIR)
         )
+        # One throwaway embedding so lazy model setup isn't part of the timed run
+        indexer.embedding_generator.embed_text("warm up")
         print("   ✅ Indexer initialized")
         
         # Run indexing on recent messages only (for speed)
@@ -68,15 +79,11 @@ def test_pipeline_demo():
                 
                 if results:
                     for i, (chunk, score) in enumerate(results, 1):
-                        participants = ", ".join(chunk.participants[:2])
-                        if len(chunk.participants) > 2:
-                            participants += f" (+{len(chunk.participants)-2} more)"
-                        
+                        participants = format_participants(chunk.participants, 2)
                         time_str = chunk.start_time.strftime('%Y-%m-%d %H:%M')
-                        preview = chunk.text_content[:100].replace('\n', ' ')
                         
                         print(f"      {i}. {participants} | {time_str} | Score: {score:.3f}")
-                        print(f"         {preview}...")
+                        print(f"         {preview(chunk.text_content, 100)}")
                 else:
                     print("      No results found")
                     
@@ -113,36 +120,40 @@ def test_chunking_only():
     print("\n🔧 Testing chunking component only...")
     
     try:
-        from chat_db_parser import ChatDBParser
-        from chunker import MessageChunker
+        from .chunker import MessageChunker
+        
+        parser = get_parser()  # Shares one chat.db connection with test_parser
+        
+        # Get a small sample of messages
+        messages = parser.get_recent_messages(days=1, limit=50)
+        chats = parser.get_chats()
+        
+        if not messages:
+            print("   No recent messages found")
+            return False
+        
+        # Find the chat for these messages
+        chat_id = messages[0].chat_id
+        chat = next(c for c in chats if c.id == chat_id)
+        
+        # Recent messages come newest first and span chats; the chunker takes
+        # one chat's messages in date order
+        messages = sorted((msg for msg in messages if msg.chat_id == chat_id), key=attrgetter('date'))
+        
+        # Test chunking
+        chunker = MessageChunker()
+        chunks = chunker.chunk_by_time_windows(messages, chat)
+        
+        print(f"   ✅ Created {len(chunks)} chunks from {len(messages)} messages")
+        
+        if chunks:
+            chunk = chunks[0]
+            print(f"   Sample chunk: {len(chunk.messages)} messages")
+            print(f"   Time range: {chunk.start_time} to {chunk.end_time}")
+            print(f"   Preview: {preview(chunk.text_content, 100)}")
+        
+        return True
         
-        with ChatDBParser() as parser:
-            # Get a small sample of messages
-            messages = parser.get_recent_messages(days=1, limit=50)
-            chats = parser.get_chats()
-            
-            if not messages:
-                print("   No recent messages found")
-                return False
-            
-            # Find the chat for these messages
-            chat_id = messages[0].chat_id
-            chat = next(c for c in chats if c.id == chat_id)
-            
-            # Test chunking
-            chunker = MessageChunker()
-            chunks = chunker.chunk_by_time_windows(messages, chat)
-            
-            print(f"   ✅ Created {len(chunks)} chunks from {len(messages)} messages")
-            
-            if chunks:
-                chunk = chunks[0]
-                print(f"   Sample chunk: {len(chunk.messages)} messages")
-                print(f"   Time range: {chunk.start_time} to {chunk.end_time}")
-                print(f"   Preview: {chunk.text_content[:100]}...")
-            
-            return True
-            
     except Exception as e:
         print(f"   ❌ Chunking test failed: {e}")
         return False
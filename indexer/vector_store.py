@@ -5,11 +5,15 @@ Persistent vector storage with efficient similarity search and metadata filterin
 """
 
 import os
-import json
-from typing import List, Dict, Optional, Tuple, Any
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, Any, Union, Protocol
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
 try:
     import chromadb
     from chromadb.config import Settings
@@ -17,18 +21,108 @@ try:
 except ImportError:
     CHROMADB_AVAILABLE = False
 
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 from .embeddings import EmbeddingResult
 from .chunker import MessageChunk
+from ._io import atomic_open, atomic_path, json_dumps, json_loads, read_json, write_json_atomic
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize a float32 matrix in place; zero rows stay zero"""
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+
+def _ndjson_line(record: Dict[str, Any]) -> bytes:
+    """One compact JSON line, newline included"""
+    return (json_dumps(record) + '\n').encode('utf-8')
+
+
+class VectorStoreProtocol(Protocol):
+    """Methods VectorStoreManager calls on every store (ChromaDB, FAISS, memory)
+    
+    Searches return (metadata, similarity) tuples with the chunk id under
+    'chunk_id' in every store; stats always include 'total_chunks'.
+    """
+    
+    def add_chunks(self, embedding_results: List[EmbeddingResult], chunks: List[MessageChunk], verbose: bool = True) -> None: ...
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> None: ...
+    
+    def search(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
+    ) -> List[Tuple[Dict, float]]: ...
+    
+    def search_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
+    ) -> List[List[Tuple[Dict, float]]]: ...
+    
+    def warm(self) -> None: ...
+    
+    def get_stats(self) -> Dict[str, Any]: ...
 
 
 class ChromaVectorStore:
     """ChromaDB-based vector store for message chunks"""
     
+    # Rows per collection.add() call, independent of the embedding batch size;
+    # capped further by the client's own limit
+    ADD_BATCH_SIZE = 5000
+    
+    # Participants are stored as a list field in chat order, which a $contains
+    # filter matches (see participant_filter). Collections written by earlier
+    # versions hold a JSON string, or a string joined with the unit separator
+    PARTICIPANT_SEP = '\x1f'
+    
+    # Rows read per collection.get() while backing up, and the suffix of the
+    # float16 embedding file written next to the backup
+    BACKUP_BATCH_SIZE = 10_000
+    VECTORS_SUFFIX = '.vecs.f16'
+    
+    # Ids per collection.get() call in get_by_ids()
+    GET_BATCH_SIZE = 1024
+    
+    # How long get_stats() reuses the collection count (seconds)
+    STATS_TTL_SECONDS = 30
+    
+    # Metadatas sampled by the first get_stats() call
+    STATS_SAMPLE_SIZE = 100
+    
+    # New collections index cosine distance, so similarity is 1 - distance
+    COLLECTION_METADATA = {
+        "hnsw:space": "cosine",
+        "description": "iMessage conversation chunks for AI search"
+    }
+    
+    # HNSW graph settings for new collections: more neighbors (M) and a wider
+    # construction search give better recall at a higher build cost;
+    # search_ef trades query latency for recall
+    HNSW_PROFILES = {
+        'fast': {"hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 32},
+        'balanced': {"hnsw:M": 32, "hnsw:construction_ef": 200, "hnsw:search_ef": 64},
+        'recall': {"hnsw:M": 48, "hnsw:construction_ef": 400, "hnsw:search_ef": 200}
+    }
+    
     def __init__(
         self,
         persist_directory: str = ".chromadb",
         collection_name: str = "imessage_chunks",
-        embedding_function: Optional[Any] = None
+        embedding_function: Optional[Any] = None,
+        hnsw_profile: str = 'balanced',
+        num_shards: int = 1
     ):
         """
         Initialize ChromaDB vector store
@@ -37,13 +131,27 @@ class ChromaVectorStore:
             persist_directory: Directory to persist the database
             collection_name: Name of the collection for message chunks
             embedding_function: ChromaDB embedding function (optional, we provide embeddings)
+            hnsw_profile: 'fast', 'balanced' or 'recall' (see HNSW_PROFILES); only
+                applies when the collection is created
+            num_shards: Split chunks over this many collections by chat_id, so
+                searches filtered to a chat only scan that chat's shard. 1 keeps
+                a single collection named collection_name; otherwise the
+                shards are named '<collection_name>_s<i>'
         """
         if not CHROMADB_AVAILABLE:
             raise ImportError("chromadb not installed. Run: pip install chromadb")
+        if hnsw_profile not in self.HNSW_PROFILES:
+            raise ValueError(f"Unknown HNSW profile: {hnsw_profile}")
         
+        self.collection_metadata = {**self.COLLECTION_METADATA, **self.HNSW_PROFILES[hnsw_profile]}
         self.persist_directory = Path(persist_directory)
         self.persist_directory.mkdir(exist_ok=True)
         self.collection_name = collection_name
+        self.num_shards = num_shards
+        if num_shards == 1:
+            self.shard_names = [collection_name]
+        else:
+            self.shard_names = [f"{collection_name}_s{i}" for i in range(num_shards)]
         
         # Initialize ChromaDB client with persistence
         self.client = chromadb.PersistentClient(
@@ -53,76 +161,258 @@ class ChromaVectorStore:
             )
         )
         
-        # Get or create collection
+        # Get or create the collection(s)
+        self.shards = [self._open_collection(name) for name in self.shard_names]
+        self._check_space()
+        # Unfiltered searches query every shard at once
+        self._shard_pool = ThreadPoolExecutor(max_workers=num_shards) if num_shards > 1 else None
+        
+        # Older chromadb releases have no per-call limit to query
+        get_max_batch_size = getattr(self.client, 'get_max_batch_size', None)
+        self.add_batch_size = min(self.ADD_BATCH_SIZE, get_max_batch_size()) if get_max_batch_size else self.ADD_BATCH_SIZE
+        
+        # get_stats() counters: total, chat ids, chunk type counts and models,
+        # seeded from a metadata sample and kept current by add_chunks()
+        self._stats: Optional[Dict[str, Any]] = None
+        self._stats_counted_at = 0.0
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def collection(self):
+        """The Chroma collection of an unsharded store"""
+        if self.num_shards != 1:
+            raise AttributeError("Store is split over several collections; use .shards")
+        return self.shards[0]
+    
+    def _open_collection(self, name: str):
+        """Get a collection, creating it if it doesn't exist"""
         # We don't provide an embedding function since we generate embeddings ourselves
         try:
-            self.collection = self.client.get_collection(name=collection_name)
-            print(f"📂 Loaded existing collection '{collection_name}' with {self.collection.count()} items")
-        except ValueError:
-            # Collection doesn't exist, create it
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                metadata={"description": "iMessage conversation chunks for AI search"}
+            collection = self.client.get_collection(name=name)
+            print(f"📂 Loaded existing collection '{name}' with {collection.count()} items")
+        except Exception:
+            # Collection doesn't exist (ValueError on older chromadb,
+            # NotFoundError on newer releases), create it
+            collection = self.client.create_collection(
+                name=name,
+                metadata=self.collection_metadata
             )
-            print(f"🆕 Created new collection '{collection_name}'")
+            print(f"🆕 Created new collection '{name}'")
+        return collection
+    
+    def _shard_of(self, chat_id: int) -> int:
+        """Index of the shard holding a chat's chunks"""
+        return int(chat_id) % self.num_shards
+    
+    def _shards_for(self, where_filters: Optional[Dict[str, Any]]) -> List[Any]:
+        """Shards that can hold chunks matching where_filters
+        
+        A top-level chat_id condition (a value, $eq or $in) narrows the search
+        to those chats' shards; anything else needs every shard.
+        """
+        condition = where_filters.get('chat_id') if where_filters and self.num_shards > 1 else None
+        if condition is None:
+            return self.shards
+        
+        if isinstance(condition, dict):
+            if '$eq' in condition:
+                chat_ids = [condition['$eq']]
+            elif '$in' in condition:
+                chat_ids = condition['$in']
+            else:
+                return self.shards
+        else:
+            chat_ids = [condition]
+        
+        return [self.shards[i] for i in sorted({self._shard_of(chat_id) for chat_id in chat_ids})]
+    
+    @staticmethod
+    def drop_cached_clients() -> None:
+        """Forget the clients chromadb shares per persist directory
+        
+        Stores created afterwards read the directory afresh, picking up
+        collections another process has written since.
+        """
+        chromadb.api.client.SharedSystemClient.clear_system_cache()
+    
+    def warm(self) -> None:
+        """Run one query so the HNSW index is loaded before the first real search"""
+        for shard in self.shards:
+            sample = shard.get(limit=1, include=['embeddings'])
+            if len(sample['ids']):
+                shard.query(query_embeddings=sample['embeddings'][:1], n_results=1)
+    
+    def _check_space(self) -> None:
+        """Record whether the collection measures cosine distance
+        
+        Collections created before COLLECTION_METADATA set hnsw:space use
+        Chroma's default squared L2 distance.
+        """
+        self.cosine_space = (self.shards[0].metadata or {}).get('hnsw:space') == 'cosine'
     
     def add_chunks(
         self, 
         embedding_results: List[EmbeddingResult], 
-        chunks: List[MessageChunk]
+        chunks: List[MessageChunk],
+        verbose: bool = True,
+        batch_size: Optional[int] = None
     ) -> None:
-        """Add message chunks with embeddings to the vector store"""
+        """
+        Add message chunks with embeddings to the vector store
+        
+        Args:
+            embedding_results: Embeddings for the chunks, in the same order
+            chunks: Chunks to add
+            verbose: Print a summary line once added
+            batch_size: Rows per collection.add() call, at most (and by
+                default) add_batch_size. Smaller inserts hold the collection's
+                write lock for less time at some cost in throughput
+        """
         if len(embedding_results) != len(chunks):
             raise ValueError("Number of embedding results must match number of chunks")
         
         # Prepare data for ChromaDB
         ids = []
-        embeddings = []
         documents = []
         metadatas = []
         
+        # Hand Chroma a single C-contiguous float32 matrix of unit vectors
+        # instead of a list of Python float lists (np.stack copies, so the
+        # in-place normalization leaves the results untouched)
+        embeddings = _normalize_rows(np.stack([result.embedding for result in embedding_results]).astype(np.float32, copy=False))
+        
+        # Values shared across the batch: one timestamp, and one set of
+        # participant fields per chat (its chunks share the same participants tuple)
+        created_at = datetime.now().isoformat()
+        participant_fields: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        
         for result, chunk in zip(embedding_results, chunks):
             ids.append(result.chunk_id)
-            embeddings.append(result.embedding)
             documents.append(chunk.text_content)
             
-            # Prepare metadata (ChromaDB requires JSON-serializable values)
+            participants_key = tuple(chunk.participants)
+            if participants_key not in participant_fields:
+                participant_fields[participants_key] = self._participant_fields(participants_key)
+            
+            # Prepare metadata (ChromaDB takes scalars and non-empty lists of scalars)
             metadata = {
                 'chat_id': chunk.chat_id,
-                'start_time': chunk.start_time.isoformat(),
-                'end_time': chunk.end_time.isoformat(),
-                'participants': json.dumps(chunk.participants),  # Serialize list
+                'start_time': chunk.start_time_iso,
+                'end_time': chunk.end_time_iso,
                 'chunk_type': chunk.chunk_type,
                 'message_count': len(chunk.messages),
                 'embedding_model': result.model_name,
                 'embedding_dim': result.embedding_dim,
-                'created_at': datetime.now().isoformat()
+                'created_at': created_at
             }
+            metadata.update(participant_fields[participants_key])
             
             # Add chunk metadata (flatten nested dicts)
             for key, value in chunk.metadata.items():
                 if isinstance(value, (str, int, float, bool)):
                     metadata[f'chunk_{key}'] = value
                 elif isinstance(value, (list, dict)):
-                    metadata[f'chunk_{key}'] = json.dumps(value)
+                    metadata[f'chunk_{key}'] = json_dumps(value)
             
             metadatas.append(metadata)
         
-        # Add to ChromaDB collection
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas
-        )
+        # Chroma skips ids it already holds, so only new ones go into the
+        # stats counters (looked up only once get_stats() has built them)
+        existing = self._existing_ids(ids) if self._stats is not None else set()
+        
+        self._add_rows(ids, embeddings, documents, metadatas, batch_size)
         
-        print(f"✅ Added {len(chunks)} chunks to vector store")
+        with self._stats_lock:
+            if self._stats is not None:
+                added = [metadata for chunk_id, metadata in zip(ids, metadatas) if chunk_id not in existing]
+                self._stats['total_chunks'] += len(added)
+                self._count_metadatas(added)
+        
+        if verbose:
+            print(f"✅ Added {len(chunks)} chunks to vector store")
+    
+    def _add_rows(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> None:
+        """Insert rows into their chats' shards, one transaction per batch_size rows"""
+        batch_size = min(batch_size, self.add_batch_size) if batch_size else self.add_batch_size
+        
+        if self.num_shards == 1:
+            rows_by_shard = {0: np.arange(len(ids))}
+        else:
+            shard_of_row = np.fromiter((self._shard_of(metadata['chat_id']) for metadata in metadatas), dtype=np.int64, count=len(ids))
+            rows_by_shard = {i: np.flatnonzero(shard_of_row == i) for i in range(self.num_shards)}
+        
+        for i, rows in rows_by_shard.items():
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size].tolist()
+                self.shards[i].add(
+                    ids=[ids[row] for row in batch],
+                    embeddings=embeddings[batch],
+                    documents=[documents[row] for row in batch],
+                    metadatas=[metadatas[row] for row in batch]
+                )
+    
+    def _existing_ids(self, chunk_ids: List[str]) -> set:
+        """The given ids that are already stored, GET_BATCH_SIZE ids per call"""
+        existing = set()
+        for start in range(0, len(chunk_ids), self.GET_BATCH_SIZE):
+            for shard in self.shards:
+                existing.update(shard.get(ids=chunk_ids[start:start + self.GET_BATCH_SIZE], include=[])['ids'])
+        return existing
+    
+    @classmethod
+    def _participant_fields(cls, participants: Tuple[str, ...]) -> Dict[str, Any]:
+        """Metadata fields describing a chunk's participants
+        
+        One list field in the chunk's own order; Chroma rejects empty lists,
+        so a chunk without participants gets no field at all.
+        """
+        return {'participants': list(participants)} if participants else {}
+    
+    @classmethod
+    def participant_filter(cls, participant: str) -> Dict[str, Any]:
+        """Where filter matching chunks that include a participant
+        
+        Args:
+            participant: Participant handle (phone number or email)
+        """
+        return {'participants': {'$contains': participant}}
+    
+    @classmethod
+    def _to_result(cls, metadata: Dict[str, Any], document: Optional[str], chunk_id: str) -> Dict[str, Any]:
+        """Stored metadata dict with participants, document and id filled in
+        
+        Built as one new dict rather than a copy that is then updated. The
+        document is left out when None (not fetched).
+        """
+        participants = metadata.get('participants')
+        if isinstance(participants, list):
+            pass
+        elif 'participants_joined' in metadata:
+            joined = metadata['participants_joined']
+            participants = joined.split(cls.PARTICIPANT_SEP) if joined else []
+        elif participants is not None:
+            # Oldest collections stored a JSON list
+            participants = json_loads(participants)
+        else:
+            participants = []
+        
+        if document is None:
+            return {**metadata, 'participants': participants, 'chunk_id': chunk_id}
+        return {**metadata, 'participants': participants, 'document': document, 'chunk_id': chunk_id}
     
     def search(
         self, 
-        query_embedding: List[float], 
+        query_embedding: Union[List[float], np.ndarray], 
         top_k: int = 5,
-        where_filters: Optional[Dict[str, Any]] = None
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
     ) -> List[Tuple[Dict, float]]:
         """
         Search for similar chunks using vector similarity
@@ -131,40 +421,89 @@ class ChromaVectorStore:
             query_embedding: Query vector embedding
             top_k: Number of results to return
             where_filters: Optional metadata filters (e.g., {'chat_id': 123})
+            return_documents: Include each chunk's text as 'document'; callers
+                that only need ids can skip fetching it (see get_by_ids())
             
         Returns:
             List of (metadata, similarity_score) tuples
         """
-        # ChromaDB query
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=where_filters,
-            include=['metadatas', 'documents', 'distances']
-        )
+        return self.search_batch([query_embedding], top_k, where_filters, return_documents)[0]
+    
+    def search_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Search for several queries in one ChromaDB call
         
-        # Process results
-        search_results = []
-        if results['ids'] and len(results['ids'][0]) > 0:
-            for i in range(len(results['ids'][0])):
-                metadata = results['metadatas'][0][i].copy()
-                distance = results['distances'][0][i]
-                
-                # Convert distance to similarity score (ChromaDB uses L2 distance)
-                # For normalized embeddings, similarity ≈ 1 - (distance²/4)
-                similarity = max(0, 1 - (distance ** 2) / 4)
-                
-                # Parse JSON fields back to Python objects
-                if 'participants' in metadata:
-                    metadata['participants'] = json.loads(metadata['participants'])
-                
-                # Add document text
-                metadata['document'] = results['documents'][0][i]
-                metadata['chunk_id'] = results['ids'][0][i]
-                
-                search_results.append((metadata, similarity))
+        One collection.query() per shard shares the client round trip and
+        filter parsing across all queries. With several shards, a chat_id
+        filter limits the search to the matching shards; otherwise every
+        shard is queried in parallel and the results merged.
+        
+        Args:
+            query_embeddings: Query vector embeddings, one per row; a float32
+                array is passed through without per-element conversion
+            top_k: Number of results to return per query
+            where_filters: Optional metadata filters applied to every query
+            return_documents: Include each chunk's text as 'document'
+            
+        Returns:
+            One list of (metadata, similarity_score) tuples per query, in order
+        """
+        if len(query_embeddings) == 0:
+            return []
+        
+        include = ['metadatas', 'documents', 'distances'] if return_documents else ['metadatas', 'distances']
+        
+        # Stored vectors are unit length; normalize the queries to match
+        queries = _normalize_rows(np.array(query_embeddings, dtype=np.float32))
+        
+        def query(shard):
+            return shard.query(
+                query_embeddings=queries,
+                n_results=top_k,
+                where=where_filters,
+                include=include
+            )
+        
+        shards = self._shards_for(where_filters)
+        if len(shards) == 1:
+            shard_results = [query(shards[0])]
+        else:
+            shard_results = list(self._shard_pool.map(query, shards))
+        
+        # Cosine distance is 1 - cosine similarity. Older collections return
+        # squared L2 distance, which for unit-length embeddings is 2 - 2·cosine
+        scale = 1.0 if self.cosine_space else 0.5
+        
+        batch_results = []
+        for q in range(len(query_embeddings)):
+            # (distance, shard, row) of each hit; a single shard is already sorted
+            hits = [
+                (distance, s, i)
+                for s, results in enumerate(shard_results) if results['ids']
+                for i, distance in enumerate(results['distances'][q])
+            ]
+            if len(shard_results) > 1:
+                hits = sorted(hits)[:top_k]
+            
+            batch_results.append([
+                (
+                    self._to_result(
+                        shard_results[s]['metadatas'][q][i],
+                        shard_results[s]['documents'][q][i] if return_documents else None,
+                        shard_results[s]['ids'][q][i]
+                    ),
+                    1.0 - distance * scale
+                )
+                for distance, s, i in hits
+            ])
         
-        return search_results
+        return batch_results
     
     def search_by_text(
         self, 
@@ -183,27 +522,28 @@ class ChromaVectorStore:
         )
     
     def get_by_ids(self, chunk_ids: List[str]) -> List[Dict]:
-        """Get chunks by their IDs"""
-        results = self.collection.get(
-            ids=chunk_ids,
-            include=['metadatas', 'documents']
-        )
+        """
+        Get chunks by their IDs
         
-        chunks = []
-        if results['ids']:
-            for i, chunk_id in enumerate(results['ids']):
-                metadata = results['metadatas'][i].copy()
-                
-                # Parse JSON fields
-                if 'participants' in metadata:
-                    metadata['participants'] = json.loads(metadata['participants'])
-                
-                metadata['document'] = results['documents'][i]
-                metadata['chunk_id'] = chunk_id
-                
-                chunks.append(metadata)
+        Each distinct id is fetched once, GET_BATCH_SIZE ids per call.
         
-        return chunks
+        Returns:
+            One result per requested id, in the caller's order (duplicates
+            included); ids not in the collection are skipped
+        """
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        found: Dict[str, Dict] = {}
+        
+        for start in range(0, len(unique_ids), self.GET_BATCH_SIZE):
+            for shard in self.shards:
+                results = shard.get(
+                    ids=unique_ids[start:start + self.GET_BATCH_SIZE],
+                    include=['metadatas', 'documents']
+                )
+                for chunk_id, metadata, document in zip(results['ids'], results['metadatas'], results['documents']):
+                    found[chunk_id] = self._to_result(metadata, document, chunk_id)
+        
+        return [found[chunk_id] for chunk_id in chunk_ids if chunk_id in found]
     
     def filter_by_metadata(
         self, 
@@ -211,106 +551,194 @@ class ChromaVectorStore:
         limit: Optional[int] = None
     ) -> List[Dict]:
         """Filter chunks by metadata criteria"""
-        results = self.collection.get(
-            where=where_filters,
-            limit=limit,
-            include=['metadatas', 'documents']
-        )
-        
         chunks = []
-        if results['ids']:
+        for shard in self._shards_for(where_filters):
+            remaining = None if limit is None else limit - len(chunks)
+            if remaining is not None and remaining <= 0:
+                break
+            
+            results = shard.get(
+                where=where_filters,
+                limit=remaining,
+                include=['metadatas', 'documents']
+            )
             for i, chunk_id in enumerate(results['ids']):
-                metadata = results['metadatas'][i].copy()
-                
-                # Parse JSON fields
-                if 'participants' in metadata:
-                    metadata['participants'] = json.loads(metadata['participants'])
-                
-                metadata['document'] = results['documents'][i]
-                metadata['chunk_id'] = chunk_id
-                
-                chunks.append(metadata)
+                chunks.append(self._to_result(results['metadatas'][i], results['documents'][i], chunk_id))
         
         return chunks
     
     def delete_chunks(self, chunk_ids: List[str]) -> None:
         """Delete chunks by IDs"""
-        self.collection.delete(ids=chunk_ids)
+        for shard in self.shards:
+            shard.delete(ids=chunk_ids)
+        self._reset_stats()
         print(f"🗑️  Deleted {len(chunk_ids)} chunks")
     
     def clear_collection(self) -> None:
-        """Clear all data from the collection"""
-        # Delete and recreate collection
-        self.client.delete_collection(name=self.collection_name)
-        self.collection = self.client.create_collection(
-            name=self.collection_name,
-            metadata={"description": "iMessage conversation chunks for AI search"}
-        )
+        """Clear all data from the collection (every shard)"""
+        # Delete and recreate collections
+        for name in self.shard_names:
+            self.client.delete_collection(name=name)
+        self.shards = [
+            self.client.create_collection(name=name, metadata=self.collection_metadata)
+            for name in self.shard_names
+        ]
+        self._check_space()
+        self._reset_stats()
         print("🧹 Cleared vector store collection")
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get statistics about the vector store"""
-        count = self.collection.count()
+        """Get statistics about the vector store
         
-        # Get sample of metadata to analyze
-        sample_results = self.collection.get(
-            limit=min(100, count),
-            include=['metadatas']
-        )
-        
-        stats = {
-            'total_chunks': count,
-            'collection_name': self.collection_name,
-            'persist_directory': str(self.persist_directory)
-        }
-        
-        if sample_results['metadatas']:
-            # Analyze metadata
-            chat_ids = set()
-            chunk_types = {}
-            models = set()
+        The metadata breakdown comes from a sample taken on the first call
+        plus every chunk added since; the total is re-counted at most every
+        STATS_TTL_SECONDS. Deleting or clearing chunks starts over.
+        """
+        with self._stats_lock:
+            now = time.monotonic()
+            if self._stats is None:
+                self._stats = {'total_chunks': self._count(), 'chat_ids': set(), 'chunk_types': {}, 'models': set()}
+                # Sample evenly across shards
+                per_shard = -(-self.STATS_SAMPLE_SIZE // self.num_shards)
+                for shard in self.shards:
+                    sample_results = shard.get(limit=per_shard, include=['metadatas'])
+                    self._count_metadatas(sample_results['metadatas'] or [])
+                self._stats_counted_at = now
+            elif now - self._stats_counted_at > self.STATS_TTL_SECONDS:
+                self._stats['total_chunks'] = self._count()
+                self._stats_counted_at = now
             
-            for metadata in sample_results['metadatas']:
-                chat_ids.add(metadata.get('chat_id'))
-                
-                chunk_type = metadata.get('chunk_type', 'unknown')
-                chunk_types[chunk_type] = chunk_types.get(chunk_type, 0) + 1
-                
-                models.add(metadata.get('embedding_model'))
+            stats = {
+                'total_chunks': self._stats['total_chunks'],
+                'collection_name': self.collection_name,
+                'persist_directory': str(self.persist_directory)
+            }
             
-            stats.update({
-                'unique_chats_sample': len(chat_ids),
-                'chunk_types_sample': chunk_types,
-                'embedding_models': list(models)
-            })
+            if self._stats['chat_ids']:
+                stats.update({
+                    'unique_chats_sample': len(self._stats['chat_ids']),
+                    'chunk_types_sample': dict(self._stats['chunk_types']),
+                    'embedding_models': list(self._stats['models'])
+                })
         
         return stats
     
+    def _count(self) -> int:
+        """Chunks stored across all shards"""
+        return sum(shard.count() for shard in self.shards)
+    
+    def _count_metadatas(self, metadatas: List[Dict[str, Any]]) -> None:
+        """Fold chunk metadatas into the get_stats() counters (lock held)"""
+        chat_ids = self._stats['chat_ids']
+        chunk_types = self._stats['chunk_types']
+        models = self._stats['models']
+        
+        for metadata in metadatas:
+            chat_ids.add(metadata.get('chat_id'))
+            
+            chunk_type = metadata.get('chunk_type', 'unknown')
+            chunk_types[chunk_type] = chunk_types.get(chunk_type, 0) + 1
+            
+            models.add(metadata.get('embedding_model'))
+    
+    def _reset_stats(self) -> None:
+        """Drop the get_stats() counters so the next call rebuilds them"""
+        with self._stats_lock:
+            self._stats = None
+    
     def backup_collection(self, backup_path: str) -> None:
-        """Export collection data to JSON backup"""
-        all_data = self.collection.get(include=['metadatas', 'documents', 'embeddings'])
+        """
+        Export collection data to an NDJSON backup with a float16 vector sidecar
+        
+        Each shard is read BACKUP_BATCH_SIZE rows at a time, so memory
+        stays flat however large it is. backup_path gets a header line and
+        then one {id, document, metadata} line per chunk; the embeddings go
+        to backup_path + VECTORS_SUFFIX in the same order, as a (count, dim)
+        uint64 header followed by little-endian float16 rows.
         
-        backup_data = {
+        Args:
+            backup_path: Destination NDJSON file
+        """
+        vectors_path = backup_path + self.VECTORS_SUFFIX
+        header = {
             'collection_name': self.collection_name,
             'exported_at': datetime.now().isoformat(),
-            'total_chunks': len(all_data['ids']),
-            'data': {
-                'ids': all_data['ids'],
-                'documents': all_data['documents'],
-                'metadatas': all_data['metadatas'],
-                'embeddings': all_data['embeddings']
-            }
+            'format': 'ndjson+f16'
         }
         
-        with open(backup_path, 'w') as f:
-            json.dump(backup_data, f, indent=2)
+        total = 0
+        dim = 0
+        with atomic_open(backup_path, 'wb') as docs, atomic_open(vectors_path, 'wb') as vecs:
+            docs.write(_ndjson_line(header))
+            vecs.write(np.zeros(2, dtype='<u8').tobytes())  # Filled in once the count is known
+            
+            for shard in self.shards:
+                offset = 0
+                while True:
+                    batch = shard.get(
+                        limit=self.BACKUP_BATCH_SIZE,
+                        offset=offset,
+                        include=['metadatas', 'documents', 'embeddings']
+                    )
+                    if not batch['ids']:
+                        break
+                    
+                    for chunk_id, document, metadata in zip(batch['ids'], batch['documents'], batch['metadatas']):
+                        docs.write(_ndjson_line({'id': chunk_id, 'document': document, 'metadata': metadata}))
+                    
+                    embeddings = np.asarray(batch['embeddings'], dtype='<f2')
+                    dim = embeddings.shape[1]
+                    vecs.write(embeddings.tobytes())
+                    
+                    offset += len(batch['ids'])
+                    if len(batch['ids']) < self.BACKUP_BATCH_SIZE:
+                        break
+                total += offset
+            
+            vecs.seek(0)
+            vecs.write(np.array([total, dim], dtype='<u8').tobytes())
         
-        print(f"💾 Backed up {len(all_data['ids'])} chunks to {backup_path}")
+        print(f"💾 Backed up {total} chunks to {backup_path}")
     
     def restore_from_backup(self, backup_path: str) -> None:
-        """Restore collection from JSON backup"""
-        with open(backup_path, 'r') as f:
-            backup_data = json.load(f)
+        """Restore collection from a backup written by backup_collection()
+        
+        Backups from before the NDJSON format (a single JSON document, no
+        vector sidecar) are still accepted. Chunks go to the shards of their
+        chats, so a backup restores into any number of shards.
+        """
+        vectors_path = backup_path + self.VECTORS_SUFFIX
+        if not os.path.exists(vectors_path):
+            self._restore_from_json_backup(backup_path)
+            return
+        
+        # Clear existing collection
+        self.clear_collection()
+        
+        total = 0
+        with open(backup_path, 'rb') as docs, open(vectors_path, 'rb') as vecs:
+            docs.readline()  # Header
+            count, dim = np.frombuffer(vecs.read(16), dtype='<u8').tolist()
+            
+            while total < count:
+                n = min(self.add_batch_size, count - total)
+                records = [json_loads(docs.readline()) for _ in range(n)]
+                embeddings = np.frombuffer(vecs.read(n * dim * 2), dtype='<f2').reshape(n, dim).astype(np.float32)
+                
+                self._add_rows(
+                    [record['id'] for record in records],
+                    embeddings,
+                    [record['document'] for record in records],
+                    [record['metadata'] for record in records]
+                )
+                total += n
+        
+        self._reset_stats()
+        print(f"📂 Restored {total} chunks from {backup_path}")
+    
+    def _restore_from_json_backup(self, backup_path: str) -> None:
+        """Restore collection from a legacy single-document JSON backup"""
+        backup_data = read_json(backup_path)
         
         # Clear existing collection
         self.clear_collection()
@@ -318,28 +746,341 @@ class ChromaVectorStore:
         # Restore data
         data = backup_data['data']
         if data['ids']:
-            self.collection.add(
-                ids=data['ids'],
-                documents=data['documents'],
-                metadatas=data['metadatas'],
-                embeddings=data['embeddings']
+            self._add_rows(
+                data['ids'],
+                np.asarray(data['embeddings'], dtype=np.float32),
+                data['documents'],
+                data['metadatas']
             )
         
+        self._reset_stats()
         print(f"📂 Restored {len(data['ids'])} chunks from {backup_path}")
 
 
+class FaissVectorStore:
+    """FAISS-based vector store for message chunks
+    
+    Exact inner-product search (IndexFlatIP) over one contiguous float32
+    matrix, with chunk ids and metadata kept in parallel Python lists.
+    Embeddings are L2-normalized on insert, so inner product == cosine.
+    
+    Vectors carry stable int64 labels (IndexIDMap2, or the IVF-PQ index's
+    own ids) that increase with row order, so deletes work on every index
+    type and a label maps back to its row with a binary search.
+    """
+    
+    INDEX_FILE = "faiss.index"
+    METADATA_FILE = "faiss_metadata.json"
+    
+    # Above this many vectors, save() rebuilds the flat index as IVF-PQ
+    IVFPQ_THRESHOLD = 100_000
+    
+    def __init__(
+        self,
+        persist_directory: str = ".faiss",
+        embedding_dim: int = 384,
+        quantization: Optional[str] = None
+    ):
+        """
+        Initialize FAISS vector store
+        
+        Args:
+            persist_directory: Directory to persist the index and metadata
+            embedding_dim: Dimension of the embedding vectors
+            quantization: None for float32 vectors, 'float16' for half-precision
+                vectors (2x smaller), or 'int8' to store 8-bit scalar-quantized
+                vectors (4x smaller, trained on the first batch)
+        """
+        if quantization not in (None, 'float16', 'int8'):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        if not FAISS_AVAILABLE:
+            raise ImportError("faiss not installed. Run: pip install faiss-cpu")
+        
+        self.persist_directory = Path(persist_directory)
+        self.persist_directory.mkdir(exist_ok=True)
+        self.embedding_dim = embedding_dim
+        self.quantization = quantization
+        
+        self.chunk_ids: List[str] = []
+        self.metadata: List[Dict] = []
+        self._id_set = set()
+        # Index label of each row, ascending
+        self._labels = np.empty(0, dtype=np.int64)
+        
+        index_path = self.persist_directory / self.INDEX_FILE
+        metadata_path = self.persist_directory / self.METADATA_FILE
+        
+        if index_path.exists() and metadata_path.exists():
+            self.index = faiss.read_index(str(index_path))
+            self.embedding_dim = self.index.d
+            if hasattr(self.index, 'nprobe'):
+                self.index.nprobe = min(16, self.index.nlist)  # nprobe isn't persisted
+            saved = read_json(metadata_path)
+            self.chunk_ids = saved['chunk_ids']
+            self.metadata = saved['metadata']
+            self._id_set = set(self.chunk_ids)
+            # Older saves have no labels: vectors were added in row order
+            self._labels = np.array(saved.get('labels', range(len(self.chunk_ids))), dtype=np.int64)
+            if not isinstance(self.index, (faiss.IndexIDMap, faiss.IndexIVF)):
+                self.index = self._with_labels(self.index)
+            print(f"📂 Loaded FAISS index with {self.index.ntotal} items")
+        else:
+            self.index = self._new_index()
+            print(f"🆕 Created new FAISS index (dim={self.embedding_dim}, {quantization or 'float32'})")
+    
+    def _new_index(self):
+        """Create an empty index for the configured quantization"""
+        if self.quantization == 'int8':
+            base = faiss.IndexScalarQuantizer(
+                self.embedding_dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        elif self.quantization == 'float16':
+            base = faiss.IndexScalarQuantizer(
+                self.embedding_dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            base = faiss.IndexFlatIP(self.embedding_dim)
+        return faiss.IndexIDMap2(base)
+    
+    def _with_labels(self, index):
+        """Wrap a flat or scalar-quantized index from an older save in IndexIDMap2
+        
+        IndexIDMap2 only wraps an empty index, so the vectors are re-added
+        to an emptied copy that keeps the trained quantizer.
+        """
+        vectors = index.reconstruct_n(0, index.ntotal)
+        base = faiss.clone_index(index)
+        base.reset()
+        wrapped = faiss.IndexIDMap2(base)
+        wrapped.add_with_ids(vectors, self._labels)
+        return wrapped
+    
+    def _base_index(self):
+        """The index under the IndexIDMap2 wrapper (IVF-PQ indexes aren't wrapped)"""
+        if isinstance(self.index, faiss.IndexIDMap):
+            return faiss.downcast_index(self.index.index)
+        return self.index
+    
+    def add_chunks(
+        self, 
+        embedding_results: List[EmbeddingResult], 
+        chunks: List[MessageChunk],
+        verbose: bool = True
+    ) -> None:
+        """Add message chunks with embeddings to the index"""
+        if len(embedding_results) != len(chunks):
+            raise ValueError("Number of embedding results must match number of chunks")
+        
+        # Like Chroma, ignore ids that are already stored
+        new_pairs = [
+            (result, chunk) for result, chunk in zip(embedding_results, chunks)
+            if result.chunk_id not in self._id_set
+        ]
+        if not new_pairs:
+            return
+        
+        vectors = np.stack([result.embedding for result, _ in new_pairs]).astype(np.float32, copy=False)
+        if vectors.shape[1] != self.embedding_dim:
+            raise ValueError(f"Embedding dimension mismatch: expected {self.embedding_dim}, got {vectors.shape[1]}")
+        faiss.normalize_L2(vectors)
+        if not self.index.is_trained:
+            # Learns the per-dimension value range used for int8 codes
+            self.index.train(vectors)
+        # Labels past the current last one keep _labels sorted
+        first = int(self._labels[-1]) + 1 if len(self._labels) else 0
+        labels = np.arange(first, first + len(vectors), dtype=np.int64)
+        self.index.add_with_ids(vectors, labels)
+        self._labels = np.concatenate([self._labels, labels])
+        
+        for result, chunk in new_pairs:
+            self.chunk_ids.append(result.chunk_id)
+            self._id_set.add(result.chunk_id)
+            
+            metadata = {
+                'chunk_id': chunk.id,
+                'chat_id': chunk.chat_id,
+                'start_time': chunk.start_time_iso,
+                'end_time': chunk.end_time_iso,
+                'participants': chunk.participants,
+                'chunk_type': chunk.chunk_type,
+                'message_count': len(chunk.messages),
+                'embedding_model': result.model_name,
+                'document': chunk.text_content
+            }
+            metadata.update(chunk.metadata)
+            self.metadata.append(metadata)
+        
+        if verbose:
+            print(f"✅ Added {len(new_pairs)} chunks to FAISS index")
+    
+    def search(
+        self, 
+        query_embedding: Union[List[float], np.ndarray], 
+        top_k: int = 5,
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Search for similar chunks by cosine similarity
+        
+        Args:
+            query_embedding: Query vector embedding
+            top_k: Number of results to return
+            where_filters: Optional equality filters on metadata (e.g., {'chat_id': 123})
+            return_documents: Accepted for VectorStoreProtocol; documents
+                are held in memory, so there is nothing to skip
+            
+        Returns:
+            List of (metadata, similarity_score) tuples
+        """
+        return self.search_batch([query_embedding], top_k, where_filters)[0]
+    
+    def search_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Search for several queries with one index.search() over a query matrix
+        
+        Args:
+            query_embeddings: Query vector embeddings, one per row; a float32
+                array is passed through without per-element conversion
+            top_k: Number of results to return per query
+            where_filters: Optional equality filters applied to every query
+            return_documents: Ignored, as in search()
+            
+        Returns:
+            One list of (metadata, similarity_score) tuples per query, in order
+        """
+        if self.index.ntotal == 0 or len(query_embeddings) == 0:
+            return [[] for _ in range(len(query_embeddings))]
+        
+        # normalize_L2 works in place; copy so a caller's float32 array is left alone
+        queries = np.array(query_embeddings, dtype=np.float32, order='C')
+        faiss.normalize_L2(queries)
+        
+        k = min(top_k, self.index.ntotal)
+        params = None
+        if where_filters:
+            # Restrict the search itself to matching rows instead of over-fetching
+            matching = [
+                i for i, metadata in enumerate(self.metadata)
+                if all(metadata.get(key) == value for key, value in where_filters.items())
+            ]
+            if not matching:
+                return [[] for _ in range(len(queries))]
+            k = min(top_k, len(matching))
+            selector = faiss.IDSelectorBatch(self._labels[matching])
+            if isinstance(self.index, faiss.IndexIVF):
+                # Matching rows are spread thinly over the lists, so probe more of them
+                nprobe = min(self.index.nlist, -(-self.index.nprobe * self.index.ntotal // len(matching)))
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+            else:
+                params = faiss.SearchParameters(sel=selector)
+        scores, labels = self.index.search(queries, k, params=params)
+        rows = np.searchsorted(self._labels, labels)
+        
+        batch_results = []
+        for row_labels, row_indices, row_scores in zip(labels, rows, scores):
+            batch_results.append([
+                (dict(self.metadata[idx]), float(score))
+                for label, idx, score in zip(row_labels, row_indices, row_scores)
+                if label >= 0
+            ])
+        
+        return batch_results
+    
+    def warm(self) -> None:
+        """Nothing to do: the index is read into memory by __init__"""
+    
+    def save(self) -> None:
+        """Write the index and metadata to the persist directory"""
+        if self.index.ntotal > self.IVFPQ_THRESHOLD and isinstance(self._base_index(), faiss.IndexFlat):
+            self._convert_to_ivfpq()
+        
+        with atomic_path(self.persist_directory / self.INDEX_FILE) as index_path:
+            faiss.write_index(self.index, str(index_path))
+        write_json_atomic(
+            self.persist_directory / self.METADATA_FILE,
+            {'chunk_ids': self.chunk_ids, 'metadata': self.metadata, 'labels': self._labels.tolist()}
+        )
+    
+    def _convert_to_ivfpq(self) -> None:
+        """Rebuild a large flat index as IVF-PQ for sublinear search"""
+        # The wrapped flat index holds the vectors in row order
+        vectors = self._base_index().reconstruct_n(0, self.index.ntotal)
+        nlist = int(np.sqrt(len(vectors)))
+        # PQ needs the dimension to split evenly into sub-quantizers
+        m = 48 if self.embedding_dim % 48 == 0 else 8
+        
+        quantizer = faiss.IndexFlatIP(self.embedding_dim)
+        index = faiss.IndexIVFPQ(quantizer, self.embedding_dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add_with_ids(vectors, self._labels)
+        index.nprobe = min(16, nlist)
+        self.index = index
+        print(f"🗜️  Rebuilt FAISS index as IVF-PQ (nlist={nlist}, m={m})")
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Delete chunks by IDs
+        
+        Vectors are removed by label, which works for the IndexIDMap2
+        wrapper and IVF-PQ alike; the surviving labels keep their order.
+        """
+        doomed = self._id_set.intersection(chunk_ids)
+        if not doomed:
+            return
+        
+        positions = [i for i, chunk_id in enumerate(self.chunk_ids) if chunk_id in doomed]
+        self.index.remove_ids(self._labels[positions])
+        
+        keep = [i for i, chunk_id in enumerate(self.chunk_ids) if chunk_id not in doomed]
+        self.chunk_ids = [self.chunk_ids[i] for i in keep]
+        self.metadata = [self.metadata[i] for i in keep]
+        self._labels = self._labels[keep]
+        self._id_set -= doomed
+        print(f"🗑️  Deleted {len(doomed)} chunks")
+    
+    def clear_collection(self) -> None:
+        """Remove all vectors and metadata"""
+        self.index = self._new_index()
+        self.chunk_ids = []
+        self.metadata = []
+        self._id_set = set()
+        self._labels = np.empty(0, dtype=np.int64)
+        print("🧹 Cleared FAISS index")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the vector store"""
+        return {
+            'total_chunks': self.index.ntotal,
+            'embedding_dim': self.embedding_dim,
+            'index_type': type(self._base_index()).__name__,
+            'unique_chats': len(set(meta['chat_id'] for meta in self.metadata)),
+            'persist_directory': str(self.persist_directory)
+        }
+
+
 class VectorStoreManager:
-    """Manager for switching between different vector store implementations"""
+    """Manager for switching between different vector store implementations
+    
+    The backend is picked once in __init__; every other method forwards to
+    it through VectorStoreProtocol.
+    """
     
     def __init__(self, store_type: str = 'chromadb', **kwargs):
         """
         Initialize vector store manager
         
         Args:
-            store_type: 'chromadb' or 'memory' (fallback)
+            store_type: 'chromadb', 'faiss', or 'memory' (fallback)
             **kwargs: Arguments passed to the vector store constructor
         """
         self.store_type = store_type
+        self.store: VectorStoreProtocol
         
         if store_type == 'chromadb':
             if not CHROMADB_AVAILABLE:
@@ -348,31 +1089,67 @@ class VectorStoreManager:
             else:
                 self.store = ChromaVectorStore(**kwargs)
         
+        elif store_type == 'faiss':
+            if not FAISS_AVAILABLE:
+                print("⚠️  FAISS not available, falling back to in-memory store")
+                self.store_type = 'memory'
+            else:
+                self.store = FaissVectorStore(
+                    persist_directory=kwargs.get('persist_directory', '.faiss'),
+                    embedding_dim=kwargs.get('embedding_dim', 384),
+                    quantization=kwargs.get('quantization')
+                )
+        
         if self.store_type == 'memory':
             # Import here to avoid circular import
             from .embeddings import EmbeddingIndex
             embedding_dim = kwargs.get('embedding_dim', 384)  # Default for MiniLM
-            self.store = EmbeddingIndex(embedding_dim)
+            self.store = EmbeddingIndex(embedding_dim, quantization=kwargs.get('quantization'))
     
-    def add_chunks(self, embedding_results: List[EmbeddingResult], chunks: List[MessageChunk]) -> None:
-        """Add chunks to the vector store"""
-        if self.store_type == 'chromadb':
-            self.store.add_chunks(embedding_results, chunks)
-        else:
-            # Memory store
-            self.store.add_embeddings(embedding_results, chunks)
+    def add_chunks(
+        self,
+        embedding_results: List[EmbeddingResult],
+        chunks: List[MessageChunk],
+        verbose: bool = True
+    ) -> None:
+        """Add chunks to the vector store
+        
+        Args:
+            embedding_results: Embeddings for the chunks, in the same order
+            chunks: Chunks to add
+            verbose: Print a line per call (off for batched indexing runs)
+        """
+        self.store.add_chunks(embedding_results, chunks, verbose=verbose)
     
-    def search(self, query_embedding: List[float], top_k: int = 5, **kwargs) -> List[Tuple[Dict, float]]:
-        """Search the vector store"""
-        if self.store_type == 'chromadb':
-            return self.store.search(query_embedding, top_k, kwargs.get('where_filters'))
-        else:
-            # Memory store returns different format, normalize it
-            results = self.store.search_similar(query_embedding, top_k)
-            return results  # Already in correct format
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Delete chunks from the vector store"""
+        if chunk_ids:
+            self.store.delete_chunks(chunk_ids)
+    
+    def search(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
+    ) -> List[Tuple[Dict, float]]:
+        """Search the vector store (see VectorStoreProtocol.search)"""
+        return self.store.search(query_embedding, top_k, where_filters, return_documents)
+    
+    def search_batch(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int = 5,
+        where_filters: Optional[Dict[str, Any]] = None,
+        return_documents: bool = True
+    ) -> List[List[Tuple[Dict, float]]]:
+        """Search the vector store for several queries at once, one result list per query"""
+        return self.store.search_batch(query_embeddings, top_k, where_filters, return_documents)
+    
+    def warm(self) -> None:
+        """Load the store's index ahead of the first search (stores kept on disk)"""
+        self.store.warm()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics"""
-        stats = {'store_type': self.store_type}
-        stats.update(self.store.get_stats() if hasattr(self.store, 'get_stats') else self.store.stats())
-        return stats
\ No newline at end of file
+        return {'store_type': self.store_type, **self.store.get_stats()}
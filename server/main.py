@@ -5,32 +5,134 @@ REST API server providing chat, search, and management endpoints.
 """
 
 import os
-import sys
-from pathlib import Path
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 import logging
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
-# Add indexer to path
-sys.path.insert(0, str(Path(__file__).parent.parent / 'indexer'))
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
 
 from indexer import iMessageIndexer, iMessageChat
 from indexer.llm_integration import LLMManager, RAGResponse
+from indexer.vector_store import ChromaVectorStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+
+# Settings shared by the server's indexer and the indexing worker process
+INDEXER_OPTIONS = {
+    'vector_store_type': 'chromadb',
+    'cache_dir': '.imessage_ai_server'
+}
+
+
+def _create_indexer() -> Optional[iMessageIndexer]:
+    """Create the server's indexer and load its index, if one was built"""
+    try:
+        indexer = iMessageIndexer(**INDEXER_OPTIONS)
+    except Exception as e:
+        logger.error(f"Failed to initialize indexer: {e}")
+        return None
+    
+    # Try to load existing vector store, and its index ahead of the first query
+    try:
+        indexer.load_existing_vector_store()
+        indexer.vector_store.warm()
+    except Exception:
+        logger.info("No existing vector store found")
+    
+    logger.info("Indexer instance initialized")
+    return indexer
+
+
+def _create_chat(indexer: Optional[iMessageIndexer]) -> Optional[iMessageChat]:
+    """Create the chat system on top of the server's indexer
+    
+    Sharing the indexer means chat and search see new data as soon as
+    /index finishes. Returns None if the LLM isn't available.
+    """
+    if indexer is None:
+        return None
+    try:
+        # Initialize with Ollama by default
+        chat = iMessageChat(indexer=indexer, llm_type='ollama')
+    except (Exception, SystemExit) as e:  # iMessageChat exits when the LLM is unavailable
+        logger.error(f"Failed to initialize chat: {e}")
+        return None
+    
+    logger.info("Chat instance initialized")
+    return chat
+
+
+def _run_full_index_worker(days_limit: Optional[int], message_limit: Optional[int]) -> int:
+    """Run a full index in the indexing process and return the chunk count
+    
+    The live indexer can't be pickled, so the worker builds its own over the
+    same cache directory; the server reloads the store once it finishes.
+    """
+    indexer = iMessageIndexer(**INDEXER_OPTIONS)
+    metadata = indexer.run_full_index(
+        days_limit=days_limit,
+        message_limit=message_limit,
+        save_index=True,
+        keep_chunks=False
+    )
+    return metadata['chunk_stats']['total_chunks']
+
+
+def _reload_index(indexer: iMessageIndexer) -> None:
+    """Point the live indexer at the store the indexing process just wrote"""
+    if indexer.vector_store_type == 'chromadb':
+        ChromaVectorStore.drop_cached_clients()
+    indexer.load_existing_vector_store()
+    indexer.chunks = []  # Stale; search() reads chunks from the chunk store
+    indexer.vector_store.warm()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the indexer and chat system once, before serving requests"""
+    app.state.indexer = await run_in_threadpool(_create_indexer)
+    app.state.chat = await run_in_threadpool(_create_chat, app.state.indexer)
+    app.state.chat_lock = asyncio.Lock()
+    # Full indexing is CPU-bound, so it runs in a worker process rather than
+    # on the event loop: spawned (not forked from this threaded process), and
+    # fresh for each run so no client state carries over between runs
+    app.state.indexing_pool = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context('spawn'),
+        max_tasks_per_child=1
+    )
+    app.state.indexing_task = None
+    yield
+    app.state.indexing_pool.shutdown(wait=False, cancel_futures=True)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="iMessage AI API",
     description="REST API for chatting with your iMessage history using AI",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for web UI
@@ -42,9 +144,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global state
-chat_instance: Optional[iMessageChat] = None
-indexer_instance: Optional[iMessageIndexer] = None
+# Compress larger bodies (search results); small ones aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Fire-and-forget prefetches; the event loop only keeps weak references to tasks
+prefetch_tasks: set = set()
 
 
 # Pydantic models for API
@@ -52,6 +156,7 @@ class ChatMessage(BaseModel):
     message: str
     include_sources: Optional[bool] = True
     filters: Optional[Dict[str, Any]] = None
+    next_query_hint: Optional[str] = None  # Likely follow-up; retrieved while this one generates
 
 
 class ChatResponse(BaseModel):
@@ -84,84 +189,110 @@ class SystemStatus(BaseModel):
 
 
 # Dependency to get chat instance
-async def get_chat() -> iMessageChat:
-    """Get or create chat instance"""
-    global chat_instance
+async def get_chat(request: Request) -> iMessageChat:
+    """Chat instance built at startup
     
-    if chat_instance is None:
-        try:
-            # Initialize with Ollama by default
-            chat_instance = iMessageChat(llm_type='ollama')
-            logger.info("Chat instance initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize chat: {e}")
-            raise HTTPException(status_code=503, detail=f"Chat system unavailable: {e}")
+    If the LLM wasn't available then, creating it is retried (once at a
+    time) until it succeeds.
+    """
+    state = request.app.state
+    if state.chat is None:
+        async with state.chat_lock:
+            if state.chat is None:
+                state.chat = await run_in_threadpool(_create_chat, state.indexer)
+        if state.chat is None:
+            raise HTTPException(status_code=503, detail="Chat system unavailable")
     
-    return chat_instance
+    return state.chat
 
 
 # Dependency to get indexer instance
-async def get_indexer() -> iMessageIndexer:
-    """Get or create indexer instance"""
-    global indexer_instance
-    
-    if indexer_instance is None:
-        try:
-            indexer_instance = iMessageIndexer(
-                vector_store_type='chromadb',
-                cache_dir='.imessage_ai_server'
-            )
-            # Try to load existing vector store
-            try:
-                indexer_instance.load_existing_vector_store()
-            except Exception:
-                logger.info("No existing vector store found")
-            
-            logger.info("Indexer instance initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize indexer: {e}")
-            raise HTTPException(status_code=503, detail=f"Indexer unavailable: {e}")
-    
-    return indexer_instance
+async def get_indexer(request: Request) -> iMessageIndexer:
+    """Indexer instance built at startup"""
+    if request.app.state.indexer is None:
+        raise HTTPException(status_code=503, detail="Indexer unavailable")
+    return request.app.state.indexer
+
+
+def _has_index(chat: iMessageChat) -> bool:
+    """Whether the chat's indexer has a vector store to search"""
+    return chat.rag is not None and chat.indexer.vector_store is not None
 
 
 # API Endpoints
 
+# Served by / and included in /health?verbose=1
+API_INFO = {
+    "message": "iMessage AI API",
+    "version": "0.1.0",
+    "docs": "/docs"
+}
+
+
 @app.get("/", response_model=Dict[str, str])
 async def root():
     """Root endpoint"""
-    return {
-        "message": "iMessage AI API", 
-        "version": "0.1.0",
-        "docs": "/docs"
-    }
+    return API_INFO
 
 
-@app.get("/status", response_model=SystemStatus)
-async def get_system_status():
-    """Get system status and health check"""
+MSGPACK_MEDIA_TYPE = 'application/x-msgpack'
+
+
+def _encode_response(request: Request, content: Any) -> Response:
+    """Response in the client's preferred encoding
+    
+    MessagePack when the Accept header lists it and msgspec is installed
+    (smaller than JSON and faster to decode), JSON otherwise.
+    """
+    content = jsonable_encoder(content)
+    if MSGSPEC_AVAILABLE and MSGPACK_MEDIA_TYPE in request.headers.get('accept', ''):
+        response = Response(msgspec.msgpack.encode(content), media_type=MSGPACK_MEDIA_TYPE)
+    else:
+        response = JSONResponse(content)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+def _etag_response(request: Request, content: Any) -> Response:
+    """Encoded response tagged with a hash of its body
+    
+    Pollers that send the tag back in If-None-Match get an empty 304 until
+    the body changes.
+    """
+    response = _encode_response(request, content)
+    etag = f'"{hashlib.blake2b(response.body, digest_size=8).hexdigest()}"'
+    if etag in [tag.strip() for tag in request.headers.get('if-none-match', '').split(',')]:
+        return Response(status_code=304, headers={'ETag': etag, 'Vary': 'Accept'})
+    response.headers['ETag'] = etag
+    return response
+
+
+def _indexing_status(indexer: iMessageIndexer) -> IndexingStatus:
+    """Indexing status from the indexer's stats"""
+    stats = indexer.get_stats()
+    
+    vs_stats = stats.get('vector_store', {})
+    total_chunks = vs_stats.get('total_chunks', 0)
+    
+    if total_chunks > 0:
+        return IndexingStatus(
+            status="indexed",
+            total_chunks=total_chunks,
+            total_chats=vs_stats.get('unique_chats'),
+            embedding_model=stats.get('config', {}).get('embedding_model')
+        )
+    return IndexingStatus(status="not_indexed")
+
+
+async def _system_status(request: Request) -> SystemStatus:
+    """LLM backends, indexing status and chat availability"""
     try:
         # Check LLM backends
         llm_backends = LLMManager.get_available_llms()
         
         # Check indexing status
         try:
-            indexer = await get_indexer()
-            stats = indexer.get_stats()
-            
-            vs_stats = stats.get('vector_store', {})
-            total_chunks = vs_stats.get('total_chunks', 0)
-            
-            if total_chunks > 0:
-                indexing_status = IndexingStatus(
-                    status="indexed",
-                    total_chunks=total_chunks,
-                    total_chats=vs_stats.get('unique_chats'),
-                    embedding_model=stats.get('config', {}).get('embedding_model')
-                )
-            else:
-                indexing_status = IndexingStatus(status="not_indexed")
-                
+            indexing_status = _indexing_status(await get_indexer(request))
         except Exception as e:
             logger.error(f"Error checking indexing status: {e}")
             indexing_status = IndexingStatus(status="error")
@@ -169,12 +300,12 @@ async def get_system_status():
         # Check if chat is available
         chat_available = False
         try:
-            chat = await get_chat()
-            chat_available = chat.rag is not None
+            chat = await get_chat(request)
+            chat_available = _has_index(chat)
         except Exception:
             pass
         
-        return SystemStatus(
+        status = SystemStatus(
             api_status="healthy",
             llm_backends=llm_backends,
             indexing_status=indexing_status,
@@ -183,30 +314,47 @@ async def get_system_status():
         
     except Exception as e:
         logger.error(f"Status check failed: {e}")
-        return SystemStatus(
+        status = SystemStatus(
             api_status="error",
             llm_backends={},
             indexing_status=IndexingStatus(status="error"),
             chat_available=False
         )
+    
+    return status
+
+
+@app.get("/status", response_model=SystemStatus)
+async def get_system_status(request: Request):
+    """Get system status and health check"""
+    return _etag_response(request, await _system_status(request))
 
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_history(
     request: ChatMessage,
+    http_request: Request,
     chat: iMessageChat = Depends(get_chat)
 ):
     """Chat with your iMessage history"""
     
-    if chat.rag is None:
+    if not _has_index(chat):
         raise HTTPException(
             status_code=400, 
             detail="No indexed data available. Run indexing first."
         )
     
     try:
-        # Get response with sources
-        response = chat.ask_with_sources(
+        # Search for the expected follow-up while this answer generates; the
+        # indexer caches the results for when it's asked
+        if request.next_query_hint:
+            task = asyncio.create_task(chat.rag.aprefetch(request.next_query_hint, request.filters))
+            prefetch_tasks.add(task)
+            task.add_done_callback(_prefetch_done)
+        
+        # Get response with sources; retrieval runs in a worker thread and
+        # generation on the LLM's async client, off the event loop
+        response = await chat.aask_with_sources(
             request.message,
             filters=request.filters
         )
@@ -215,19 +363,26 @@ async def chat_with_history(
             raise HTTPException(status_code=500, detail="Failed to generate response")
         
         # Format response
-        return ChatResponse(
+        return _encode_response(http_request, ChatResponse(
             answer=response['answer'],
             sources=response['sources'] if request.include_sources else [],
             model=response['model'],
             processing_time_ms=response['processing_time_ms'],
             timestamp=datetime.now().isoformat()
-        )
+        ))
         
     except Exception as e:
         logger.error(f"Chat failed: {e}")
         raise HTTPException(status_code=500, detail=f"Chat error: {e}")
 
 
+def _prefetch_done(task: asyncio.Task) -> None:
+    """Forget a finished prefetch, logging its failure if any"""
+    prefetch_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Prefetch failed: {task.exception()}")
+
+
 @app.get("/chat/history")
 async def get_chat_history(chat: iMessageChat = Depends(get_chat)):
     """Get current chat session history"""
@@ -256,34 +411,27 @@ async def clear_chat_history(chat: iMessageChat = Depends(get_chat)):
 @app.post("/index")
 async def start_indexing(
     request: IndexingRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
     indexer: iMessageIndexer = Depends(get_indexer)
 ):
-    """Start indexing iMessage data"""
+    """Start indexing iMessage data in the indexing process"""
+    state = http_request.app.state
+    if state.indexing_task is not None and not state.indexing_task.done():
+        raise HTTPException(status_code=409, detail="Indexing already in progress")
     
     async def run_indexing():
-        """Background task to run indexing"""
-        try:
-            logger.info(f"Starting indexing: {request.days_limit} days")
-            
-            metadata = indexer.run_full_index(
-                days_limit=request.days_limit,
-                message_limit=request.message_limit,
-                save_index=True
-            )
-            
-            logger.info(f"Indexing complete: {metadata['chunk_stats']['total_chunks']} chunks")
-            
-            # Reinitialize chat instance to pick up new data
-            global chat_instance
-            if chat_instance:
-                chat_instance = None
-            
-        except Exception as e:
-            logger.error(f"Indexing failed: {e}")
+        """Wait for the worker, then load what it wrote"""
+        logger.info(f"Starting indexing: {request.days_limit} days")
+        future = state.indexing_pool.submit(_run_full_index_worker, request.days_limit, request.message_limit)
+        total_chunks = await asyncio.wrap_future(future)
+        
+        # The chat system shares this indexer, so it searches the new
+        # index from the next request on
+        await run_in_threadpool(_reload_index, indexer)
+        logger.info(f"Indexing complete: {total_chunks} chunks")
     
-    # Start indexing in background
-    background_tasks.add_task(run_indexing)
+    state.indexing_task = asyncio.create_task(run_indexing())
+    state.indexing_task.add_done_callback(_indexing_done)
     
     return {
         "message": "Indexing started",
@@ -292,68 +440,66 @@ async def start_indexing(
     }
 
 
+def _indexing_done(task: asyncio.Task) -> None:
+    """Log an indexing run that failed"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Indexing failed: {task.exception()}")
+
+
 @app.get("/index/status", response_model=IndexingStatus)
-async def get_indexing_status(indexer: iMessageIndexer = Depends(get_indexer)):
+async def get_indexing_status(request: Request, indexer: iMessageIndexer = Depends(get_indexer)):
     """Get current indexing status"""
+    task = request.app.state.indexing_task
     try:
-        stats = indexer.get_stats()
-        
-        vs_stats = stats.get('vector_store', {})
-        total_chunks = vs_stats.get('total_chunks', 0)
-        
-        if total_chunks > 0:
-            return IndexingStatus(
-                status="indexed",
-                total_chunks=total_chunks,
-                total_chats=vs_stats.get('unique_chats'),
-                embedding_model=stats.get('config', {}).get('embedding_model')
-            )
+        if task is not None and not task.done():
+            status = IndexingStatus(status="indexing")
+        elif task is not None and not task.cancelled() and task.exception() is not None:
+            status = IndexingStatus(status="error")
         else:
-            return IndexingStatus(status="not_indexed")
-            
+            status = _indexing_status(indexer)
     except Exception as e:
         logger.error(f"Failed to get indexing status: {e}")
-        return IndexingStatus(status="error")
+        status = IndexingStatus(status="error")
+    
+    return _etag_response(request, status)
 
 
 @app.get("/search")
 async def search_conversations(
+    request: Request,
     query: str,
     limit: Optional[int] = 5,
     chat: iMessageChat = Depends(get_chat)
 ):
     """Search conversations without generating chat response"""
     
-    if chat.rag is None:
+    if not _has_index(chat):
         raise HTTPException(
             status_code=400,
             detail="No indexed data available"
         )
     
     try:
-        # Get relevant chunks
-        results = chat.indexer.search(query, top_k=limit)
+        # Get relevant chunks (embedding and vector search block, so off the event loop)
+        results = await run_in_threadpool(chat.indexer.search, query, top_k=limit)
         
-        # Format results
-        search_results = []
-        for chunk, score in results:
-            participants = ", ".join(chunk.participants[:2])
-            if len(chunk.participants) > 2:
-                participants += f" (+{len(chunk.participants) - 2})"
-            
-            search_results.append({
-                "participants": participants,
-                "time_range": f"{chunk.start_time.strftime('%Y-%m-%d %H:%M')} - {chunk.end_time.strftime('%H:%M')}",
+        # Format results; chunks cache their display fields across requests
+        search_results = [
+            {
+                "participants": chunk.participants_label,
+                "time_range": chunk.time_range,
                 "message_count": len(chunk.messages),
                 "similarity_score": score,
                 "preview": chunk.text_content[:200] + "..." if len(chunk.text_content) > 200 else chunk.text_content
-            })
+            }
+            for chunk, score in results
+        ]
         
-        return {
+        return _etag_response(request, {
             "query": query,
             "results": search_results,
             "total_found": len(search_results)
-        }
+        })
         
     except Exception as e:
         logger.error(f"Search failed: {e}")
@@ -361,18 +507,18 @@ async def search_conversations(
 
 
 @app.get("/conversations")
-async def get_conversations(indexer: iMessageIndexer = Depends(get_indexer)):
+async def get_conversations(request: Request, indexer: iMessageIndexer = Depends(get_indexer)):
     """Get list of indexed conversations"""
     try:
         stats = indexer.get_stats()
         
         # Basic conversation info from stats
-        return {
+        return _etag_response(request, {
             "total_chats": stats.get('vector_store', {}).get('unique_chats', 0),
             "total_chunks": stats.get('vector_store', {}).get('total_chunks', 0),
             "chunk_types": stats.get('chunks', {}).get('chunk_types', {}),
             "embedding_model": stats.get('config', {}).get('embedding_model')
-        }
+        })
         
     except Exception as e:
         logger.error(f"Failed to get conversations: {e}")
@@ -381,9 +527,17 @@ async def get_conversations(indexer: iMessageIndexer = Depends(get_indexer)):
 
 # Health check endpoint
 @app.get("/health")
-async def health_check():
-    """Simple health check"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+async def health_check(request: Request, verbose: bool = False):
+    """Simple health check
+    
+    With verbose=1 the response also carries the / and /status fields, so a
+    readiness probe needs one request instead of three.
+    """
+    health = {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    if verbose:
+        health.update(API_INFO)
+        health.update((await _system_status(request)).model_dump())
+    return health
 
 
 # Error handlers
@@ -400,9 +554,9 @@ async def global_exception_handler(request, exc):
 if __name__ == "__main__":
     import uvicorn
     
-    # Development server
+    # Development server; run from the repository root: python -m server.main
     uvicorn.run(
-        "main:app",
+        "server.main:app",
         host="0.0.0.0",
         port=8000,
         reload=True,
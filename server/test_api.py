@@ -2,189 +2,372 @@
 """
 Test script for iMessage AI FastAPI server
 
-Tests the API endpoints to verify functionality.
+Tests the API endpoints to verify functionality. The independent endpoint
+tests run concurrently; each prints its report once its requests are done,
+so the reports don't interleave.
 """
 
-import requests
+import argparse
+import asyncio
+import aiohttp
 import json
+import socket
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _dumps(data: Any) -> bytes:
+    """UTF-8 JSON body for a request, via orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+
+# Parses bytes; orjson.JSONDecodeError subclasses json.JSONDecodeError
+_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+
+def _client_socket(addr_info: Tuple) -> socket.socket:
+    """Socket for the client's connector, with Nagle off and keep-alive probes on
+    
+    Small requests go out without waiting on Nagle's algorithm, and pooled
+    connections the server has silently dropped are detected.
+    """
+    family, sock_type, proto, _, _ = addr_info
+    sock = socket.socket(family=family, type=sock_type, proto=proto)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    return sock
 
 
 class APIClient:
-    """Simple API client for testing"""
+    """Simple async API client for testing
+    
+    Requests share one aiohttp session, whose connector keeps connections
+    alive and lets concurrent requests use several at once. Use it as an
+    async context manager.
+    """
     
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    HEADERS = {"Content-Type": "application/json"}
+    
+    def __init__(self, base_url: str = "http://localhost:8000", concurrency: int = 16):
+        """
+        Args:
+            base_url: Server address
+            concurrency: Most connections (and so requests in flight) at once
+        """
         self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.session: Optional[aiohttp.ClientSession] = None
+        # (endpoint, params) -> (ETag, parsed body) of the last tagged GET response
+        self._etag_cache: Dict[Tuple, Tuple[str, Dict[str, Any]]] = {}
     
-    def get(self, endpoint: str) -> Dict[str, Any]:
-        """GET request"""
-        response = requests.get(f"{self.base_url}{endpoint}")
-        response.raise_for_status()
-        return response.json()
+    async def __aenter__(self) -> 'APIClient':
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30, socket_factory=_client_socket),
+            headers=self.HEADERS
+        )
+        return self
     
-    def post(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+    
+    async def close(self) -> None:
+        """Close the session's pooled connections"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def warm_up(self, connections: int = 2) -> None:
+        """
+        Open pooled connections ahead of any timed requests
+        
+        DNS resolution, the TCP handshake and (for HTTPS) the TLS handshake
+        happen here rather than inside the first test. Failures are left for
+        the tests to report.
+        
+        Args:
+            connections: Concurrent /health requests, so this many
+                connections are opened and kept alive
+        """
+        try:
+            await asyncio.gather(*[self.get("/health") for _ in range(min(connections, self.concurrency))])
+        except (aiohttp.ClientError, OSError):
+            pass
+    
+    async def _decode(self, response: aiohttp.ClientResponse) -> Dict[str, Any]:
+        """Parse a JSON response body"""
+        return _loads(await response.read())
+    
+    async def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        GET request, with optional query parameters
+        
+        Responses that carry an ETag are kept; asking again sends the tag in
+        If-None-Match, and a 304 reuses the kept body instead of sending and
+        decoding it again.
+        """
+        key = (endpoint, frozenset(params.items()) if params else None)
+        cached = self._etag_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else None
+        
+        async with self.session.get(f"{self.base_url}{endpoint}", params=params, headers=headers) as response:
+            if response.status == 304 and cached:
+                return cached[1]
+            if response.status >= 400:
+                response.raise_for_status()  # Builds the ClientResponseError
+            body = await self._decode(response)
+        
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etag_cache[key] = (etag, body)
+        return body
+    
+    async def post(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """POST request"""
-        response = requests.post(
-            f"{self.base_url}{endpoint}",
-            json=data,
-            headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
-        return response.json()
+        async with self.session.post(f"{self.base_url}{endpoint}", data=_dumps(data)) as response:
+            if response.status >= 400:
+                response.raise_for_status()  # Builds the ClientResponseError
+            return await self._decode(response)
     
-    def delete(self, endpoint: str) -> Dict[str, Any]:
+    async def delete(self, endpoint: str) -> Dict[str, Any]:
         """DELETE request"""
-        response = requests.delete(f"{self.base_url}{endpoint}")
-        response.raise_for_status()
-        return response.json()
+        async with self.session.delete(f"{self.base_url}{endpoint}") as response:
+            if response.status >= 400:
+                response.raise_for_status()  # Builds the ClientResponseError
+            return await self._decode(response)
 
 
-def test_basic_endpoints():
-    """Test basic API endpoints"""
-    print("🧪 Testing Basic API Endpoints")
-    print("=" * 35)
+class MsgpackAPIClient(APIClient):
+    """API client that asks for MessagePack responses (needs msgspec)
+    
+    The server answers in MessagePack where it supports it and JSON
+    elsewhere; responses are decoded by their Content-Type. Request bodies
+    stay JSON, which is what the server parses.
+    """
+    
+    HEADERS = {
+        "Content-Type": "application/json",
+        "Accept": "application/x-msgpack, application/json;q=0.9"
+    }
+    
+    # Decoders are reusable; building one per response would be wasted work
+    _msgpack_decoder = msgspec.msgpack.Decoder() if MSGSPEC_AVAILABLE else None
+    
+    def __init__(self, base_url: str = "http://localhost:8000", concurrency: int = 16):
+        if not MSGSPEC_AVAILABLE:
+            raise ImportError("msgspec not installed. Run: pip install msgspec")
+        super().__init__(base_url, concurrency)
     
-    client = APIClient()
+    async def _decode(self, response: aiohttp.ClientResponse) -> Dict[str, Any]:
+        """Parse a MessagePack or JSON response body"""
+        if response.content_type == "application/x-msgpack":
+            return self._msgpack_decoder.decode(await response.read())
+        return await super()._decode(response)
+
+
+async def test_basic_endpoints(client: APIClient) -> bool:
+    """Test basic API endpoints
     
+    One /health?verbose=1 request covers /, /health and /status; servers
+    without the verbose fields get the three requests instead.
+    """
     try:
-        # Test root endpoint
-        print("1️⃣ Testing root endpoint...")
-        root_response = client.get("/")
-        print(f"   ✅ Root: {root_response['message']}")
-        
-        # Test health check
-        print("\n2️⃣ Testing health check...")
-        health_response = client.get("/health")
-        print(f"   ✅ Health: {health_response['status']}")
-        
-        # Test system status
-        print("\n3️⃣ Testing system status...")
-        status_response = client.get("/status")
-        print(f"   API Status: {status_response['api_status']}")
-        print(f"   LLM Backends: {status_response['llm_backends']}")
-        print(f"   Chat Available: {status_response['chat_available']}")
-        print(f"   Indexing: {status_response['indexing_status']['status']}")
-        
-        return True
-        
-    except requests.exceptions.ConnectionError:
+        health_response = await client.get("/health", params={"verbose": 1})
+        if 'api_status' in health_response:
+            root_response = status_response = health_response
+        else:
+            root_response, status_response = await asyncio.gather(
+                client.get("/"),
+                client.get("/status")
+            )
+    except aiohttp.ClientConnectorError:
         print("❌ Connection failed. Is the server running?")
-        print("💡 Start server: uvicorn main:app --reload")
+        print("💡 Start server from the repo root: uvicorn server.main:app --reload")
         return False
     except Exception as e:
         print(f"❌ Basic endpoint test failed: {e}")
         return False
+    
+    print("🧪 Testing Basic API Endpoints")
+    print("=" * 35)
+    
+    # Test root endpoint
+    print("1️⃣ Testing root endpoint...")
+    print(f"   ✅ Root: {root_response['message']}")
+    
+    # Test health check
+    print("\n2️⃣ Testing health check...")
+    print(f"   ✅ Health: {health_response['status']}")
+    
+    # Test system status
+    print("\n3️⃣ Testing system status...")
+    print(f"   API Status: {status_response['api_status']}")
+    print(f"   LLM Backends: {status_response['llm_backends']}")
+    print(f"   Chat Available: {status_response['chat_available']}")
+    print(f"   Indexing: {status_response['indexing_status']['status']}")
+    
+    return True
 
 
-def test_indexing_endpoints():
+async def test_indexing_endpoints(client: APIClient) -> bool:
     """Test indexing-related endpoints"""
+    try:
+        status_response, conversations_response = await asyncio.gather(
+            client.get("/index/status"),
+            client.get("/conversations")
+        )
+    except Exception as e:
+        print(f"\n❌ Indexing endpoint test failed: {e}")
+        return False
+    
     print("\n🧪 Testing Indexing Endpoints")
     print("=" * 30)
     
-    client = APIClient()
+    # Test indexing status
+    print("1️⃣ Testing indexing status...")
+    print(f"   Status: {status_response['status']}")
+    
+    total_chunks = status_response['total_chunks']
+    if total_chunks:
+        print(f"   Total chunks: {total_chunks}")
+        print(f"   Total chats: {status_response['total_chats']}")
+    
+    # Test conversations endpoint
+    print("\n2️⃣ Testing conversations endpoint...")
+    print(f"   Total chats: {conversations_response['total_chats']}")
+    print(f"   Total chunks: {conversations_response['total_chunks']}")
     
+    return True
+
+
+# Queries swept by test_search_endpoint, sent concurrently
+SEARCH_QUERIES = ["test", "dinner plans", "weekend trip", "happy birthday"]
+
+# Two-line report for one search result (bound once, not rebuilt per result)
+_format_result = "   {i}. {participants} | {time_range}\n      Score: {score:.3f}".format
+
+
+async def test_search_endpoint(client: APIClient) -> bool:
+    """Test search functionality over a sweep of queries"""
     try:
-        # Test indexing status
-        print("1️⃣ Testing indexing status...")
-        status_response = client.get("/index/status")
-        print(f"   Status: {status_response['status']}")
-        
-        if status_response['total_chunks']:
-            print(f"   Total chunks: {status_response['total_chunks']}")
-            print(f"   Total chats: {status_response['total_chats']}")
-        
-        # Test conversations endpoint
-        print("\n2️⃣ Testing conversations endpoint...")
-        conversations_response = client.get("/conversations")
-        print(f"   Total chats: {conversations_response['total_chats']}")
-        print(f"   Total chunks: {conversations_response['total_chunks']}")
-        
-        return True
-        
+        search_responses = await asyncio.gather(*[
+            client.get("/search", params={"query": query, "limit": 3})
+            for query in SEARCH_QUERIES
+        ])
     except Exception as e:
-        print(f"❌ Indexing endpoint test failed: {e}")
+        print(f"\n❌ Search endpoint test failed: {e}")
         return False
-
-
-def test_search_endpoint():
-    """Test search functionality"""
+    
     print("\n🧪 Testing Search Endpoint")
     print("=" * 25)
     
-    client = APIClient()
-    
-    try:
-        # Test search
-        print("1️⃣ Testing search...")
-        search_response = client.get("/search?query=test&limit=3")
-        
+    # Test search
+    print(f"1️⃣ Testing search ({len(SEARCH_QUERIES)} queries)...")
+    for search_response in search_responses:
         print(f"   Query: {search_response['query']}")
         print(f"   Results found: {search_response['total_found']}")
         
-        if search_response['results']:
-            for i, result in enumerate(search_response['results'][:2], 1):
-                print(f"   {i}. {result['participants']} | {result['time_range']}")
-                print(f"      Score: {result['similarity_score']:.3f}")
+        results = search_response['results']
+        if results:
+            print("\n".join(
+                _format_result(i=i, participants=result['participants'], time_range=result['time_range'], score=result['similarity_score'])
+                for i, result in enumerate(results[:2], 1)
+            ))
         else:
             print("   ⚠️  No search results (expected if no data indexed)")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Search endpoint test failed: {e}")
-        return False
+    
+    return True
 
 
-def test_chat_endpoint():
+async def test_chat_endpoint(client: APIClient) -> bool:
     """Test chat functionality (if data is indexed)"""
-    print("\n🧪 Testing Chat Endpoint")
-    print("=" * 22)
-    
-    client = APIClient()
+    chat_request = {
+        "message": "What are some recent conversations?",
+        "include_sources": True
+    }
     
     try:
-        # Test chat
-        print("1️⃣ Testing chat...")
-        
-        chat_request = {
-            "message": "What are some recent conversations?",
-            "include_sources": True
-        }
-        
-        chat_response = client.post("/chat", chat_request)
-        
-        print(f"   Answer: {chat_response['answer'][:100]}...")
-        print(f"   Model: {chat_response['model']}")
-        print(f"   Sources: {len(chat_response['sources'])}")
-        print(f"   Processing time: {chat_response['processing_time_ms']}ms")
-        
-        # Test chat history
-        print("\n2️⃣ Testing chat history...")
-        history_response = client.get("/chat/history")
-        print(f"   Session messages: {history_response.get('message_count', 0)}")
-        
-        return True
-        
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 400:
+        # Sent together; history may be read before the chat exchange lands,
+        # which only shifts the message count printed below
+        chat_response, history_response = await asyncio.gather(
+            client.post("/chat", chat_request),
+            client.get("/chat/history")
+        )
+    except aiohttp.ClientResponseError as e:
+        if e.status == 400:
+            print("\n🧪 Testing Chat Endpoint")
             print("   ⚠️  Chat not available (no indexed data)")
             return True
-        else:
-            print(f"❌ Chat endpoint test failed: {e}")
-            return False
+        print(f"\n❌ Chat endpoint test failed: {e}")
+        return False
     except Exception as e:
-        print(f"❌ Chat endpoint test failed: {e}")
+        print(f"\n❌ Chat endpoint test failed: {e}")
         return False
+    
+    print("\n🧪 Testing Chat Endpoint")
+    print("=" * 22)
+    
+    # Test chat
+    print("1️⃣ Testing chat...")
+    print(f"   Answer: {chat_response['answer'][:100]}...")
+    print(f"   Model: {chat_response['model']}")
+    print(f"   Sources: {len(chat_response['sources'])}")
+    print(f"   Processing time: {chat_response['processing_time_ms']}ms")
+    
+    # Test chat history
+    print("\n2️⃣ Testing chat history...")
+    print(f"   Session messages: {history_response.get('message_count', 0)}")
+    
+    return True
 
 
-def test_start_indexing():
+async def wait_for_status(
+    client: APIClient,
+    target_states: Tuple[str, ...],
+    deadline: float = 30,
+    initial: float = 0.05
+) -> Dict[str, Any]:
+    """
+    Poll /index/status until it reports one of target_states
+    
+    The delay between polls starts short and grows by half each time (up
+    to a second), so quick runs are noticed at once without hammering the
+    server during long ones.
+    
+    Args:
+        client: Client to poll with
+        target_states: Statuses that end the wait
+        deadline: Seconds to wait in total before returning the last status
+        initial: First delay between polls, in seconds
+    """
+    stop_at = time.monotonic() + deadline
+    delay = initial
+    while True:
+        await asyncio.sleep(delay)
+        status = await client.get("/index/status")
+        if status['status'] in target_states or time.monotonic() >= stop_at:
+            return status
+        delay = min(delay * 1.5, 1.0)
+
+
+async def test_start_indexing(client: APIClient) -> bool:
     """Test starting indexing process"""
     print("\n🧪 Testing Indexing Start")
     print("=" * 25)
     
-    client = APIClient()
-    
     try:
         print("1️⃣ Testing indexing start (small sample)...")
         
@@ -195,52 +378,77 @@ def test_start_indexing():
             "force_reindex": False
         }
         
-        response = client.post("/index", indexing_request)
+        response = await client.post("/index", indexing_request)
         
         print(f"   Status: {response['status']}")
         print(f"   Days limit: {response['days_limit']}")
         print("   ⏳ Indexing started in background...")
         
-        # Wait a moment and check status
-        print("\n2️⃣ Checking status after delay...")
-        time.sleep(2)
-        
-        status_response = client.get("/index/status")
-        print(f"   Current status: {status_response['status']}")
+        # Poll until indexing finishes
+        print("\n2️⃣ Waiting for indexing to finish...")
+        start = time.perf_counter()
+        status_response = await wait_for_status(client, ("indexed", "not_indexed", "error"))
+        print(f"   Current status: {status_response['status']} ({time.perf_counter() - start:.1f}s)")
         
         return True
-        
+    
     except Exception as e:
         print(f"❌ Indexing start test failed: {e}")
         return False
 
 
-def run_comprehensive_test():
-    """Run all tests"""
-    print("🚀 iMessage AI FastAPI Server Tests")
-    print("=" * 40)
+async def run_tests(base_url: str, concurrency: int, with_indexing: bool) -> bool:
+    """
+    Run the endpoint tests concurrently over one client, then optionally indexing
     
-    success = True
+    The client asks for MessagePack responses when msgspec is installed.
     
-    # Basic tests
-    success &= test_basic_endpoints()
-    success &= test_indexing_endpoints()
-    success &= test_search_endpoint()
-    success &= test_chat_endpoint()
+    Args:
+        base_url: Server address
+        concurrency: Connection limit of the client
+        with_indexing: Also start an indexing run and wait for it
+    """
+    client_class = MsgpackAPIClient if MSGSPEC_AVAILABLE else APIClient
+    async with client_class(base_url, concurrency) as client:
+        # Warm-up only: connection setup is kept out of the timing below
+        await client.warm_up()
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            test_basic_endpoints(client),
+            test_indexing_endpoints(client),
+            test_search_endpoint(client),
+            test_chat_endpoint(client)
+        )
+        print(f"\n⏱️  Endpoint tests took {time.perf_counter() - start:.2f}s")
+        success = all(results)
+        
+        # Indexing test (optional)
+        if with_indexing:
+            print("\n" + "=" * 40)
+            success &= await test_start_indexing(client)
     
-    # Indexing test (optional)
-    print("\n" + "=" * 40)
-    response = input("Would you like to test indexing? (y/N): ")
-    if response.lower().startswith('y'):
-        success &= test_start_indexing()
+    return success
+
+
+def run_comprehensive_test(
+    base_url: str = "http://localhost:8000",
+    concurrency: int = 16,
+    with_indexing: bool = False
+):
+    """Run all tests (see run_tests for the arguments)"""
+    print("🚀 iMessage AI FastAPI Server Tests")
+    print("=" * 40)
+    
+    success = asyncio.run(run_tests(base_url, concurrency, with_indexing))
     
     # Summary
     print("\n" + "=" * 40)
     if success:
         print("🎉 All API tests passed!")
         print("\n💡 API is ready for web UI integration")
-        print("   • Swagger docs: http://localhost:8000/docs")
-        print("   • ReDoc: http://localhost:8000/redoc")
+        print(f"   • Swagger docs: {base_url}/docs")
+        print(f"   • ReDoc: {base_url}/redoc")
     else:
         print("💥 Some API tests failed!")
         print("🔧 Check server logs for details")
@@ -248,5 +456,20 @@ def run_comprehensive_test():
     return success
 
 
+def main():
+    """Parse arguments and run the tests; exits non-zero if any failed"""
+    parser = argparse.ArgumentParser(description='Test the iMessage AI API server')
+    parser.add_argument('--base-url', default='http://localhost:8000',
+                       help='Server address')
+    parser.add_argument('--with-indexing', action='store_true',
+                       help='Also start an indexing run and wait for it to finish')
+    parser.add_argument('--concurrency', type=int, default=16,
+                       help='Most requests in flight at once')
+    args = parser.parse_args()
+    
+    success = run_comprehensive_test(args.base_url, args.concurrency, args.with_indexing)
+    raise SystemExit(0 if success else 1)
+
+
 if __name__ == "__main__":
-    run_comprehensive_test()
\ No newline at end of file
+    main()